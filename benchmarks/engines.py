@@ -0,0 +1,182 @@
+"""
+Benchmark the search engines, against each other and against an earlier
+revision of twophase such as the baseline before flat tables:
+
+    python benchmarks/engines.py --cubes 20 --baseline 04ecd59
+
+Every engine solves the same random cubes with the default heuristics, after
+its tables have been loaded, each cube --repeat times to smooth out noise.
+The time taken is reported for each engine along with its speedup over the
+first, and the solutions found by all the engines are checked to be
+identical. The earlier revision is extracted from git into --work-dir and run
+in a subprocess, and builds its own tables there the first time, which can
+take a few minutes.
+"""
+import argparse
+import io
+import json
+import os
+import random
+import subprocess
+import sys
+import tarfile
+import tempfile
+import time
+
+from twophase.random import random_cube
+from twophase.solve import ENGINES, SolutionManager
+from twophase.tables import Tables
+
+SOLVED = "".join(c * 9 for c in "URFDLB")
+
+# run by the earlier revision, with the cubes on stdin, writing the solution
+# and time taken for each to stdout
+_REVISION_SCRIPT = """
+import json
+import sys
+import time
+
+from twophase.solve import SolutionManager
+
+cubes, max_length, repeat = json.load(sys.stdin)
+# load (or build) the tables before timing
+SolutionManager(sys.argv[1]).solve(max_length)
+results = []
+for cube in cubes:
+    seconds = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        solution = SolutionManager(cube).solve(max_length)
+        seconds = min(seconds, time.perf_counter() - start)
+    results.append((solution, seconds))
+json.dump(results, sys.stdout)
+"""
+
+
+def solve_current(cubes, max_length, repeat, engine):
+    """
+    Solve the cubes with this revision, returning the solution and the
+    shortest time taken over repeat runs for each.
+    """
+    SolutionManager(SOLVED, engine=engine).solve(max_length)
+    results = []
+    for cube in cubes:
+        seconds = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            solution = SolutionManager(cube, engine=engine).solve(max_length)
+            seconds = min(seconds, time.perf_counter() - start)
+        results.append((solution, seconds))
+    return results
+
+
+def solve_revision(cubes, max_length, repeat, revision, work_dir):
+    """
+    Solve the cubes with the twophase package of a git revision, as
+    solve_current.
+    """
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    path = os.path.join(work_dir, "twophase-{}".format(revision))
+    if not os.path.isdir(path):
+        archive = subprocess.run(
+            ["git", "archive", "--format=tar", revision, "twophase"],
+            cwd=root,
+            stdout=subprocess.PIPE,
+            check=True,
+        ).stdout
+        with tarfile.open(fileobj=io.BytesIO(archive)) as tar:
+            tar.extractall(path)
+    # the package of the revision is imported from (and stores its tables in)
+    # the working directory of the subprocess
+    output = subprocess.run(
+        [sys.executable, "-c", _REVISION_SCRIPT, SOLVED],
+        cwd=path,
+        input=json.dumps([cubes, max_length, repeat]),
+        stdout=subprocess.PIPE,
+        check=True,
+        universal_newlines=True,
+    ).stdout
+    return [tuple(result) for result in json.loads(output)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Benchmark the search engines on random cubes."
+    )
+    parser.add_argument(
+        "--cubes",
+        type=int,
+        default=20,
+        help="number of random cubes (default %(default)s)",
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=0,
+        help="seed of the random cubes (default %(default)s)",
+    )
+    parser.add_argument(
+        "--max-length",
+        type=int,
+        default=25,
+        help="upper bound for the number of moves (default %(default)s)",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=3,
+        help=(
+            "number of times each cube is solved, the shortest time counting "
+            "(default %(default)s)"
+        ),
+    )
+    parser.add_argument(
+        "--baseline",
+        metavar="REVISION",
+        help="git revision to compare against, e.g. the first commit",
+    )
+    parser.add_argument(
+        "--work-dir",
+        default=tempfile.gettempdir(),
+        help="directory to extract the baseline into (default %(default)s)",
+    )
+    args = parser.parse_args(argv)
+
+    random.seed(args.seed)
+    cubes = [random_cube() for _ in range(args.cubes)]
+    Tables.load_tables()
+
+    runs = {}
+    if args.baseline:
+        runs["baseline " + args.baseline] = solve_revision(
+            cubes, args.max_length, args.repeat, args.baseline, args.work_dir
+        )
+    for engine in ENGINES:
+        runs[engine] = solve_current(
+            cubes, args.max_length, args.repeat, engine
+        )
+
+    first = None
+    print("{:<20} {:>10} {:>12} {:>8}".format("", "total s", "ms/cube", ""))
+    for name, results in runs.items():
+        total = sum(seconds for _, seconds in results)
+        first = first or total
+        print(
+            "{:<20} {:>10.2f} {:>12.1f} {:>7.2f}x".format(
+                name, total, 1000 * total / len(cubes), first / total
+            )
+        )
+
+    solutions = [[solution for solution, _ in r] for r in runs.values()]
+    differ = [
+        i for i in range(len(cubes)) if len({s[i] for s in solutions}) > 1
+    ]
+    if differ:
+        print("solutions differ for cubes {}".format(differ))
+        return 1
+    print("all engines found the same solutions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
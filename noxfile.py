@@ -1,6 +1,6 @@
 import nox
 
-SOURCES = ["twophase", "noxfile.py"]
+SOURCES = ["twophase", "tests", "benchmarks", "noxfile.py"]
 
 
 @nox.session()
@@ -12,6 +12,13 @@ def lint(session):
     session.run("flake8", *SOURCES)
 
 
+@nox.session()
+def tests(session):
+    """Run the tests"""
+    session.install(".")
+    session.run("python", "-m", "unittest", "discover", "-s", "tests")
+
+
 @nox.session()
 def build(session):
     """Check and build"""
@@ -0,0 +1,33 @@
+import random
+
+from twophase.cubes import FaceCube
+from twophase.cubes.cubiecube import MOVE_CUBE
+from twophase.pieces import Color
+
+SOLVED = "".join(c * 9 for c in "URFDLB")
+
+# number of clockwise quarter turns for each suffix of a move
+_POWERS = {"": 1, "2": 2, "'": 3}
+
+
+def apply_moves(cube_string, moves):
+    """
+    Facelets of the cube cube_string after the moves, e.g. "R U2 F'".
+    """
+    cc = FaceCube(cube_string).to_cubiecube()
+    for move in moves.split():
+        for _ in range(_POWERS[move[1:]]):
+            cc.multiply(MOVE_CUBE[Color[move[0]]])
+    return cc.to_facecube().to_string()
+
+
+def scramble(length, seed):
+    """
+    Facelets of the solved cube after length random moves.
+    """
+    rng = random.Random(seed)
+    moves = " ".join(
+        rng.choice("URFDLB") + rng.choice(("", "2", "'"))
+        for _ in range(length)
+    )
+    return apply_moves(SOLVED, moves)
@@ -0,0 +1,31 @@
+import asyncio
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+
+from twophase import solve_async, solve_best_generator_async
+
+SOLVED = "".join(c * 9 for c in "URFDLB")
+
+
+class TestExecutor(unittest.TestCase):
+    def setUp(self):
+        self.executor = ProcessPoolExecutor(1)
+        self.addCleanup(self.executor.shutdown)
+
+    def test_solve_async_rejects_process_pool(self):
+        with self.assertRaisesRegex(ValueError, "ThreadPoolExecutor"):
+            asyncio.run(solve_async(SOLVED, executor=self.executor))
+
+    def test_solve_best_generator_async_rejects_process_pool(self):
+        async def consume():
+            generator = solve_best_generator_async(
+                SOLVED, executor=self.executor
+            )
+            return [solution async for solution in generator]
+
+        with self.assertRaisesRegex(ValueError, "ThreadPoolExecutor"):
+            asyncio.run(consume())
+
+
+if __name__ == "__main__":
+    unittest.main()
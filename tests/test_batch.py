@@ -0,0 +1,49 @@
+import unittest
+
+from helpers import SOLVED, apply_moves, scramble
+
+from twophase import solve_many
+
+
+class TestSolveMany(unittest.TestCase):
+    def setUp(self):
+        self.cubes = [scramble(10, seed) for seed in range(8)]
+
+    def check(self, results, cubes):
+        for index, solution in results:
+            self.assertIsInstance(solution, str)
+            self.assertEqual(apply_moves(cubes[index], solution), SOLVED)
+
+    def test_ordered(self):
+        for workers in (1, 2):
+            with self.subTest(workers=workers):
+                results = list(
+                    solve_many(self.cubes, workers=workers, ordered=True)
+                )
+                self.assertEqual(
+                    [index for index, _ in results], list(range(8))
+                )
+                self.check(results, self.cubes)
+
+    def test_unordered(self):
+        results = list(solve_many(self.cubes, workers=2))
+        self.assertCountEqual([index for index, _ in results], list(range(8)))
+        self.check(results, self.cubes)
+
+    def test_item_time_limits(self):
+        # a time limit given with a cube applies to that cube only
+        items = [(cube, 10) for cube in self.cubes]
+        items[3] = (self.cubes[3], 0)
+        results = dict(solve_many(items, max_time=0, workers=2, ordered=True))
+        self.assertIsInstance(results.pop(3), RuntimeError)
+        self.check(results.items(), self.cubes)
+
+    def test_invalid_cube(self):
+        cubes = [self.cubes[0], "not a cube", self.cubes[1]]
+        results = list(solve_many(cubes, workers=2, ordered=True))
+        self.assertIsInstance(results[1][1], ValueError)
+        self.check([results[0], results[2]], cubes)
+
+
+if __name__ == "__main__":
+    unittest.main()
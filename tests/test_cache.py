@@ -0,0 +1,61 @@
+import unittest
+
+from helpers import SOLVED, apply_moves, scramble
+
+from twophase import SolutionCache, solve
+from twophase.cache import canonical_form
+from twophase.cubes import FaceCube
+from twophase.cubes.symmetry import N_SYM, conjugate
+
+
+def _variants(cube):
+    """
+    The cube conjugated by each symmetry, and each of those inverted.
+    """
+    cc = FaceCube(cube).to_cubiecube()
+    for s in range(N_SYM):
+        d = conjugate(cc, s)
+        yield d.to_facecube().to_string()
+        yield d.inverse_cubiecube().to_facecube().to_string()
+
+
+class TestSolutionCache(unittest.TestCase):
+    def setUp(self):
+        self.cube = scramble(25, 0)
+        self.cache = SolutionCache()
+        self.solution = solve(self.cube, cache=self.cache)
+
+    def test_equivalent_cubes_hit(self):
+        key = canonical_form(self.cube).key
+        for variant in _variants(self.cube):
+            with self.subTest(cube=variant):
+                self.assertEqual(canonical_form(variant).key, key)
+                solution = self.cache.get(variant)
+                self.assertIsNotNone(solution)
+                self.assertEqual(
+                    len(solution.split()), len(self.solution.split())
+                )
+                self.assertEqual(apply_moves(variant, solution), SOLVED)
+        self.assertEqual(self.cache.hits, 2 * N_SYM)
+        self.assertEqual(len(self.cache), 1)
+
+    def test_solve_uses_cache(self):
+        for variant in _variants(self.cube):
+            self.assertEqual(
+                apply_moves(variant, solve(variant, cache=self.cache)),
+                SOLVED,
+            )
+        self.assertEqual(self.cache.misses, 1)
+
+    def test_max_length(self):
+        length = len(self.solution.split())
+        self.assertIsNone(self.cache.get(self.cube, length))
+        self.assertIsNotNone(self.cache.get(self.cube, length + 1))
+
+    def test_invalid_cube(self):
+        with self.assertRaises(ValueError):
+            self.cache.get(SOLVED[::-1][:-1] + "X")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,34 @@
+import subprocess
+import sys
+import unittest
+
+CHECK = """
+import sys
+import twophase
+import twophase.cubes.symmetry as symmetry
+
+slow = ("asyncio", "multiprocessing", "twophase.aio", "twophase.cache")
+print([name for name in slow if name in sys.modules])
+print("MOVE_CONJ" in vars(symmetry))
+"""
+
+
+class TestImport(unittest.TestCase):
+    def test_import_is_lazy(self):
+        output = subprocess.run(
+            [sys.executable, "-c", CHECK],
+            check=True,
+            stdout=subprocess.PIPE,
+            universal_newlines=True,
+        ).stdout
+        self.assertEqual(output.split("\n")[:2], ["[]", "False"])
+
+    def test_lazy_names(self):
+        import twophase
+
+        for name in twophase.__all__:
+            self.assertTrue(callable(getattr(twophase, name)), name)
+
+
+if __name__ == "__main__":
+    unittest.main()
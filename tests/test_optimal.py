@@ -0,0 +1,24 @@
+import unittest
+
+from twophase.optimal import OptimalSolutionManager
+from twophase.stats import SearchStats
+
+SOLVED = "".join(c * 9 for c in "URFDLB")
+
+
+class TestOptimalSolutionManager(unittest.TestCase):
+    def test_unsupported_arguments(self):
+        sm = OptimalSolutionManager(SOLVED)
+        for kwargs in (
+            {"stats": SearchStats()},
+            {"prefix": [(0, 1)]},
+            {"phase_1_depth": 3},
+            {"resume": True},
+        ):
+            with self.subTest(**kwargs):
+                with self.assertRaisesRegex(ValueError, "isn't supported"):
+                    sm.solve(**kwargs)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+import http.client
+import json
+import os
+import signal
+import threading
+import unittest
+
+from twophase.server import make_server
+
+SOLVED = "".join(c * 9 for c in "URFDLB")
+
+
+def _serve(test):
+    httpd = make_server(port=0, workers=1, max_time=5)
+    thread = threading.Thread(target=httpd.serve_forever)
+    thread.start()
+    test.addCleanup(httpd.solver.close)
+    test.addCleanup(httpd.server_close)
+    test.addCleanup(thread.join)
+    test.addCleanup(httpd.shutdown)
+    return httpd
+
+
+def _request(httpd, body, headers=None):
+    connection = http.client.HTTPConnection(*httpd.server_address)
+    try:
+        connection.request("POST", "/solve", body, headers or {})
+        response = connection.getresponse()
+        return response.status, json.loads(response.read())
+    finally:
+        connection.close()
+
+
+class TestServer(unittest.TestCase):
+    def setUp(self):
+        self.httpd = _serve(self)
+
+    def test_solve(self):
+        status, body = _request(self.httpd, json.dumps({"cube": SOLVED}))
+        self.assertEqual(status, 200)
+        self.assertEqual(body["length"], 0)
+
+    def test_max_length_too_large(self):
+        status, body = _request(
+            self.httpd, json.dumps({"cube": SOLVED, "max_length": 10 ** 9})
+        )
+        self.assertEqual(status, 400)
+        self.assertIn("max_length", body["error"])
+
+    def test_invalid_content_length(self):
+        for length in ("-1", "ten"):
+            status, body = _request(
+                self.httpd, "{}", {"Content-Length": length}
+            )
+            self.assertEqual(status, 400)
+            self.assertIn("Content-Length", body["error"])
+
+    def test_body_too_large(self):
+        status, body = _request(self.httpd, " " * 5000)
+        self.assertEqual(status, 400)
+        self.assertIn("too large", body["error"])
+
+    def test_pool_replaced_after_worker_dies(self):
+        for pid in list(self.httpd.solver._executor._processes):
+            os.kill(pid, signal.SIGKILL)
+        # requests sent to the broken pool fail, later ones are solved
+        body = json.dumps({"cube": SOLVED})
+        statuses = []
+        while 200 not in statuses and len(statuses) < 3:
+            statuses.append(_request(self.httpd, body)[0])
+        self.assertEqual(statuses[-1], 200)
+        self.assertEqual(self.httpd.solver.metrics()["restarts"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,45 @@
+import time
+import unittest
+
+from helpers import SOLVED, apply_moves, scramble
+
+from twophase import SolutionManager
+
+
+def _solutions(cube, resume):
+    """
+    Solutions found by searching with ever shorter max_length, until no
+    shorter solution exists, either resuming each search from the last
+    solution or starting again with a new SolutionManager.
+    """
+    timeout = time.time() + 60
+    sm = SolutionManager(cube)
+    solutions, max_length = [], 25
+    while True:
+        if not resume:
+            sm = SolutionManager(cube)
+        solution = sm.solve(
+            max_length, timeout, resume=resume and bool(solutions)
+        )
+        if not isinstance(solution, str):
+            return solutions, solution
+        solutions.append(solution)
+        max_length = len(solution.split())
+
+
+class TestResume(unittest.TestCase):
+    def test_resume_matches_restarts(self):
+        for cube in (scramble(12, 0), scramble(12, 1), scramble(16, 0)):
+            with self.subTest(cube=cube):
+                resumed, status = _solutions(cube, resume=True)
+                self.assertEqual(status, -1)
+                self.assertEqual(
+                    (resumed, status), _solutions(cube, resume=False)
+                )
+                self.assertGreater(len(resumed), 1)
+                for solution in resumed:
+                    self.assertEqual(apply_moves(cube, solution), SOLVED)
+
+
+if __name__ == "__main__":
+    unittest.main()
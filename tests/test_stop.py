@@ -0,0 +1,29 @@
+import threading
+import unittest
+
+from twophase import StopCondition
+
+
+class TestStopCondition(unittest.TestCase):
+    def test_nodes_counted_across_threads(self):
+        stop = StopCondition()
+
+        def count():
+            for _ in range(20000):
+                stop.check(1)
+
+        threads = [threading.Thread(target=count) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(stop.nodes, 8 * 20000)
+
+    def test_node_budget(self):
+        stop = StopCondition(max_nodes=10)
+        self.assertEqual(stop.check(9), 0)
+        self.assertEqual(stop.check(1), -3)
+
+
+if __name__ == "__main__":
+    unittest.main()
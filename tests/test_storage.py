@@ -0,0 +1,120 @@
+import os
+import shutil
+import tempfile
+import unittest
+from array import array
+from unittest import mock
+
+from twophase import storage
+from twophase.tables import TABLES_FILE, TABLES_VERSION, Tables
+
+TABLES = {
+    "bytes": array("B", range(256)),
+    "shorts": array("H", range(0, 65536, 7)),
+    "ints": array("i", range(-1000, 1000, 3)),
+    "empty": array("b"),
+}
+
+
+def _corrupt(path, name):
+    # flip a bit of the named table
+    with open(path, "rb") as f:
+        directory = storage.read_directory(f.read(), TABLES_VERSION)
+    offset = directory[name][2]
+    with open(path, "r+b") as f:
+        f.seek(offset)
+        byte = f.read(1)[0]
+        f.seek(offset)
+        f.write(bytes([byte ^ 1]))
+
+
+def _truncate(path, name):
+    # cut the file off part of the way through the named table
+    with open(path, "rb") as f:
+        directory = storage.read_directory(f.read(), TABLES_VERSION)
+    with open(path, "r+b") as f:
+        f.truncate(directory[name][2] + 10)
+
+
+class TestTableFile(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = os.path.join(directory, "tables.bin")
+        storage.write_tables(self.path, TABLES, TABLES_VERSION)
+
+    def test_round_trip(self):
+        for use_mmap in (False, True):
+            table_file = storage.TableFile(self.path, TABLES_VERSION, use_mmap)
+            self.addCleanup(table_file.close)
+            for name, table in TABLES.items():
+                with self.subTest(name=name, use_mmap=use_mmap):
+                    self.assertEqual(list(table_file.read(name)), list(table))
+
+    def test_outdated(self):
+        with self.assertRaisesRegex(ValueError, "outdated"):
+            storage.TableFile(self.path, TABLES_VERSION + 1)
+
+    def test_corrupt(self):
+        _corrupt(self.path, "shorts")
+        table_file = storage.TableFile(self.path, TABLES_VERSION)
+        self.assertEqual(list(table_file.read("bytes")), list(TABLES["bytes"]))
+        with self.assertRaisesRegex(ValueError, "corrupt"):
+            table_file.read("shorts")
+
+    def test_truncated(self):
+        _truncate(self.path, "shorts")
+        table_file = storage.TableFile(self.path, TABLES_VERSION)
+        with self.assertRaisesRegex(ValueError, "truncated"):
+            table_file.read("shorts")
+
+
+class TestRebuild(unittest.TestCase):
+    """
+    Tables rebuilds a table file it finds corrupt or truncated. The build is
+    replaced by the tables of the cache, so that the test is quick.
+    """
+
+    def setUp(self):
+        Tables.configure()
+        self.addCleanup(Tables.configure)
+        Tables.twist_move
+        table_file = storage.TableFile(Tables.tables_path(), TABLES_VERSION)
+        self.tables = {
+            name: table_file.read(name) for name in table_file.directory
+        }
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir)
+        self.path = os.path.join(self.cache_dir, TABLES_FILE)
+        storage.write_tables(self.path, self.tables, TABLES_VERSION)
+
+    def assert_rebuilt(self):
+        with mock.patch.object(
+            Tables, "build_tables", return_value=self.tables
+        ) as build:
+            Tables.configure(cache_dir=self.cache_dir)
+            self.assertEqual(
+                list(Tables.twist_move), list(self.tables["twist_move"])
+            )
+        build.assert_called_once()
+        # the file was replaced by a good one
+        table_file = storage.TableFile(self.path, TABLES_VERSION)
+        table_file.read("twist_move")
+
+    def test_intact_file_is_used(self):
+        with mock.patch.object(Tables, "build_tables") as build:
+            Tables.configure(cache_dir=self.cache_dir)
+            Tables.twist_move
+        build.assert_not_called()
+
+    def test_corrupt_file_is_rebuilt(self):
+        _corrupt(self.path, "twist_move")
+        self.assert_rebuilt()
+
+    def test_truncated_file_is_rebuilt(self):
+        _truncate(self.path, "twist_move")
+        self.assert_rebuilt()
+
+
+if __name__ == "__main__":
+    unittest.main()
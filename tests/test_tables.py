@@ -0,0 +1,85 @@
+import random
+import unittest
+
+from twophase.tables import PHASE_1_MOVES, PHASE_2_MOVES, Tables
+
+# pruning table, stride and the move tables and moves of its coordinates
+PRUNING_TABLES = (
+    (
+        "udslice_twist_prune",
+        Tables.TWIST,
+        ("udslice_move", "twist_move"),
+        PHASE_1_MOVES,
+    ),
+    (
+        "udslice_flip_prune",
+        Tables.FLIP,
+        ("udslice_move", "flip_move"),
+        PHASE_1_MOVES,
+    ),
+    (
+        "edge4_edge8_prune",
+        Tables.EDGE8,
+        ("edge4_move", "edge8_move"),
+        PHASE_2_MOVES,
+    ),
+    (
+        "edge4_corner_prune",
+        Tables.CORNER,
+        ("edge4_move", "corner_move"),
+        PHASE_2_MOVES,
+    ),
+)
+
+
+class TestConfigure(unittest.TestCase):
+    def tearDown(self):
+        Tables.configure()
+
+    def test_configure_closes_mapped_files(self):
+        Tables.configure(use_mmap=True)
+        Tables.twist_move
+        table_files = list(Tables._table_files.values())
+        self.assertTrue(table_files)
+        Tables.configure(use_mmap=True)
+        for table_file in table_files:
+            self.assertTrue(table_file._buffer.closed)
+
+
+class TestPackedPruningTables(unittest.TestCase):
+    """
+    Packed pruning tables give the same distances as unpacked ones, both
+    descending from positions without a parent and from the distance of the
+    parent.
+    """
+
+    def setUp(self):
+        self.addCleanup(Tables.configure)
+
+    def test_same_distances(self):
+        rng = random.Random(0)
+        for name, stride, move_names, moves in PRUNING_TABLES:
+            Tables.configure(packed=False)
+            table = getattr(Tables, name)
+            move_tables = [getattr(Tables, m) for m in move_names]
+            Tables.configure(packed=True)
+            packed = getattr(Tables, name)
+            self.assertTrue(packed.packed)
+            self.assertFalse(table.packed)
+            for i in rng.sample(range(len(table.table)), 50):
+                x = divmod(i, stride)
+                with self.subTest(name=name, x=x):
+                    dist = table.distance(x)
+                    self.assertEqual(packed.distance(x), dist)
+                    for mv in moves:
+                        y = tuple(
+                            move[18 * coord + mv]
+                            for move, coord in zip(move_tables, x)
+                        )
+                        self.assertEqual(
+                            packed.distance(y, dist), table.distance(y)
+                        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,53 +1,219 @@
+import importlib
 import time
 
-from .solve import SolutionManager
+from .solve import STATUS_ERRORS, SolutionManager
+from .stats import SearchStats
+from .stop import StopCondition
 
+__all__ = [
+    "SearchStats",
+    "SolutionCache",
+    "SolutionManager",
+    "StopCondition",
+    "solve",
+    "solve_async",
+    "solve_best",
+    "solve_best_generator",
+    "solve_best_generator_async",
+    "solve_many",
+    "solve_race",
+]
 
-def solve(cube_string, max_length=25, max_time=10):
+# names exported from modules that are slow to import, e.g. because they
+# import asyncio or multiprocessing, which are imported on first access
+_LAZY = {
+    "SolutionCache": "cache",
+    "solve_async": "aio",
+    "solve_best_generator_async": "aio",
+    "solve_many": "batch",
+    "solve_race": "race",
+}
+
+
+def __getattr__(name):
+    if name in _LAZY:
+        module = importlib.import_module("." + _LAZY[name], __name__)
+        value = getattr(module, name)
+        globals()[name] = value
+        return value
+    raise AttributeError(
+        "module {!r} has no attribute {!r}".format(__name__, name)
+    )
+
+
+def __dir__():
+    return sorted({*globals(), *_LAZY})
+
+
+def solve(
+    cube_string,
+    max_length=25,
+    max_time=10,
+    stats=None,
+    max_nodes=None,
+    race=False,
+    workers=None,
+    cache=None,
+    stop=None,
+):
     """
     Solve the cube specified by cube_string, return the first solution found
-    as long as max_time not exceeded.
+    as long as max_time not exceeded and at most max_nodes positions have
+    been expanded (see SolutionManager.solve).
+
+    If stats is a SearchStats, statistics describing the search are added to
+    it.
+
+    If race is True, the cube is searched in three orientations, each of the
+    cube and its inverse, at once on workers processes (see
+    twophase.race.solve_race), returning the shortest solution found within
+    max_time. max_nodes then limits the search of each variant, and stats
+    aren't supported.
+
+    If cache is a SolutionCache, a solution of the cube (or of any cube
+    equivalent to it under symmetry) shorter than max_length is returned from
+    the cache if there is one, without searching or updating stats. Otherwise
+    the solution found is added to the cache.
+
+    If stop is a StopCondition, the search also stops as it says, see
+    SolutionManager.solve, e.g. when it's cancelled from another thread.
     """
+    # checks the cube before anything else
     sm = SolutionManager(cube_string)
-    solution = sm.solve(max_length, time.time() + max_time)
-    if isinstance(solution, str):
-        return solution
-    elif solution == -2:
-        raise RuntimeError("max_time exceeded, no solution found")
-    elif solution == -1:
-        raise RuntimeError("no solution found, try increasing max_length")
-    raise RuntimeError(
-        f"SolutionManager.solve: unexpected return value {solution}"
-    )
+    if cache is not None:
+        from .cache import canonical_form
+
+        # computed once for both looking the cube up and caching its solution
+        form = canonical_form(sm.cubiecube)
+        solution = cache.get(form, max_length)
+        if solution is not None:
+            return solution
 
+    if race:
+        if stats is not None:
+            raise ValueError("stats aren't collected when racing")
+        from .race import solve_race
 
-def solve_best(cube_string, max_length=25, max_time=10):
+        solution = solve_race(
+            cube_string, max_length, max_time, max_nodes, workers, stop
+        )
+    else:
+        solution = sm.solve(
+            max_length,
+            time.time() + max_time,
+            stats,
+            max_nodes=max_nodes,
+            stop=stop,
+        )
+        if not isinstance(solution, str):
+            if solution in STATUS_ERRORS:
+                raise RuntimeError(STATUS_ERRORS[solution])
+            raise RuntimeError(
+                f"SolutionManager.solve: unexpected return value {solution}"
+            )
+
+    if cache is not None:
+        cache.put(form, solution)
+    return solution
+
+
+def solve_best(
+    cube_string,
+    max_length=25,
+    max_time=10,
+    stats=None,
+    max_nodes=None,
+    parallel=False,
+    workers=None,
+    stop=None,
+):
     """
     Solve the cube repeatedly, reducing max_length each time a solution is
-    found until timeout is reached or no more solutions are found.
+    found until timeout is reached, max_nodes positions have been expanded in
+    total, stop says so or no more solutions are found.
 
-    Returns all solutions found as a list.
+    Returns all solutions found as a list. If stats is a SearchStats,
+    statistics describing all the searches are added to it.
+
+    If parallel is True the search is split between workers processes, see
+    solve_best_generator.
     """
-    return list(solve_best_generator(cube_string, max_length, max_time))
+    return list(
+        solve_best_generator(
+            cube_string,
+            max_length,
+            max_time,
+            stats,
+            max_nodes,
+            parallel,
+            workers,
+            stop,
+        )
+    )
 
 
-def solve_best_generator(cube_string, max_length=25, max_time=10):
+def solve_best_generator(
+    cube_string,
+    max_length=25,
+    max_time=10,
+    stats=None,
+    max_nodes=None,
+    parallel=False,
+    workers=None,
+    stop=None,
+):
     """
     Solve the cube repeatedly, reducing max_length each time a solution is
-    found until timeout is reached or no more solutions are found.
+    found until timeout is reached, max_nodes positions have been expanded in
+    total, stop says so or no more solutions are found.
+
+    Yields the solution each time it is found. If stats is a SearchStats,
+    statistics describing the searches so far are added to it as they run.
 
-    Yields the solution each time it is found.
+    If parallel is True, the phase 1 search is split by the first moves of
+    the solution between workers processes, which share the length of the
+    best solution found so far (see twophase.parallel_search). stats and
+    max_nodes aren't supported in that case.
+
+    If stop is a StopCondition, the searches stop as it says (see
+    SolutionManager.solve), in particular once a solution of at most
+    stop.target_length moves has been found.
     """
+    if parallel:
+        if stats is not None:
+            raise ValueError("stats aren't collected in a parallel search")
+        if max_nodes is not None:
+            raise ValueError("max_nodes isn't supported in a parallel search")
+        from . import parallel_search
+
+        yield from parallel_search.solve_best_generator(
+            cube_string, max_length, max_time, workers, stop=stop
+        )
+        return
+
     sm = SolutionManager(cube_string)
     timeout = time.time() + max_time
+    resume = False
     while True:
-        solution = sm.solve(max_length, timeout)
+        solution = sm.solve(
+            max_length,
+            timeout,
+            stats,
+            max_nodes=max_nodes,
+            resume=resume,
+            stop=stop,
+        )
+        if max_nodes is not None:
+            max_nodes -= sm.nodes
 
         if isinstance(solution, str):
             yield solution
-            max_length = len(solution.split(" ")) - 1
-        elif solution == -2 or solution == -1:
-            # timeout or no more solutions
+            # solutions are strictly shorter than max_length. each search
+            # continues from where the last found its solution
+            max_length = len(solution.split())
+            resume = True
+        elif solution in (-1, -2, -3, -4):
+            # timeout, node budget exhausted, stopped or no more solutions
             break
         else:
             raise RuntimeError(
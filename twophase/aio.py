@@ -0,0 +1,146 @@
+"""
+asyncio interface to the solver.
+
+The searches run in a thread pool shared by all calls (or a thread pool of
+your choosing) so that they don't block the event loop. When the task
+awaiting a search is cancelled, the search itself is cancelled too, through
+its stop condition (see twophase.StopCondition), and stops within a few
+milliseconds rather than running on until max_time.
+
+Searches hold the GIL while they run, so the event loop gets a share of the
+interpreter rather than running unhindered, and several searches at once share
+a single core. To solve many cubes at once use twophase.solve_many.
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from .solve import STATUS_ERRORS, SolutionManager
+from .stop import StopCondition
+
+# executor shared by all searches, created on first use
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _shared_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(thread_name_prefix="twophase")
+        return _executor
+
+
+def _check_executor(executor):
+    # the search runs on a SolutionManager in this process, and is cancelled
+    # through a threading.Event, neither of which can be sent to a process
+    if executor is not None and not isinstance(executor, ThreadPoolExecutor):
+        raise ValueError(
+            "executor must be a ThreadPoolExecutor, got {!r}".format(executor)
+        )
+
+
+async def _run(executor, sm, stop, *args, **kwargs):
+    """
+    Run sm.solve in executor, cancelling stop if the awaiting task is
+    cancelled.
+    """
+    loop = asyncio.get_running_loop()
+    search = partial(sm.solve, *args, stop=stop, **kwargs)
+    try:
+        return await loop.run_in_executor(
+            executor or _shared_executor(), search
+        )
+    except asyncio.CancelledError:
+        stop.cancel()
+        raise
+
+
+async def solve_async(
+    cube_string,
+    max_length=25,
+    max_time=10,
+    max_nodes=None,
+    executor=None,
+    stop=None,
+):
+    """
+    Solve the cube specified by cube_string without blocking the event loop,
+    returning the first solution found, see twophase.solve.
+
+    Parameters
+    ----------
+    cube_string : str
+        Starting position of the cube, see SolutionManager.
+    max_length, max_time, max_nodes : optional
+        As for twophase.solve.
+    executor : concurrent.futures.ThreadPoolExecutor, optional
+        Thread pool to run the search in, by default one shared by all
+        searches. Raises ValueError for other executors, to solve cubes in
+        other processes use twophase.solve_many.
+    stop : twophase.StopCondition, optional
+        Stop condition for the search, see SolutionManager.solve, which is
+        cancelled if the awaiting task is. By default a new one.
+    """
+    _check_executor(executor)
+    sm = SolutionManager(cube_string)
+    solution = await _run(
+        executor,
+        sm,
+        StopCondition() if stop is None else stop,
+        max_length,
+        time.time() + max_time,
+        max_nodes=max_nodes,
+    )
+    if isinstance(solution, str):
+        return solution
+    raise RuntimeError(STATUS_ERRORS[solution])
+
+
+async def solve_best_generator_async(
+    cube_string,
+    max_length=25,
+    max_time=10,
+    max_nodes=None,
+    executor=None,
+    stop=None,
+):
+    """
+    Asynchronous version of twophase.solve_best_generator, yielding ever
+    shorter solutions until max_time is exceeded, max_nodes positions have
+    been expanded, stop says so or no shorter solution exists. See
+    solve_async for the parameters.
+
+    Usage::
+
+        async for solution in solve_best_generator_async(cube_string):
+            ...
+    """
+    _check_executor(executor)
+    sm = SolutionManager(cube_string)
+    timeout = time.time() + max_time
+    if stop is None:
+        stop = StopCondition()
+    resume = False
+    while True:
+        solution = await _run(
+            executor,
+            sm,
+            stop,
+            max_length,
+            timeout,
+            max_nodes=max_nodes,
+            resume=resume,
+        )
+        if max_nodes is not None:
+            max_nodes -= sm.nodes
+        if not isinstance(solution, str):
+            # timeout, node budget exhausted, stopped or no more solutions
+            break
+        # no search runs while the solution is consumed, so closing the
+        # generator here needs no cancelling
+        yield solution
+        max_length = len(solution.split())
+        resume = True
@@ -0,0 +1,161 @@
+"""
+Solve many cubes, streaming the results.
+
+Each worker process loads the tables once (or shares them, see
+Tables.configure) and keeps a single SolutionManager, which it reuses for
+every cube it's given (see SolutionManager.set_facelets), so the search
+arrays are allocated once per worker rather than per cube. Only a bounded
+number of cubes are queued for the workers, or waiting to be yielded in
+order, at a time, so the input can be an arbitrarily long iterator and is
+solved in constant memory.
+"""
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from .solve import STATUS_ERRORS, SolutionManager
+from .tables import Tables
+
+# number of cubes queued for each worker, keeping the workers busy while the
+# results are consumed
+QUEUED_PER_WORKER = 2
+
+# the SolutionManager reused by solve_item in each process
+_manager = None
+
+
+def solve_item(item, max_length=25, max_time=10, max_nodes=None):
+    """
+    Solve a single cube with the SolutionManager of this process, see
+    solve_item_details.
+    """
+    return solve_item_details(item, max_length, max_time, max_nodes)[0]
+
+
+def solve_item_details(item, max_length=25, max_time=10, max_nodes=None):
+    """
+    Solve a single cube with the SolutionManager of this process, reporting
+    the work done.
+
+    Parameters
+    ----------
+    item : str or (str, float)
+        Cube string, or pair of cube string and the time limit for the cube
+        in seconds, overriding max_time.
+    max_length, max_time, max_nodes : optional
+        As for twophase.solve. The time limit runs from the start of the
+        search for this cube.
+
+    Returns
+    -------
+    result : str or Exception
+        The solution, or the error twophase.solve would raise: ValueError if
+        the cube is invalid, RuntimeError if no solution was found.
+    nodes : int
+        Number of positions expanded by the search.
+    seconds : float
+        Time taken to solve the cube, including checking it.
+    """
+    global _manager
+    start = time.perf_counter()
+    if isinstance(item, str):
+        cube_string = item
+    else:
+        cube_string, max_time = item
+    timeout = time.time() + max_time
+    try:
+        if _manager is None:
+            _manager = SolutionManager(cube_string)
+        else:
+            _manager.set_facelets(cube_string)
+    except ValueError as e:
+        return e, 0, time.perf_counter() - start
+    solution = _manager.solve(max_length, timeout, max_nodes=max_nodes)
+    if not isinstance(solution, str):
+        solution = RuntimeError(STATUS_ERRORS[solution])
+    return solution, _manager.nodes, time.perf_counter() - start
+
+
+def solve_many(
+    cubes,
+    max_length=25,
+    max_time=10,
+    max_nodes=None,
+    workers=None,
+    ordered=False,
+    details=False,
+):
+    """
+    Solve each of an iterable of cubes, yielding pairs (index, result) as the
+    cubes are solved, in order of completion unless ordered is True.
+
+    Parameters
+    ----------
+    cubes : iterable
+        Cube strings, or pairs of cube string and the time limit for that
+        cube in seconds. Consumed lazily, as workers become free.
+    max_length, max_time, max_nodes : optional
+        As for twophase.solve, applying to each cube separately. The time
+        limit runs from the start of the search for each cube, so time spent
+        waiting for a worker doesn't count.
+    workers : int, optional
+        Number of worker processes, defaults to the number of cores. With 1,
+        the cubes are solved in order in the current process.
+    ordered : bool, optional
+        If True, yield the results in the order of cubes. Results that are
+        ready early wait for those before them, and count towards the cubes
+        queued, so a slow cube holds up the workers rather than letting the
+        waiting results grow without bound.
+    details : bool, optional
+        If True, yield (index, result, nodes, seconds), see
+        solve_item_details.
+
+    Yields
+    ------
+    index : int
+        Position of the cube in cubes.
+    result : str or Exception
+        The solution, or the error twophase.solve would have raised for the
+        cube, see solve_item.
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        for index, item in enumerate(cubes):
+            ret = solve_item_details(item, max_length, max_time, max_nodes)
+            yield (index, *ret) if details else (index, ret[0])
+        return
+
+    executor = ProcessPoolExecutor(
+        workers,
+        initializer=Tables.configure_worker,
+        initargs=(Tables.configuration(),),
+    )
+    # index of each queued cube by future, in the order submitted
+    pending = {}
+
+    def completed():
+        # the next results to yield, waiting for at least one
+        if ordered:
+            done = [next(iter(pending))]
+        else:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            index = pending.pop(future)
+            ret = future.result()
+            yield (index, *ret) if details else (index, ret[0])
+
+    try:
+        for index, item in enumerate(cubes):
+            future = executor.submit(
+                solve_item_details, item, max_length, max_time, max_nodes
+            )
+            pending[future] = index
+            if len(pending) >= QUEUED_PER_WORKER * workers:
+                yield from completed()
+        while pending:
+            yield from completed()
+    finally:
+        # if the generator is closed early, don't start the cubes queued
+        for future in pending:
+            future.cancel()
+        executor.shutdown()
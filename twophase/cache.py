@@ -0,0 +1,160 @@
+"""
+Cache of solutions shared between cubes that are equivalent under symmetry.
+
+Conjugating a cube c by any of the 48 symmetries S of the cube gives a cube
+S * c * S^-1 solved by the conjugated moves, and the inverse of c is solved by
+reversing and inverting the moves of a solution of c (see twophase.race). Of
+the 96 cubes obtained from c in these ways, the one with the smallest
+permutations and orientations is its canonical form, which every cube
+equivalent to c shares. Solutions are cached for the canonical form, keyed by
+its coordinates combined into a single integer, and transformed back to the
+cube looked up.
+"""
+from collections import OrderedDict, namedtuple
+
+from .cubes.symmetry import N_SYM, SYM_CUBE, SYM_INV, conjugate
+from .race import conjugate_solution
+from .solve import SolutionManager
+from .tables import Tables
+
+# default number of solutions cached, see SolutionCache
+CACHE_SIZE = 10000
+
+
+class CanonicalForm(namedtuple("CanonicalForm", "key symmetry inverse")):
+    """
+    Canonical form of a cube c under symmetry and inversion, see
+    canonical_form. The canonical form is S * c * S^-1, or S * c^-1 * S^-1 if
+    inverse is True, where S is the symmetry numbered symmetry (see
+    twophase.cubes.symmetry), and key combines its coordinates.
+    """
+
+    __slots__ = ()
+
+
+def canonical_form(cube):
+    """
+    Canonical form of a cube under symmetry and inversion.
+
+    Parameters
+    ----------
+    cube : str or CubieCube
+        Cube string, or a cube already checked to be valid such as
+        SolutionManager.cubiecube. Raises ValueError for invalid cube
+        strings, whose canonical form wouldn't make sense.
+
+    Returns
+    -------
+    CanonicalForm
+    """
+    if isinstance(cube, str):
+        cube = SolutionManager(cube).cubiecube
+    # the states are compared by corner permutation first, which is cheap to
+    # conjugate on its own, so only the conjugates with the smallest corner
+    # permutation (usually just one) are conjugated in full
+    best_cp, candidates = None, []
+    for inverse, c in ((False, cube), (True, cube.inverse_cubiecube())):
+        for s in range(N_SYM):
+            # S * c * S^-1 takes position i to S(c(S^-1(i)))
+            sym_cp, inv_cp = SYM_CUBE[s].cp, SYM_CUBE[SYM_INV[s]].cp
+            cp = [sym_cp[c.cp[inv_cp[i]]] for i in range(8)]
+            if best_cp is None or cp < best_cp:
+                best_cp, candidates = cp, [(c, s, inverse)]
+            elif cp == best_cp:
+                candidates.append((c, s, inverse))
+    best = None
+    for c, s, inverse in candidates:
+        d = conjugate(c, s)
+        state = (*d.co, *d.ep, *d.eo)
+        if best is None or state < best[0]:
+            best = state, d, s, inverse
+    _, d, s, inverse = best
+    key = (
+        (d.corner * Tables.TWIST + d.twist) * Tables.EDGE + d.edge
+    ) * Tables.FLIP + d.flip
+    return CanonicalForm(key, s, inverse)
+
+
+class SolutionCache:
+    """
+    Least recently used cache of solutions, shared between cubes equivalent
+    under the symmetries of the cube and inversion, see twophase.cache. Pass
+    an instance to twophase.solve to look up solutions before searching.
+
+    Parameters
+    ----------
+    maxsize : int, optional
+        Maximum number of solutions cached, the least recently used are
+        evicted first.
+
+    Attributes
+    ----------
+    hits, misses : int
+        Number of lookups that found a solution, and that didn't.
+    """
+
+    def __init__(self, maxsize=CACHE_SIZE):
+        if maxsize < 1:
+            raise ValueError(
+                "maxsize must be positive, got {}".format(maxsize)
+            )
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        # solutions of the canonical forms, by key
+        self._solutions = OrderedDict()
+
+    def __len__(self):
+        return len(self._solutions)
+
+    def __repr__(self):
+        return "SolutionCache(maxsize={}, size={}, hits={}, misses={})".format(
+            self.maxsize, len(self), self.hits, self.misses
+        )
+
+    def get(self, cube, max_length=None):
+        """
+        A cached solution of the cube, or None if there is none shorter than
+        max_length moves. cube is a cube string, or its canonical form if
+        already known (see canonical_form), e.g. to look it up and then put
+        its solution without computing the canonical form twice.
+        """
+        key, s, inverse = self._canonical_form(cube)
+        solution = self._solutions.get(key)
+        if solution is None or (
+            max_length is not None and len(solution.split()) >= max_length
+        ):
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._solutions.move_to_end(key)
+        return conjugate_solution(solution, s, inverse)
+
+    def put(self, cube, solution):
+        """
+        Cache a solution of the cube, unless a shorter one is already cached.
+        cube is a cube string or its canonical form, as for get.
+        """
+        key, s, inverse = self._canonical_form(cube)
+        # the cube is S^-1 * c' * S for the canonical form c', and the inverse
+        # of S^-1 is S
+        solution = conjugate_solution(solution, SYM_INV[s], inverse)
+        cached = self._solutions.get(key)
+        if cached is None or len(solution.split()) < len(cached.split()):
+            self._solutions[key] = solution
+        self._solutions.move_to_end(key)
+        if len(self._solutions) > self.maxsize:
+            self._solutions.popitem(last=False)
+
+    @staticmethod
+    def _canonical_form(cube):
+        return (
+            cube if isinstance(cube, CanonicalForm) else canonical_form(cube)
+        )
+
+    def clear(self):
+        """
+        Remove all cached solutions and reset the counters.
+        """
+        self._solutions.clear()
+        self.hits = self.misses = 0
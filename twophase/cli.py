@@ -0,0 +1,144 @@
+"""
+Command line solver, installed as the twophase script.
+
+Reads cube strings, one per line, from the files given or standard input, and
+solves them on a pool of worker processes (see twophase.solve_many), writing
+one JSON object per cube to standard output as it's solved:
+
+    {"index": 0, "cube": "...", "solution": "R U ...", "length": 21,
+     "nodes": 5234, "seconds": 0.084}
+
+with "error" in place of "solution" and "length" for cubes that couldn't be
+solved. index counts the non-blank input lines from 0, across all files.
+
+The tables are memory mapped (see Tables.configure) and loaded before the
+workers start, so the workers share a single copy of them and start solving
+straight away. Lines are only read as the workers become free, so input of
+any size is solved in constant memory.
+"""
+import argparse
+import fileinput
+import json
+import os
+import sys
+
+from .batch import solve_many
+from .tables import Tables
+
+
+def _cubes(lines):
+    for line in lines:
+        cube_string = line.strip()
+        if cube_string:
+            yield cube_string
+
+
+def _parser():
+    parser = argparse.ArgumentParser(
+        prog="twophase",
+        description=(
+            "Solve Rubik's cubes given as cube strings, one per line, "
+            "writing the results as JSON lines."
+        ),
+    )
+    parser.add_argument(
+        "files",
+        nargs="*",
+        metavar="FILE",
+        help="files of cube strings, standard input if none or -",
+    )
+    parser.add_argument(
+        "-j",
+        "--workers",
+        type=int,
+        help="number of worker processes, defaults to the number of cores",
+    )
+    parser.add_argument(
+        "--max-length",
+        type=int,
+        default=25,
+        help="upper bound for the number of moves (default %(default)s)",
+    )
+    parser.add_argument(
+        "--max-time",
+        type=float,
+        default=10,
+        help="time limit in seconds for each cube (default %(default)s)",
+    )
+    parser.add_argument(
+        "--max-nodes",
+        type=int,
+        help="maximum number of positions expanded for each cube",
+    )
+    parser.add_argument(
+        "--order",
+        choices=("input", "completion"),
+        default="input",
+        help=(
+            "write results in the order of the input, or as soon as each "
+            "cube is solved (default %(default)s)"
+        ),
+    )
+    return parser
+
+
+def main(argv=None):
+    """
+    Entry point of the twophase script. Returns 1 if any cube couldn't be
+    solved, 0 otherwise.
+    """
+    parser = _parser()
+    args = parser.parse_args(argv)
+    if args.workers is not None and args.workers < 1:
+        parser.error("--workers must be positive")
+
+    # workers inherit the mapped tables when forked, and otherwise map the
+    # same file when they start, see solve_many
+    Tables.load_tables(use_mmap=True)
+
+    failed = False
+    # the cube strings are echoed in the results, so those queued are kept
+    # until their results are written
+    queued = {}
+
+    def cubes(lines):
+        for index, cube_string in enumerate(_cubes(lines)):
+            queued[index] = cube_string
+            yield cube_string
+
+    with fileinput.input(args.files) as lines:
+        results = solve_many(
+            cubes(lines),
+            args.max_length,
+            args.max_time,
+            args.max_nodes,
+            args.workers,
+            ordered=args.order == "input",
+            details=True,
+        )
+        try:
+            for index, result, nodes, seconds in results:
+                record = {"index": index, "cube": queued.pop(index)}
+                if isinstance(result, Exception):
+                    failed = True
+                    record["error"] = str(result)
+                else:
+                    record["solution"] = result
+                    record["length"] = len(result.split())
+                record["nodes"] = nodes
+                record["seconds"] = round(seconds, 6)
+                sys.stdout.write(json.dumps(record) + "\n")
+                sys.stdout.flush()
+        except BrokenPipeError:
+            # the reader has gone, e.g. twophase ... | head, so stop the
+            # workers, and point stdout at devnull so that flushing it on
+            # exit doesn't fail again
+            results.close()
+            devnull = os.open(os.devnull, os.O_WRONLY)
+            os.dup2(devnull, sys.stdout.fileno())
+            return 1
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -23,6 +23,38 @@ def choose(n, k):
         return 0
 
 
+def _order_coordinate(pieces):
+    """
+    Encode the order of 4 pieces as an integer in 0, ..., 4! - 1, in the same
+    way as the edge4 coordinate.
+    """
+    ret = 0
+    for j in range(3, 0, -1):
+        s = 0
+        for i in range(j):
+            if pieces[i] > pieces[j]:
+                s += 1
+        ret = j * (ret + s)
+    return ret
+
+
+def _order_pieces(order, pieces):
+    """
+    Inverse of _order_coordinate, order the 4 pieces (given in increasing
+    order) according to the coordinate order.
+    """
+    pieces = list(pieces)
+    coeffs = [0] * 3
+    for i in range(1, 4):
+        coeffs[i - 1] = order % (i + 1)
+        order //= i + 1
+    perm = [0] * 4
+    for i in range(2, -1, -1):
+        perm[i + 1] = pieces.pop(i + 1 - coeffs[i])
+    perm[0] = pieces[0]
+    return perm
+
+
 # Moves on the cubie level, gives permutation and orientation after the moves
 # U, R, F, D, L, B resp from a clean cube. This will be used to compute move
 # tables and the composition rules.
@@ -189,6 +221,20 @@ _epB = (
 _eoB = (0, 0, 0, 1, 0, 0, 0, 1, 0, 0, 1, 1)
 
 
+def _multiply_orientation(a, b):
+    """
+    Combine corner orientations a and b when either is mirrored (>= 3), see
+    CubieCube.corner_multiply.
+    """
+    if a < 3 and b < 3:
+        return (a + b) % 3
+    if b >= 3:
+        # b is mirrored, so the product is mirrored unless a is too
+        return (a + b) % 3 + 3 if a < 3 else (a - b) % 3
+    # a is mirrored and b is regular, the product is mirrored
+    return (a - b) % 3 + 3
+
+
 class CubieCube:
     def __init__(self, cp=None, co=None, ep=None, eo=None):
         if cp and co and ep and eo:
@@ -254,9 +300,20 @@ class CubieCube:
         of the piece that moves to UBR under FR we use the rule
 
         (F*R).co[UBR] = F.co[R.cp[UBR]] + R.co[UBR].
+
+        Reflections of the cube (used as symmetries) reverse the direction of
+        corner orientations, so for those we store orientations 3, 4, 5 to mean
+        0, 1, 2 in a mirrored state. The orientations of a product involving
+        mirrored cubes are combined by the rules in _multiply_orientation.
         """
         corner_perm = [self.cp[b.cp[i]] for i in range(8)]
-        corner_ori = [(self.co[b.cp[i]] + b.co[i]) % 3 for i in range(8)]
+        if max(self.co) < 3 and max(b.co) < 3:
+            corner_ori = [(self.co[b.cp[i]] + b.co[i]) % 3 for i in range(8)]
+        else:
+            corner_ori = [
+                _multiply_orientation(self.co[b.cp[i]], b.co[i])
+                for i in range(8)
+            ]
         self.co = corner_ori[:]
         self.cp = corner_perm[:]
 
@@ -312,7 +369,8 @@ class CubieCube:
             cube.cp[self.cp[c]] = c
         for c in range(8):
             ori = self.co[cube.cp[c]]
-            cube.co[c] = (-ori) % 3
+            # a mirrored orientation is its own inverse
+            cube.co[c] = ori if ori >= 3 else (-ori) % 3
         return cube
 
     def to_facecube(self):
@@ -641,6 +699,141 @@ class CubieCube:
         perm[0] = corners[0]
         self.cp = perm[:]
 
+    # ----------  Phase 1 tracking of phase 2 coordinates  ---------- #
+    # the phase 2 coordinates edge4 and edge8 are only defined for cubes in
+    # phase 2 position. the following coordinates are defined for any cube,
+    # so can be updated with move tables during phase 1, and once the cube is
+    # in phase 2 position they determine edge4 and edge8.
+    @property
+    def udslice_sorted(self):
+        """
+        Compute udslice_sorted, the coordinate representing position and order
+        of the 4 edges FR, FL, BL, BR as 4! * udslice + order. Once the cube
+        is in phase 2 position udslice is 0, and udslice_sorted equals edge4.
+
+        udslice_sorted takes values in the range 0, ..., 12C4 * 4! - 1.
+        """
+        order = _order_coordinate([e for e in self.ep if 8 <= e < 12])
+        return 24 * self.udslice + order
+
+    @udslice_sorted.setter
+    def udslice_sorted(self, udslice_sorted):
+        """
+        Set the udslice_sorted of the cube. Edges other than FR, FL, BL, BR
+        are placed as by the udslice setter.
+
+        Parameters
+        ----------
+        udslice_sorted : int
+            Position and order of the 4 aforementioned edges encoded as
+            udslice_sorted coordinate. Must satisfy
+            0 <= udslice_sorted < 12C4 * 4!
+        """
+        if not 0 <= udslice_sorted < 24 * choose(12, 4):
+            raise ValueError(
+                "{} is out of range for udslice_sorted, must take values in "
+                "0, ..., 11879.".format(udslice_sorted)
+            )
+        self.udslice, order = divmod(udslice_sorted, 24)
+        self._place_edges(
+            [Edge.FR, Edge.FL, Edge.BL, Edge.BR],
+            [j for j in range(12) if 8 <= self.ep[j] < 12],
+            order,
+        )
+
+    @property
+    def u_edges(self):
+        """
+        Compute u_edges, the coordinate representing position and order of
+        the 4 edges UR, UF, UL, UB, see _edges_coordinate. Once the cube is in
+        phase 2 position u_edges < 8C4 * 4! = 1680.
+
+        u_edges takes values in the range 0, ..., 12C4 * 4! - 1.
+        """
+        return self._edges_coordinate(0)
+
+    @u_edges.setter
+    def u_edges(self, u_edges):
+        """
+        Set the u_edges of the cube. The remaining positions are filled with
+        the edges DR, DF, DL, DB, FR, FL, BL, BR in order.
+
+        Parameters
+        ----------
+        u_edges : int
+            Position and order of the 4 aforementioned edges encoded as
+            u_edges coordinate. Must satisfy 0 <= u_edges < 12C4 * 4!
+        """
+        self._set_edges_coordinate(0, u_edges, "u_edges")
+
+    @property
+    def d_edges(self):
+        """
+        Compute d_edges, the coordinate representing position and order of
+        the 4 edges DR, DF, DL, DB, see _edges_coordinate. Once the cube is in
+        phase 2 position d_edges < 8C4 * 4! = 1680.
+
+        d_edges takes values in the range 0, ..., 12C4 * 4! - 1.
+        """
+        return self._edges_coordinate(4)
+
+    @d_edges.setter
+    def d_edges(self, d_edges):
+        """
+        Set the d_edges of the cube. The remaining positions are filled with
+        the edges UR, UF, UL, UB, FR, FL, BL, BR in order.
+
+        Parameters
+        ----------
+        d_edges : int
+            Position and order of the 4 aforementioned edges encoded as
+            d_edges coordinate. Must satisfy 0 <= d_edges < 12C4 * 4!
+        """
+        self._set_edges_coordinate(4, d_edges, "d_edges")
+
+    def _edges_coordinate(self, first):
+        """
+        Position and order of the 4 edges first, ..., first + 3 encoded as
+        4! * positions + order. The positions p_0 < p_1 < p_2 < p_3 are
+        encoded as the sum of p_k C (k + 1), so that positions among the
+        first n take the values 0, ..., nC4 - 1.
+        """
+        positions = [j for j in range(12) if first <= self.ep[j] < first + 4]
+        comb = sum(choose(p, k + 1) for k, p in enumerate(positions))
+        order = _order_coordinate([self.ep[j] for j in positions])
+        return 24 * comb + order
+
+    def _set_edges_coordinate(self, first, coord, name):
+        """
+        Inverse of _edges_coordinate.
+        """
+        if not 0 <= coord < 24 * choose(12, 4):
+            raise ValueError(
+                "{} is out of range for {}, must take values in "
+                "0, ..., 11879.".format(coord, name)
+            )
+        comb, order = divmod(coord, 24)
+        positions = [0] * 4
+        for k in range(3, -1, -1):
+            p = k
+            while choose(p + 1, k + 1) <= comb:
+                p += 1
+            comb -= choose(p, k + 1)
+            positions[k] = p
+        others = iter(e for e in Edge if not first <= e < first + 4)
+        for j in range(12):
+            if j not in positions:
+                self.ep[j] = next(others)
+        self._place_edges(list(Edge)[first : first + 4], positions, order)
+
+    def _place_edges(self, edges, positions, order):
+        """
+        Place the 4 edges, given in increasing order, in the increasing
+        positions, ordered according to the coordinate order.
+        """
+        for j, e in zip(positions, _order_pieces(order, edges)):
+            self.ep[j] = e
+
     # ---------- Misc. Coordinates ---------- #
 
     # edge permutation coordinate not used in solving,
@@ -0,0 +1,238 @@
+"""
+Symmetries of the cube.
+
+The 48 symmetries of the cube are generated by four basic symmetries: a 120
+degree rotation around the long diagonal through URF and DBL (S_URF3), a 180
+degree rotation around the axis through F and B (S_F2), a 90 degree rotation
+around the axis through U and D (S_U4) and a reflection through the plane
+between L and R (S_LR2). Symmetry number
+
+    16 * a + 8 * b + 2 * c + d
+
+is S_URF3^a * S_F2^b * S_U4^c * S_LR2^d, for a < 3, b < 2, c < 4, d < 2. In
+particular the first 16 symmetries are exactly those that preserve the UD
+axis, which are the symmetries of the phase 2 subgroup.
+
+The tables of the symmetries are computed the first time they're used, so
+that importing the module is cheap.
+"""
+import threading
+
+from ..pieces import Corner, Edge
+from .cubiecube import MOVE_CUBE, CubieCube
+
+# total number of symmetries, and number preserving the UD axis
+N_SYM = 48
+N_SYM_UD = 16
+
+_cpURF3 = [
+    Corner.URF,
+    Corner.DFR,
+    Corner.DLF,
+    Corner.UFL,
+    Corner.UBR,
+    Corner.DRB,
+    Corner.DBL,
+    Corner.ULB,
+]
+_coURF3 = [1, 2, 1, 2, 2, 1, 2, 1]
+_epURF3 = [
+    Edge.UF,
+    Edge.FR,
+    Edge.DF,
+    Edge.FL,
+    Edge.UB,
+    Edge.BR,
+    Edge.DB,
+    Edge.BL,
+    Edge.UR,
+    Edge.DR,
+    Edge.DL,
+    Edge.UL,
+]
+_eoURF3 = [1, 0, 1, 0, 1, 0, 1, 0, 1, 1, 1, 1]
+
+_cpF2 = [
+    Corner.DLF,
+    Corner.DFR,
+    Corner.DRB,
+    Corner.DBL,
+    Corner.UFL,
+    Corner.URF,
+    Corner.UBR,
+    Corner.ULB,
+]
+_coF2 = [0, 0, 0, 0, 0, 0, 0, 0]
+_epF2 = [
+    Edge.DL,
+    Edge.DF,
+    Edge.DR,
+    Edge.DB,
+    Edge.UL,
+    Edge.UF,
+    Edge.UR,
+    Edge.UB,
+    Edge.FL,
+    Edge.FR,
+    Edge.BR,
+    Edge.BL,
+]
+_eoF2 = [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0]
+
+_cpU4 = [
+    Corner.UBR,
+    Corner.URF,
+    Corner.UFL,
+    Corner.ULB,
+    Corner.DRB,
+    Corner.DFR,
+    Corner.DLF,
+    Corner.DBL,
+]
+_coU4 = [0, 0, 0, 0, 0, 0, 0, 0]
+_epU4 = [
+    Edge.UB,
+    Edge.UR,
+    Edge.UF,
+    Edge.UL,
+    Edge.DB,
+    Edge.DR,
+    Edge.DF,
+    Edge.DL,
+    Edge.BR,
+    Edge.FR,
+    Edge.FL,
+    Edge.BL,
+]
+_eoU4 = [0, 0, 0, 0, 0, 0, 0, 0, 1, 1, 1, 1]
+
+# orientations 3, 4, 5 represent the mirrored orientations of a reflection
+_cpLR2 = [
+    Corner.UFL,
+    Corner.URF,
+    Corner.UBR,
+    Corner.ULB,
+    Corner.DLF,
+    Corner.DFR,
+    Corner.DRB,
+    Corner.DBL,
+]
+_coLR2 = [3, 3, 3, 3, 3, 3, 3, 3]
+_epLR2 = [
+    Edge.UL,
+    Edge.UF,
+    Edge.UR,
+    Edge.UB,
+    Edge.DL,
+    Edge.DF,
+    Edge.DR,
+    Edge.DB,
+    Edge.FL,
+    Edge.FR,
+    Edge.BR,
+    Edge.BL,
+]
+_eoLR2 = [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0]
+
+_S_URF3 = CubieCube(_cpURF3, _coURF3, _epURF3, _eoURF3)
+_S_F2 = CubieCube(_cpF2, _coF2, _epF2, _eoF2)
+_S_U4 = CubieCube(_cpU4, _coU4, _epU4, _eoU4)
+_S_LR2 = CubieCube(_cpLR2, _coLR2, _epLR2, _eoLR2)
+
+
+def _copy(cube):
+    return CubieCube(cube.cp, cube.co, cube.ep, cube.eo)
+
+
+def _same(a, b):
+    return a.cp == b.cp and a.co == b.co and a.ep == b.ep and a.eo == b.eo
+
+
+# the tables below are computed on first use rather than on import, see
+# _build_tables:
+#
+# SYM_CUBE[s] is the cubie level representation of symmetry s
+# SYM_INV[s] is the index of the inverse of symmetry s
+# MOVE_CUBE_18[mv] is the cubie level representation of move mv = 3 * i + j,
+# i.e. j + 1 clockwise quarter turns of face i
+# MOVE_CONJ[18 * s + mv] is the move S * mv * S^-1
+_TABLES = ("SYM_CUBE", "SYM_INV", "MOVE_CUBE_18", "MOVE_CONJ")
+_lock = threading.Lock()
+
+
+def _conjugate(cube, s, sym_cube, sym_inv):
+    cc = _copy(sym_cube[s])
+    cc.multiply(cube)
+    cc.multiply(sym_cube[sym_inv[s]])
+    return cc
+
+
+def _build_tables():
+    """
+    Compute the tables in _TABLES and set them as globals of the module.
+    """
+    global SYM_CUBE, SYM_INV, MOVE_CUBE_18, MOVE_CONJ
+    with _lock:
+        if "MOVE_CONJ" in globals():
+            return
+
+        sym_cube = []
+        cc = CubieCube()
+        for _ in range(3):
+            for _ in range(2):
+                for _ in range(4):
+                    for _ in range(2):
+                        sym_cube.append(_copy(cc))
+                        cc.multiply(_S_LR2)
+                    cc.multiply(_S_U4)
+                cc.multiply(_S_F2)
+            cc.multiply(_S_URF3)
+
+        sym_inv = [0] * N_SYM
+        for s in range(N_SYM):
+            for t in range(N_SYM):
+                cc = _copy(sym_cube[s])
+                cc.multiply(sym_cube[t])
+                if _same(cc, CubieCube()):
+                    sym_inv[s] = t
+                    break
+
+        move_cube_18 = []
+        for i in range(6):
+            cc = CubieCube()
+            for _ in range(3):
+                cc.multiply(MOVE_CUBE[i])
+                move_cube_18.append(_copy(cc))
+
+        move_conj = [0] * (N_SYM * 18)
+        for s in range(N_SYM):
+            for mv in range(18):
+                cc = _conjugate(move_cube_18[mv], s, sym_cube, sym_inv)
+                for m in range(18):
+                    if _same(cc, move_cube_18[m]):
+                        move_conj[18 * s + mv] = m
+                        break
+
+        # MOVE_CONJ last, as it marks the tables as built
+        SYM_CUBE = sym_cube
+        SYM_INV = sym_inv
+        MOVE_CUBE_18 = move_cube_18
+        MOVE_CONJ = move_conj
+
+
+def __getattr__(name):
+    if name in _TABLES:
+        _build_tables()
+        return globals()[name]
+    raise AttributeError(
+        "module {!r} has no attribute {!r}".format(__name__, name)
+    )
+
+
+def conjugate(cube, s):
+    """
+    Conjugate cube by symmetry s, returning S * cube * S^-1 as a new cube.
+    """
+    if "MOVE_CONJ" not in globals():
+        _build_tables()
+    return _conjugate(cube, s, SYM_CUBE, SYM_INV)
@@ -0,0 +1,460 @@
+"""
+NumPy implementation of the table builders in Tables.
+
+Move tables are built by decoding every value of a coordinate into an array of
+cubie states at once, applying each move to all of them with a single gather,
+and encoding the results. Pruning tables are built by breadth first search
+where each depth's frontier is expanded with vectorised gathers over the move
+tables. The tables produced are identical to those of the pure Python
+builders, this module is used automatically when NumPy is installed.
+"""
+from array import array
+from itertools import permutations
+
+import numpy as np
+
+from .cubes.cubiecube import MOVE_CUBE, CubieCube, choose
+from .tables import (
+    COMBINE_TABLES,
+    MOVE_TABLES,
+    PHASE_1_MOVES,
+    PHASE_2_MOVES,
+    PRUNING_TABLES,
+)
+
+# numpy equivalents of the typecodes used in the table file
+_DTYPES = {"b": np.int8, "B": np.uint8, "h": np.int16, "i": np.intc}
+
+_CP = [np.array(cube.cp, dtype=np.intp) for cube in MOVE_CUBE]
+_CO = [np.array(cube.co, dtype=np.int64) for cube in MOVE_CUBE]
+_EP = [np.array(cube.ep, dtype=np.intp) for cube in MOVE_CUBE]
+_EO = [np.array(cube.eo, dtype=np.int64) for cube in MOVE_CUBE]
+
+# number of entries scanned at once by the symmetry reduced searches
+_BLOCK = 1 << 22
+
+
+def _encode_perm(perm):
+    """
+    Vectorised version of the permutation coordinates of CubieCube (corner,
+    edge8, edge4). perm has one row per cube.
+    """
+    coord = np.zeros(len(perm), dtype=np.int64)
+    for j in range(perm.shape[1] - 1, 0, -1):
+        s = (perm[:, :j] > perm[:, j : j + 1]).sum(axis=1)
+        coord = j * (coord + s)
+    return coord
+
+
+def _decode_perm(pieces):
+    """
+    All permutations of pieces, with row i having permutation coordinate i.
+    """
+    perm = np.array(list(permutations(pieces)), dtype=np.int64)
+    decoded = np.empty_like(perm)
+    decoded[_encode_perm(perm)] = perm
+    return decoded
+
+
+def _encode_twist(co):
+    return co[:, :7] @ (3 ** np.arange(6, -1, -1))
+
+
+def _encode_flip(eo):
+    return eo[:, :11] @ (2 ** np.arange(10, -1, -1))
+
+
+def _encode_udslice(ep):
+    udslice = np.zeros(len(ep), dtype=np.int64)
+    seen = np.zeros(len(ep), dtype=np.int64)
+    # binomial coefficients choose(j, k) for k = seen - 1 in 0, ..., 3
+    binom = np.array(
+        [[0] + [choose(j, k) for k in range(4)] for j in range(12)],
+        dtype=np.int64,
+    )
+    for j in range(12):
+        in_slice = ep[:, j] >= 8
+        udslice += np.where(in_slice, 0, binom[j][seen])
+        seen += in_slice
+    return udslice
+
+
+def _encode_edges(ep, first):
+    """
+    Vectorised version of CubieCube._edges_coordinate.
+    """
+    mask = (ep >= first) & (ep < first + 4)
+    positions = np.nonzero(mask)[1].reshape(-1, 4)
+    binom = np.array(
+        [[choose(j, k + 1) for k in range(4)] for j in range(12)],
+        dtype=np.int64,
+    )
+    comb = binom[positions, np.arange(4)].sum(axis=1)
+    return 24 * comb + _encode_perm(ep[mask].reshape(-1, 4))
+
+
+def _encode_udslice_sorted(ep):
+    order = _encode_perm(ep[ep >= 8].reshape(-1, 4))
+    return 24 * _encode_udslice(ep) + order
+
+
+def _decode_edges(coord, size):
+    """
+    Edge permutations of cubes with each value of a coordinate of
+    CubieCube, decoded with its setter.
+    """
+    ep = np.empty((size, 12), dtype=np.int64)
+    cc = CubieCube()
+    for i in range(size):
+        setattr(cc, coord, i)
+        ep[i] = cc.ep
+    return ep
+
+
+def _make_move_table(states, multiply, encode, n_states, moves, allowed):
+    """
+    Build a move table by applying each of the 6 face turns repeatedly to the
+    array of states, where states[i] is a cube with coordinate i. Entries for
+    moves not in allowed are set to -1.
+    """
+    table = np.full((n_states, moves), -1, dtype=np.int64)
+    for j in range(6):
+        a = states
+        for k in range(3):
+            a = multiply(a, j)
+            if 3 * j + k in allowed:
+                table[:, 3 * j + k] = encode(a)
+    return table
+
+
+def _corner_multiply(state, j):
+    cp, co = state
+    return cp[:, _CP[j]], (co[:, _CP[j]] + _CO[j]) % 3
+
+
+def _edge_multiply(state, j):
+    ep, eo = state
+    return ep[:, _EP[j]], (eo[:, _EP[j]] + _EO[j]) % 2
+
+
+def _move_tables(cls):
+    tables = {}
+    all_moves = set(PHASE_1_MOVES)
+    phase_2 = set(PHASE_2_MOVES)
+
+    def identity(n, size):
+        return np.tile(np.arange(size, dtype=np.int64), (n, 1))
+
+    # twist: corner orientations, permutation is irrelevant
+    twist = np.arange(cls.TWIST)
+    co = np.zeros((cls.TWIST, 8), dtype=np.int64)
+    for i in range(7):
+        co[:, 6 - i] = twist // 3 ** i % 3
+    co[:, 7] = -co[:, :7].sum(axis=1) % 3
+    tables["twist_move"] = _make_move_table(
+        (identity(cls.TWIST, 8), co),
+        _corner_multiply,
+        lambda state: _encode_twist(state[1]),
+        cls.TWIST,
+        cls.MOVES,
+        all_moves,
+    )
+
+    # flip: edge orientations, permutation is irrelevant
+    flip = np.arange(cls.FLIP)
+    eo = np.zeros((cls.FLIP, 12), dtype=np.int64)
+    for i in range(11):
+        eo[:, 10 - i] = flip // 2 ** i % 2
+    eo[:, 11] = -eo[:, :11].sum(axis=1) % 2
+    tables["flip_move"] = _make_move_table(
+        (identity(cls.FLIP, 12), eo),
+        _edge_multiply,
+        lambda state: _encode_flip(state[1]),
+        cls.FLIP,
+        cls.MOVES,
+        all_moves,
+    )
+
+    # udslice: only the set of positions of the slice edges matters
+    slice_positions = np.zeros((cls.UDSLICE, 12), dtype=np.int64)
+    mask = np.array(
+        [
+            [8 if i in positions else 0 for i in range(12)]
+            for positions in _combinations(12, 4)
+        ],
+        dtype=np.int64,
+    )
+    slice_positions[_encode_udslice(mask)] = mask
+    tables["udslice_move"] = _make_move_table(
+        (slice_positions, np.zeros((cls.UDSLICE, 12), dtype=np.int64)),
+        _edge_multiply,
+        lambda state: _encode_udslice(state[0]),
+        cls.UDSLICE,
+        cls.MOVES,
+        all_moves,
+    )
+
+    # edge4: permutation of the slice edges in the slice
+    ep = np.hstack([identity(cls.EDGE4, 8), _decode_perm(range(8, 12))])
+    tables["edge4_move"] = _make_move_table(
+        (ep, np.zeros((cls.EDGE4, 12), dtype=np.int64)),
+        _edge_multiply,
+        lambda state: _encode_perm(state[0][:, 8:]),
+        cls.EDGE4,
+        cls.MOVES,
+        phase_2,
+    )
+
+    # edge8: permutation of the U and D edges in the U and D layers
+    ep = np.hstack([_decode_perm(range(8)), identity(cls.EDGE8, 12)[:, 8:]])
+    tables["edge8_move"] = _make_move_table(
+        (ep, np.zeros((cls.EDGE8, 12), dtype=np.int64)),
+        _edge_multiply,
+        lambda state: _encode_perm(state[0][:, :8]),
+        cls.EDGE8,
+        cls.MOVES,
+        phase_2,
+    )
+
+    # corner: permutation of the corners
+    tables["corner_move"] = _make_move_table(
+        (_decode_perm(range(8)), np.zeros((cls.CORNER, 8), dtype=np.int64)),
+        _corner_multiply,
+        lambda state: _encode_perm(state[0]),
+        cls.CORNER,
+        cls.MOVES,
+        all_moves,
+    )
+
+    # position and order of the slice, U and D edges, tracked in phase 1
+    for coord, encode in (
+        ("udslice_sorted", _encode_udslice_sorted),
+        ("u_edges", lambda ep: _encode_edges(ep, 0)),
+        ("d_edges", lambda ep: _encode_edges(ep, 4)),
+    ):
+        size = getattr(cls, coord.upper())
+        tables[coord + "_move"] = _make_move_table(
+            (_decode_edges(coord, size), np.zeros((size, 12), dtype=np.int64)),
+            _edge_multiply,
+            lambda state, encode=encode: encode(state[0]),
+            size,
+            cls.MOVES,
+            all_moves,
+        )
+    return tables
+
+
+def _combinations(n, k):
+    """
+    All k element subsets of range(n).
+    """
+    if k == 0:
+        return [()]
+    return [
+        c + (last,)
+        for last in range(k - 1, n)
+        for c in _combinations(last, k - 1)
+    ]
+
+
+def _prune_table(move_0, move_1, moves):
+    """
+    Breadth first search over pairs of coordinates, where index
+    x0 * len(move_1) + x1 stores the distance of (x0, x1) to (0, 0).
+    """
+    stride = len(move_1)
+    size = len(move_0) * stride
+    move_0 = move_0[:, list(moves)]
+    move_1 = move_1[:, list(moves)]
+    table = np.full(size, -1, dtype=np.int8)
+    table[0] = 0
+    count, depth = 1, 0
+    while count < size:
+        frontier = np.flatnonzero(table == depth)
+        x0, x1 = np.divmod(frontier, stride)
+        x = (move_0[x0] * stride + move_1[x1]).ravel()
+        table[x[table[x] == -1]] = depth + 1
+        depth += 1
+        count += np.count_nonzero(table == depth)
+    return table
+
+
+def _sym_prune_table(
+    classidx, sym, rep, sym_state, conj, raw_move, other_move, moves
+):
+    """
+    Vectorised version of symmetry_tables.make_sym_prune, returning the
+    distances unpacked. The table is scanned in blocks to bound the memory
+    used by each depth's frontier.
+    """
+    classidx = np.asarray(classidx, dtype=np.int64)
+    sym = np.asarray(sym, dtype=np.int64)
+    rep = np.asarray(rep, dtype=np.int64)
+    sym_state = np.asarray(sym_state, dtype=np.int64)
+    conj = np.asarray(conj, dtype=np.int64)
+    n_sym = len(conj) // len(other_move)
+    n_other = len(other_move)
+    total = len(rep) * n_other
+
+    def neighbour(x, y, mv):
+        x1 = raw_move(x, mv)
+        c1 = classidx[x1]
+        return c1, conj[n_sym * other_move[y, mv] + sym[x1]]
+
+    table = np.full(total, -1, dtype=np.int8)
+    table[0] = 0
+    done, depth, frontier = 1, 0, 1
+    while done < total:
+        backwards = total - done < frontier
+        for start in range(0, total, _BLOCK):
+            block = table[start : start + _BLOCK]
+            index = np.flatnonzero(block == (-1 if backwards else depth))
+            index += start
+            c, y = np.divmod(index, n_other)
+            x = rep[c]
+            for mv in moves:
+                if not len(index):
+                    break
+                c1, y1 = neighbour(x, y, mv)
+                if backwards:
+                    found = table[n_other * c1 + y1] == depth
+                    table[index[found]] = depth + 1
+                    index, x, y = index[~found], x[~found], y[~found]
+                    continue
+
+                new = table[n_other * c1 + y1] == -1
+                c1, y1 = c1[new], y1[new]
+                table[n_other * c1 + y1] = depth + 1
+                # positions whose representative is fixed by some symmetries
+                # have other entries in the table
+                fixed = sym_state[c1] > 1
+                c1, y1, state = c1[fixed], y1[fixed], sym_state[c1[fixed]]
+                for s in range(1, n_sym):
+                    has = (state >> s) & 1 == 1
+                    i2 = n_other * c1[has] + conj[n_sym * y1[has] + s]
+                    table[i2[table[i2] == -1]] = depth + 1
+        depth += 1
+        frontier = np.count_nonzero(table == depth)
+        done += frontier
+    return table
+
+
+def make_flipslice_twist_prune(
+    cls, classidx, sym, rep, sym_state, twist_conj, moves
+):
+    """
+    Vectorised version of the pruning table built by
+    symmetry_tables.build_flipslice_twist_tables, returned packed.
+    """
+    udslice_move = _read_move_table(cls, "udslice_move")
+    flip_move = _read_move_table(cls, "flip_move")
+    twist_move = _read_move_table(cls, "twist_move")
+
+    def raw_move(x, mv):
+        udslice, flip = np.divmod(x, cls.FLIP)
+        return cls.FLIP * udslice_move[udslice, mv] + flip_move[flip, mv]
+
+    table = _sym_prune_table(
+        classidx, sym, rep, sym_state, twist_conj, raw_move, twist_move, moves
+    )
+    return pack_mod3(table)
+
+
+def make_corner_edge8_prune(
+    cls, classidx, sym, rep, sym_state, edge8_conj, moves
+):
+    """
+    Vectorised version of the pruning table built by
+    symmetry_tables.build_corner_edge8_tables, returned packed.
+    """
+    corner_move = _read_move_table(cls, "corner_move")
+    edge8_move = _read_move_table(cls, "edge8_move")
+
+    def raw_move(x, mv):
+        return corner_move[x, mv]
+
+    table = _sym_prune_table(
+        classidx, sym, rep, sym_state, edge8_conj, raw_move, edge8_move, moves
+    )
+    return pack_mod3(table)
+
+
+def make_corner_twist_prune(
+    cls, classidx, sym, rep, sym_state, twist_conj, moves
+):
+    """
+    Vectorised version of the pruning table built by
+    symmetry_tables.build_corner_twist_tables, returned packed.
+    """
+    corner_move = _read_move_table(cls, "corner_move")
+    twist_move = _read_move_table(cls, "twist_move")
+
+    def raw_move(x, mv):
+        return corner_move[x, mv]
+
+    table = _sym_prune_table(
+        classidx, sym, rep, sym_state, twist_conj, raw_move, twist_move, moves
+    )
+    return pack_mod3(table)
+
+
+def _read_move_table(cls, name):
+    return np.asarray(cls._read_table(name), dtype=np.int64).reshape(
+        -1, cls.MOVES
+    )
+
+
+def pack_mod3(table):
+    """
+    Vectorised version of tables.pack_mod3.
+    """
+    padded = np.zeros((len(table) + 3) // 4 * 4, dtype=np.uint8)
+    padded[: len(table)] = table % 3
+    padded = padded.reshape(-1, 4)
+    return (
+        padded[:, 0]
+        | (padded[:, 1] << 2)
+        | (padded[:, 2] << 4)
+        | (padded[:, 3] << 6)
+    )
+
+
+def _to_array(table, typecode):
+    arr = array(typecode)
+    arr.frombytes(
+        np.ascontiguousarray(table, dtype=_DTYPES[typecode]).tobytes()
+    )
+    return arr
+
+
+def build_tables(cls):
+    """
+    Build all tables from scratch, returning the same mapping of table name to
+    array as Tables.build_tables.
+    """
+    move = _move_tables(cls)
+    pruning = {
+        "udslice_twist_prune": _prune_table(
+            move["udslice_move"], move["twist_move"], PHASE_1_MOVES
+        ),
+        "udslice_flip_prune": _prune_table(
+            move["udslice_move"], move["flip_move"], PHASE_1_MOVES
+        ),
+        "edge4_edge8_prune": _prune_table(
+            move["edge4_move"], move["edge8_move"], PHASE_2_MOVES
+        ),
+        "edge4_corner_prune": _prune_table(
+            move["edge4_move"], move["corner_move"], PHASE_2_MOVES
+        ),
+    }
+
+    tables = {}
+    for name, typecode in MOVE_TABLES.items():
+        tables[name] = _to_array(move[name], typecode)
+    for name, typecode in COMBINE_TABLES.items():
+        builder = getattr(cls, "make_{}_table".format(name))
+        tables[name] = array(typecode, builder())
+    for name in PRUNING_TABLES:
+        tables[name] = _to_array(pruning[name], "b")
+        tables[name + "_packed"] = _to_array(pack_mod3(pruning[name]), "B")
+    return tables
@@ -0,0 +1,273 @@
+"""
+Optimal solver, finding a shortest solution of a cube.
+
+The two phase algorithm only ever bounds the length of the shortest solution
+from above. Here a single IDA* search runs over the whole cube instead, with
+lower bounds from two pattern databases:
+
+* corner_twist_prune, the exact number of moves needed to solve the corners,
+  covering all 8! * 3^7 (about 88 million) positions of the corners, stored
+  reduced by the 16 symmetries preserving the UD axis.
+* flipslice_twist_prune, the symmetry reduced phase 1 pruning table, which
+  gives the number of moves needed to orient the edges and corners and bring
+  the four edges of one slice into that slice. It's looked up for each of the
+  three axes by conjugating the cube with S_URF3, which maps the RL and FB
+  axes onto the UD axis, so it bounds the moves needed to place the edges of
+  all three slices.
+
+There is no pattern database of the permutation of the edges, such as the
+symmetry reduced databases of 6 or 7 edges used by fast optimal solvers, so
+the positions of the edges are only bounded through flipslice_twist_prune.
+The search therefore slows down about tenfold with each move beyond 14 or
+so, and random cubes, which mostly need 17 or 18 moves, are out of reach.
+
+Since random cubes can't be solved in practice, the optimal solver isn't
+exported from the twophase package, and is only meant for cubes known to be
+fairly close to solved. Use optimal_solve, or OptimalSolutionManager directly.
+
+The first solution found by IDA* is a shortest one. The tables take a few
+minutes to build with NumPy the first time they are used, and are memory
+mapped like the others when configured to be, see Tables.configure.
+"""
+import time
+
+from .cubes.symmetry import MOVE_CONJ, conjugate
+from .solve import (
+    CHECK_INTERVAL,
+    PHASE_1_SUCCESSORS,
+    STATUS_ERRORS,
+    SolutionManager,
+)
+
+# God's number, every cube can be solved in at most 20 moves
+GODS_NUMBER = 20
+
+# the move of the cube conjugated by S_URF3^r corresponding to each move of
+# the cube, for each axis r (see twophase.cubes.symmetry)
+AXIS_MOVES = tuple(
+    tuple(MOVE_CONJ[18 * 16 * r + mv] for mv in range(18)) for r in range(3)
+)
+
+
+class OptimalSolutionManager(SolutionManager):
+    """
+    Finds a shortest solution of a cube with a single IDA* search, see
+    twophase.optimal. solve takes the same limits as SolutionManager.solve.
+
+    The coordinates of the cube conjugated for each axis r are stored in
+    twist[r], flip[r], udslice[r] and udslice_sorted[r], indexed by ply as in
+    SolutionManager, with twist[0] etc. those of the cube itself, and likewise
+    their distances in flipslice_twist_prune in flipslice_twist_dist[r].
+    """
+
+    def solve(
+        self,
+        max_length=GODS_NUMBER + 1,
+        timeout=float("inf"),
+        stats=None,
+        max_nodes=None,
+        check_interval=CHECK_INTERVAL,
+        prefix=(),
+        shared_length=None,
+        phase_1_depth=None,
+        resume=False,
+        stop=None,
+    ):
+        """
+        Find a shortest solution of the cube.
+
+        Returns the solution as a string, -1 if there is no solution within
+        max_length moves, -2 if the time limit was exceeded, -3 if the node
+        budget was exhausted and -4 if stop was cancelled, as
+        SolutionManager.solve.
+
+        Takes the same arguments as SolutionManager.solve, max_length
+        defaulting to enough moves for any cube. The search has no phases
+        and finds a single solution, so stats, prefix, phase_1_depth and
+        resume aren't supported, and raise ValueError if given.
+        """
+        for name, value, default in (
+            ("stats", stats, None),
+            ("prefix", tuple(prefix), ()),
+            ("phase_1_depth", phase_1_depth, None),
+            ("resume", resume, False),
+        ):
+            if value != default:
+                raise ValueError(
+                    "{} isn't supported by the optimal solver".format(name)
+                )
+        return super().solve(
+            max_length,
+            timeout,
+            max_nodes=max_nodes,
+            check_interval=check_interval,
+            shared_length=shared_length,
+            stop=stop,
+        )
+
+    def _load_tables(self):
+        for name in (
+            "corner_move",
+            "twist_move",
+            "flip_move",
+            "udslice_move",
+            "udslice_sorted_move",
+            "corner_twist_prune",
+            "flipslice_twist_prune",
+        ):
+            getattr(self.tables, name)
+
+    def _solve(self, max_length, phase_1_depth=None, resume=False):
+        # phase_1_depth and resume are rejected by solve
+        self._initialise(max_length)
+        depth = max(
+            self.corner_twist_dist[0],
+            *(dist[0] for dist in self.flipslice_twist_dist),
+        )
+        while depth < self._allowed_length:
+            n = self._search(0, depth)
+            if n >= 0:
+                return self._solution_to_string(n)
+            elif n < -1:
+                # time limit exceeded or node budget exhausted
+                return n
+            depth += 1
+        return -1
+
+    def _initialise(self, max_length):
+        # ply max_length is reached by the last move of the longest solutions
+        # searched for
+        size = max_length + 1
+        self.axis = [0] * size
+        self.power = [0] * size
+        self.corner = [0] * size
+        self.corner_twist_dist = [0] * size
+        self.twist = [[0] * size for _ in range(3)]
+        self.flip = [[0] * size for _ in range(3)]
+        self.udslice = [[0] * size for _ in range(3)]
+        self.udslice_sorted = [[0] * size for _ in range(3)]
+        self.flipslice_twist_dist = [[0] * size for _ in range(3)]
+
+        tables = self.tables
+        cc = self._cubiecube
+        self.corner[0] = cc.corner
+        self.corner_twist_dist[0] = tables.corner_twist_prune.distance(
+            (cc.corner, cc.twist)
+        )
+        for r in range(3):
+            c = conjugate(cc, 16 * r)
+            self.twist[r][0] = c.twist
+            self.flip[r][0] = c.flip
+            self.udslice[r][0] = c.udslice
+            self.udslice_sorted[r][0] = c.udslice_sorted
+            self.flipslice_twist_dist[r][
+                0
+            ] = tables.flipslice_twist_prune.distance(
+                (c.udslice, c.flip, c.twist)
+            )
+
+    def _search(self, n, depth):
+        """
+        Search for solutions of exactly depth more moves from ply n.
+        """
+        if depth == 0:
+            return n if self._is_solved(n) else -1
+
+        for i, j, mv in PHASE_1_SUCCESSORS[self.axis[n - 1] if n else 6]:
+            if not self._countdown:
+                status = self._check_limits()
+                if status:
+                    return status
+                if n + depth >= self._allowed_length:
+                    # the bound was tightened by another search
+                    return -1
+            self._countdown -= 1
+
+            if self._play(n, mv, depth - 1):
+                self.axis[n] = i
+                self.power[n] = j
+                m = self._search(n + 1, depth - 1)
+                if m != -1:
+                    return m
+        return -1
+
+    def _play(self, n, mv, depth):
+        """
+        Apply the move mv to the position at ply n, returning False if the
+        position reached can't be solved in depth moves.
+        """
+        tables = self.tables
+        twist_move = tables.twist_move
+        corner = self.corner[n + 1] = tables.corner_move[
+            18 * self.corner[n] + mv
+        ]
+        twist = self.twist[0][n + 1] = twist_move[18 * self.twist[0][n] + mv]
+        dist = self.corner_twist_dist[
+            n + 1
+        ] = tables.corner_twist_prune.distance(
+            (corner, twist), self.corner_twist_dist[n]
+        )
+        if dist > depth:
+            return False
+
+        flipslice_twist_prune = tables.flipslice_twist_prune
+        for r in range(3):
+            m = AXIS_MOVES[r][mv]
+            if r:
+                twist = self.twist[r][n + 1] = twist_move[
+                    18 * self.twist[r][n] + m
+                ]
+            flip = self.flip[r][n + 1] = tables.flip_move[
+                18 * self.flip[r][n] + m
+            ]
+            udslice = self.udslice[r][n + 1] = tables.udslice_move[
+                18 * self.udslice[r][n] + m
+            ]
+            dist = self.flipslice_twist_dist[r][
+                n + 1
+            ] = flipslice_twist_prune.distance(
+                (udslice, flip, twist), self.flipslice_twist_dist[r][n]
+            )
+            if dist > depth:
+                return False
+            self.udslice_sorted[r][n + 1] = tables.udslice_sorted_move[
+                18 * self.udslice_sorted[r][n] + m
+            ]
+        return True
+
+    def _is_solved(self, n):
+        """
+        Whether the position at ply n is solved. The corners are solved if
+        their pattern database gives 0, the edges if the four edges of each
+        slice are in place and in order.
+        """
+        return (
+            self.corner_twist_dist[n] == 0
+            and self.flip[0][n] == 0
+            and not any(self.udslice_sorted[r][n] for r in range(3))
+        )
+
+
+def optimal_solve(
+    cube_string, max_length=GODS_NUMBER + 1, max_time=60, max_nodes=None
+):
+    """
+    Find a shortest solution of the cube specified by cube_string, as long as
+    max_time is not exceeded and at most max_nodes positions are expanded.
+
+    Unlike twophase.solve, the solution is guaranteed to be as short as
+    possible, but finding it takes far longer for cubes needing more than
+    about 14 moves, and random cubes (mostly 17 or 18 moves) are out of
+    reach, see twophase.optimal.
+    """
+    sm = OptimalSolutionManager(cube_string)
+    solution = sm.solve(
+        max_length, time.time() + max_time, max_nodes=max_nodes
+    )
+    if isinstance(solution, str):
+        return solution
+    elif solution in STATUS_ERRORS:
+        raise RuntimeError(STATUS_ERRORS[solution])
+    raise RuntimeError(
+        f"OptimalSolutionManager.solve: unexpected return value {solution}"
+    )
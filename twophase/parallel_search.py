@@ -0,0 +1,175 @@
+"""
+Search for ever shorter solutions on a pool of worker processes.
+
+The phase 1 search tree is split by the first moves of the solution: each
+task runs the phase 1 search of a single depth over only the solutions
+starting with a given sequence of moves (see the prefix and phase_1_depth
+arguments of SolutionManager.solve), or fewer moves for the shallower
+depths. The tasks are queued in order of depth, so between them the workers
+deepen the search in the same order as a single process would.
+
+Every worker searches for solutions shorter than the best found by any of
+them, which is shared between the processes and read again periodically
+during each search, so a shorter solution found by one worker tightens the
+bound of every other straight away.
+"""
+import queue
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import Queue, Value
+
+from .solve import PHASE_1_SUCCESSORS, SolutionManager
+from .tables import Tables
+
+# number of moves fixed by each task, giving 243 tasks for each phase 1 depth
+# from 2 on
+SPLIT_DEPTH = 2
+
+# length of the best solution found by any worker and the queue of solutions
+# found, shared between the worker processes, see _initialise_worker
+_best_length = None
+_solutions = None
+
+
+def prefixes(split_depth=SPLIT_DEPTH):
+    """
+    All sequences of split_depth moves that can start a solution, as pairs of
+    face and number of clockwise quarter turns.
+    """
+    ret = [()]
+    for _ in range(split_depth):
+        ret = [
+            prefix + ((i, j),)
+            for prefix in ret
+            for i, j, _ in PHASE_1_SUCCESSORS[prefix[-1][0] if prefix else 6]
+        ]
+    return ret
+
+
+def _initialise_worker(best_length, solutions, configuration):
+    global _best_length, _solutions
+    _best_length = best_length
+    _solutions = solutions
+    Tables.configure_worker(configuration)
+
+
+def _search_prefix(cube_string, prefix, depth, timeout):
+    """
+    Search for solutions starting with prefix, with a phase 1 part of depth
+    moves, that are shorter than the best found by any worker, putting each
+    one found on the solutions queue. Returns the status of the last search,
+    see SolutionManager.solve.
+    """
+    sm = None
+    resume = False
+    while True:
+        max_length = _best_length.value
+        if max_length <= depth:
+            # only longer solutions remain for this task
+            return -1
+        if sm is None:
+            # tasks started after the search stopped return before this
+            if time.time() > timeout:
+                return -2
+            sm = SolutionManager(cube_string)
+        solution = sm.solve(
+            max_length,
+            timeout,
+            prefix=prefix,
+            shared_length=_best_length,
+            phase_1_depth=depth,
+            resume=resume,
+        )
+        if not isinstance(solution, str):
+            return solution
+        resume = True
+        length = len(solution.split())
+        with _best_length.get_lock():
+            if length >= _best_length.value:
+                # another worker found a solution at least as short
+                continue
+            _best_length.value = length
+        _solutions.put(solution)
+
+
+def solve_best_generator(
+    cube_string,
+    max_length=25,
+    max_time=10,
+    workers=None,
+    split_depth=SPLIT_DEPTH,
+    stop=None,
+):
+    """
+    Search for solutions on a pool of worker processes until max_time is
+    exceeded or no shorter solutions exist, yielding each solution shorter
+    than the previous one as it is found.
+
+    Parameters
+    ----------
+    cube_string : str
+        Starting position of the cube, see SolutionManager.
+    max_length : int, optional
+        Upper bound for the allowed number of moves.
+    max_time : int or float, optional
+        Time in seconds after which the search stops.
+    workers : int, optional
+        Number of worker processes, defaults to the number of cores.
+    split_depth : int, optional
+        Number of moves fixed by each task the search is split into.
+    stop : twophase.StopCondition, optional
+        Polled while the workers search. Once its deadline passes, it's
+        cancelled or a solution of at most its target_length moves is found,
+        the search stops. Its node budget isn't applied to the workers.
+    """
+    # raise invalid cubes here rather than in each worker
+    SolutionManager(cube_string)
+    timeout = time.time() + max_time
+    best_length = Value("i", max_length)
+    solutions = Queue()
+    futures = []
+
+    executor = ProcessPoolExecutor(
+        workers,
+        initializer=_initialise_worker,
+        initargs=(best_length, solutions, Tables.configuration()),
+    )
+    try:
+        futures = [
+            executor.submit(
+                _search_prefix, cube_string, prefix, depth, timeout
+            )
+            for depth in range(max_length)
+            for prefix in prefixes(min(depth, split_depth))
+        ]
+        length = max_length
+        while time.time() <= timeout and (stop is None or not stop.check()):
+            finished = all(future.done() for future in futures)
+            try:
+                solution = solutions.get(timeout=0.1)
+            except queue.Empty:
+                if finished:
+                    break
+                continue
+            # solutions may be queued out of order
+            if len(solution.split()) < length:
+                length = len(solution.split())
+                if stop is not None:
+                    stop.found(solution)
+                yield solution
+        # stop the workers if the search was stopped, and skip the tasks
+        # that haven't started
+        best_length.value = 0
+        for future in futures:
+            future.cancel()
+        for future in futures:
+            if not future.cancelled():
+                # raise any exception from the workers
+                future.result()
+    finally:
+        # stop any searches still running, e.g. if the generator is closed,
+        # by ruling out every solution
+        best_length.value = 0
+        for future in futures:
+            future.cancel()
+        executor.shutdown()
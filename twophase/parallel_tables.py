@@ -0,0 +1,146 @@
+"""
+Build the move and pruning tables on a pool of worker processes.
+
+The move tables are independent of each other, and each pruning table
+depends only on the two move tables of its coordinates, so the tables are
+built as a dependency graph: every move table is submitted immediately, and
+each pruning table is submitted as soon as its two move tables are complete.
+The large corner and edge8 move tables are further split into coordinate
+ranges built by different workers.
+"""
+import os
+from array import array
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import chain
+
+from .tables import (
+    COMBINE_TABLES,
+    MOVE_TABLES,
+    PRUNING_TABLES,
+    Tables,
+    pruning_arrays,
+)
+
+# name of the builder and size of each move table
+MOVE_BUILDERS = {
+    "twist_move": ("make_twist_table", "TWIST"),
+    "flip_move": ("make_flip_table", "FLIP"),
+    "udslice_move": ("make_udslice_table", "UDSLICE"),
+    "edge4_move": ("make_edge4_table", "EDGE4"),
+    "edge8_move": ("make_edge8_table", "EDGE8"),
+    "corner_move": ("make_corner_table", "CORNER"),
+    "udslice_sorted_move": ("make_udslice_sorted_table", "UDSLICE_SORTED"),
+    "u_edges_move": ("make_u_edges_table", "U_EDGES"),
+    "d_edges_move": ("make_d_edges_table", "D_EDGES"),
+}
+# move tables that are split into coordinate ranges
+SPLIT_MOVE_TABLES = ("edge8_move", "corner_move")
+
+# name of the builder and move tables required by each pruning table
+PRUNING_BUILDERS = {
+    "udslice_twist_prune": (
+        "make_udslice_twist_prune",
+        ("udslice_move", "twist_move"),
+    ),
+    "udslice_flip_prune": (
+        "make_udslice_flip_prune",
+        ("udslice_move", "flip_move"),
+    ),
+    "edge4_edge8_prune": (
+        "make_edge4_edge8_prune",
+        ("edge4_move", "edge8_move"),
+    ),
+    "edge4_corner_prune": (
+        "make_edge4_corner_prune",
+        ("edge4_move", "corner_move"),
+    ),
+}
+
+
+def _build_move_table(name, start, stop):
+    builder, _ = MOVE_BUILDERS[name]
+    return getattr(Tables, builder)(start, stop)
+
+
+def _build_pruning_table(name, move_tables):
+    builder, _ = PRUNING_BUILDERS[name]
+    for move_name, move_table in move_tables.items():
+        setattr(Tables, move_name, move_table)
+    return pruning_arrays(name, getattr(Tables, builder)().table)
+
+
+def _ranges(size, chunks):
+    bounds = [size * i // chunks for i in range(chunks + 1)]
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def build_tables(cls, workers=None):
+    """
+    Build all tables from scratch on a pool of worker processes, returning the
+    same mapping of table name to array as Tables.build_tables.
+
+    Parameters
+    ----------
+    cls : type
+        The Tables class, whose builders are run by the workers.
+    workers : int, optional
+        Number of worker processes, defaults to the number of cores.
+    """
+    workers = workers or os.cpu_count() or 1
+
+    # chunks of each move table, indexed by their position in the table
+    move_chunks = {name: {} for name in MOVE_BUILDERS}
+    move_tables = {}
+    results = {}
+
+    with ProcessPoolExecutor(workers) as executor:
+        pending = {}
+        for name, (_, size) in MOVE_BUILDERS.items():
+            size = getattr(cls, size)
+            chunks = workers if name in SPLIT_MOVE_TABLES else 1
+            for i, (start, stop) in enumerate(_ranges(size, chunks)):
+                future = executor.submit(_build_move_table, name, start, stop)
+                pending[future] = ("move", name, i, chunks)
+
+        submitted = set()
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                kind, name, i, chunks = pending.pop(future)
+                if kind == "pruning":
+                    results.update(future.result())
+                    continue
+
+                move_chunks[name][i] = future.result()
+                if len(move_chunks[name]) < chunks:
+                    continue
+                move_tables[name] = list(
+                    chain.from_iterable(
+                        move_chunks[name][j] for j in range(chunks)
+                    )
+                )
+                # submit any pruning tables whose move tables are complete
+                for prune, (_, required) in PRUNING_BUILDERS.items():
+                    if prune in submitted or not all(
+                        move in move_tables for move in required
+                    ):
+                        continue
+                    submitted.add(prune)
+                    future = executor.submit(
+                        _build_pruning_table,
+                        prune,
+                        {move: move_tables[move] for move in required},
+                    )
+                    pending[future] = ("pruning", prune, 0, 1)
+
+    tables = {}
+    for name, typecode in MOVE_TABLES.items():
+        tables[name] = array(typecode, move_tables[name])
+    # the combine tables are quick to build, so are built in this process
+    for name, typecode in COMBINE_TABLES.items():
+        builder = getattr(cls, "make_{}_table".format(name))
+        tables[name] = array(typecode, builder())
+    for name in PRUNING_TABLES:
+        tables[name] = results[name]
+        tables[name + "_packed"] = results[name + "_packed"]
+    return tables
@@ -0,0 +1,194 @@
+"""
+Race searches of several variants of a cube against each other.
+
+Conjugating a cube by the 120 degree rotation S_URF3 around the URF-DBL
+diagonal gives the same cube with a different axis in the UD position, and a
+cube is solved by reversing and inverting any solution of its inverse. The two
+phase algorithm treats the UD axis specially, so it finds solutions of quite
+different lengths for each of the six variants (three orientations, each of
+the cube and its inverse). Searching all of them at once therefore finds
+shorter solutions in the same time. A solution of a variant is mapped back to
+the original cube by conjugating each move back, and reversing and inverting
+it for the inverse variants.
+"""
+import time
+from concurrent.futures import ProcessPoolExecutor, wait
+from multiprocessing import Value
+
+from .cubes import FaceCube
+from .cubes.symmetry import MOVE_CONJ, SYM_INV, conjugate
+from .pieces import Color
+from .solve import STATUS_ERRORS, SolutionManager
+from .tables import Tables
+
+# (rotation, inverse) for each variant searched. rotation r conjugates the
+# cube by S_URF3^r, which is symmetry 16 * r (see twophase.cubes.symmetry)
+VARIANTS = tuple((r, inverse) for r in range(3) for inverse in (False, True))
+
+# number of clockwise quarter turns for each suffix of a move
+_POWERS = {"": 1, "2": 2, "'": 3}
+
+# length of the shortest solution found by any worker, shared between the
+# worker processes, see _initialise_worker
+_best_length = None
+
+# seconds between polls of the stop condition while the workers search
+POLL_INTERVAL = 0.1
+
+
+def transform(cube_string, rotation, inverse):
+    """
+    Facelets of the variant (rotation, inverse) of the cube cube_string.
+    """
+    cc = conjugate(FaceCube(cube_string).to_cubiecube(), 16 * rotation)
+    if inverse:
+        cc = cc.inverse_cubiecube()
+    return cc.to_facecube().to_string()
+
+
+def transform_solution(solution, rotation, inverse):
+    """
+    Map a solution of the variant (rotation, inverse) of a cube back to a
+    solution of the cube.
+    """
+    return conjugate_solution(solution, 16 * rotation, inverse)
+
+
+def conjugate_solution(solution, s, inverse=False):
+    """
+    Map a solution of S * c * S^-1, or of its inverse if inverse is True,
+    where S is symmetry s (see twophase.cubes.symmetry), to a solution of c.
+    """
+    moves = [(Color[m[0]], _POWERS[m[1:]]) for m in solution.split()]
+    if inverse:
+        moves = [(axis, 4 - power) for axis, power in reversed(moves)]
+    # if S * c * S^-1 is solved by the moves m, c is solved by S^-1 * m * S
+    s = SYM_INV[s]
+    names = []
+    for axis, power in moves:
+        mv = MOVE_CONJ[18 * s + 3 * axis + power - 1]
+        names.append(Color(mv // 3).name + ("", "2", "'")[mv % 3])
+    return " ".join(names)
+
+
+def _initialise_worker(best_length, configuration):
+    global _best_length
+    _best_length = best_length
+    Tables.configure_worker(configuration)
+
+
+def _search_variant(cube_string, rotation, inverse, timeout, max_nodes):
+    """
+    Search one variant of a cube for solutions shorter than any found so far
+    by any worker, until the time limit or node budget is reached. Returns the
+    shortest solution found mapped back to the cube, or the status returned
+    by SolutionManager.solve if there was none.
+    """
+    sm = SolutionManager(transform(cube_string, rotation, inverse))
+    best = None
+    while True:
+        max_length = _best_length.value
+        if max_length < 1:
+            # a solution with no moves can't be beaten
+            status = -1
+            break
+        solution = sm.solve(
+            max_length,
+            timeout,
+            max_nodes=max_nodes,
+            shared_length=_best_length,
+            resume=best is not None,
+        )
+        if max_nodes is not None:
+            max_nodes -= sm.nodes
+        if not isinstance(solution, str):
+            status = solution
+            break
+        best = solution
+        with _best_length.get_lock():
+            _best_length.value = min(_best_length.value, len(solution.split()))
+    if best is None:
+        return status
+    return transform_solution(best, rotation, inverse)
+
+
+def solve_race(
+    cube_string,
+    max_length=25,
+    max_time=10,
+    max_nodes=None,
+    workers=None,
+    stop=None,
+):
+    """
+    Search the six variants of the cube (see twophase.race) at once on a pool
+    of worker processes, each repeatedly searching for shorter solutions until
+    max_time is exceeded, and return the shortest solution found.
+
+    Parameters
+    ----------
+    cube_string : str
+        Starting position of the cube, see SolutionManager.
+    max_length : int, optional
+        Upper bound for the allowed number of moves.
+    max_time : int or float, optional
+        Time in seconds after which the search stops.
+    max_nodes : int, optional
+        Maximum number of positions expanded in the search of each variant.
+    workers : int, optional
+        Number of worker processes. Defaults to one per variant, so that all
+        variants are searched at once even on fewer cores. With fewer workers
+        the variants that start last get less time.
+    stop : twophase.StopCondition, optional
+        Polled while the workers search. Once its deadline passes, it's
+        cancelled or a solution of at most its target_length moves is found,
+        the workers stop and the shortest solution found so far is returned.
+        Its node budget isn't applied to the workers.
+    """
+    # raise invalid cubes here rather than in each worker
+    SolutionManager(cube_string)
+    timeout = time.time() + max_time
+    workers = workers or len(VARIANTS)
+    best_length = Value("i", max_length)
+
+    with ProcessPoolExecutor(
+        workers,
+        initializer=_initialise_worker,
+        initargs=(best_length, Tables.configuration()),
+    ) as executor:
+        futures = [
+            executor.submit(
+                _search_variant,
+                cube_string,
+                rotation,
+                inverse,
+                timeout,
+                max_nodes,
+            )
+            for rotation, inverse in VARIANTS
+        ]
+        status = 0
+        while stop is not None and not status:
+            _, running = wait(futures, timeout=POLL_INTERVAL)
+            if not running:
+                break
+            status = stop.check()
+            target = stop.target_length
+            if target is not None and best_length.value <= target:
+                status = -4
+            if status:
+                # the workers return the best solutions they've found once
+                # every solution is ruled out
+                best_length.value = 0
+        results = [future.result() for future in futures]
+
+    solutions = [r for r in results if isinstance(r, str)]
+    if solutions:
+        solution = min(solutions, key=lambda solution: len(solution.split()))
+        if stop is not None:
+            stop.found(solution)
+        return solution
+    elif not status:
+        # the time limit or node budget if either stopped a worker
+        status = -2 if -2 in results else -3 if -3 in results else -1
+    raise RuntimeError(STATUS_ERRORS[status])
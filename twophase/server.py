@@ -0,0 +1,545 @@
+"""
+Local solving server, run with python -m twophase.server.
+
+Serves HTTP with JSON bodies:
+
+* POST /solve with {"cube": "<cube_string>"} and optionally "max_length"
+  (at most MAX_LENGTH), "max_time" and "max_nodes" as for twophase.solve,
+  responding with {"solution": ..., "length": ..., "nodes": ...,
+  "seconds": ..., "latency": ...}, where seconds is the time spent searching
+  and latency the time since the request arrived. Invalid requests and cubes get status 400
+  and cubes that couldn't be solved 422, with {"error": ...}.
+* GET /metrics, responding with the number of requests queued and being
+  solved, counts of requests by outcome and a histogram of latencies, see
+  SolveServer.metrics.
+
+The time limit of each request runs from its arrival, so time spent queued
+counts towards it, and requests whose time runs out in the queue fail
+without being searched.
+
+The tables are memory mapped and loaded before the worker processes start,
+so the workers share a single copy of them, and each worker solves a cube
+before serving, so its SolutionManager is allocated and the pages of the
+tables it needs are mapped before the first request (see twophase.batch).
+Waiting requests are shared out between the workers in batches of up to
+batch_size, saving a round trip to the pool per cube when busy. At most
+QUEUED_PER_WORKER batches per worker are queued in the pool, and later
+requests wait in the server, so batches only grow once every worker has
+work. If a worker dies, the requests sent to the pool fail with status 500 and
+the pool is replaced before the next batch is sent.
+"""
+import argparse
+import json
+import math
+import os
+import queue
+import threading
+import time
+from bisect import bisect_left
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+
+from .batch import QUEUED_PER_WORKER, solve_item, solve_item_details
+from .tables import Tables
+
+# a solved cube, solved by each worker as it starts
+SOLVED = "".join(c * 9 for c in "URFDLB")
+
+# most requests sent to a worker at once, and seconds a request arriving
+# alone waits for others to batch with
+BATCH_SIZE = 16
+BATCH_WINDOW = 0.002
+
+# upper bounds in seconds of the buckets of the latency histogram
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 60)
+
+# largest request body accepted, in bytes
+MAX_BODY = 4096
+
+# largest max_length a request may ask for. every cube can be solved in 20
+# moves, and the search arrays of a worker grow to max_length
+MAX_LENGTH = 30
+
+
+def _initialise_worker(configuration):
+    Tables.configure_worker(configuration)
+    # allocate the SolutionManager of the worker, see solve_item
+    solve_item(SOLVED)
+
+
+def solve_batch(items):
+    """
+    Solve a batch of cubes in a worker process.
+
+    Parameters
+    ----------
+    items : list of (str, int, float, int or None)
+        Cube string, max_length, time at which to stop searching (as
+        time.time()) and max_nodes of each cube.
+
+    Returns
+    -------
+    list
+        (result, nodes, seconds) for each cube, see solve_item_details.
+    """
+    results = []
+    for cube_string, max_length, timeout, max_nodes in items:
+        max_time = timeout - time.time()
+        if max_time <= 0:
+            results.append(_expired())
+            continue
+        results.append(
+            solve_item_details(
+                (cube_string, max_time), max_length, max_nodes=max_nodes
+            )
+        )
+    return results
+
+
+def _expired():
+    return RuntimeError("max_time exceeded, no solution found"), 0, 0.0
+
+
+class LatencyHistogram:
+    """
+    Counts of latencies in buckets bounded by LATENCY_BUCKETS, plus a bucket
+    for those beyond the last bound.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def add(self, seconds):
+        self.counts[bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+
+    def to_dict(self):
+        """
+        The histogram as a JSON serialisable dict, with cumulative counts of
+        the latencies at most each bound, as Prometheus histograms.
+        """
+        cumulative, buckets = 0, {}
+        for bound, count in zip((*self.buckets, "+Inf"), self.counts):
+            cumulative += count
+            buckets[str(bound)] = cumulative
+        return {"buckets": buckets, "count": self.count, "sum": self.total}
+
+
+class SolveServer:
+    """
+    Pool of warm worker processes solving cubes submitted from any thread, in
+    batches, see twophase.server.
+
+    Parameters
+    ----------
+    workers : int, optional
+        Number of worker processes, defaults to the number of cores.
+    batch_size : int, optional
+        Most cubes sent to a worker at once.
+    batch_window : float, optional
+        Seconds a cube that arrives alone waits for others to batch with.
+    """
+
+    def __init__(
+        self, workers=None, batch_size=BATCH_SIZE, batch_window=BATCH_WINDOW
+    ):
+        if batch_size < 1:
+            raise ValueError(
+                "batch_size must be positive, got {}".format(batch_size)
+            )
+        self.workers = workers or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+        # requests waiting to be batched, and the number of batches the pool
+        # may still take, see _dispatch
+        self._queue = queue.Queue()
+        self._slots = threading.BoundedSemaphore(
+            QUEUED_PER_WORKER * self.workers
+        )
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._outcomes = {"solved": 0, "invalid": 0, "unsolved": 0}
+        self._latency = LatencyHistogram()
+        self._restarts = 0
+
+        Tables.load_tables(use_mmap=True)
+        self._start_workers()
+        self._dispatcher = threading.Thread(
+            target=self._dispatch, name="twophase-dispatcher", daemon=True
+        )
+        self._dispatcher.start()
+
+    def _start_workers(self):
+        """
+        Start a new pool of workers, returning once every worker is ready
+        rather than on the first requests.
+        """
+        self._executor = ProcessPoolExecutor(
+            self.workers,
+            initializer=_initialise_worker,
+            initargs=(Tables.configuration(),),
+        )
+        warm = [
+            self._executor.submit(solve_batch, []) for _ in range(self.workers)
+        ]
+        for future in warm:
+            future.result()
+
+    def _restart(self):
+        """
+        Replace a pool broken by a worker dying, e.g. killed for running out
+        of memory.
+        """
+        self._executor.shutdown(wait=False)
+        with self._lock:
+            self._restarts += 1
+        self._start_workers()
+
+    def submit(self, cube_string, max_length=25, max_time=10, max_nodes=None):
+        """
+        Queue a cube to be solved, with the same limits as twophase.solve,
+        the time limit running from now.
+
+        Returns
+        -------
+        concurrent.futures.Future
+            Resolves to (result, nodes, seconds), see solve_item_details.
+        """
+        future = Future()
+        timeout = time.time() + max_time
+        self._queue.put(
+            (future, (cube_string, max_length, timeout, max_nodes))
+        )
+        return future
+
+    def record(self, result, latency):
+        """
+        Count the outcome and latency of a request in the metrics.
+        """
+        if isinstance(result, ValueError):
+            outcome = "invalid"
+        elif isinstance(result, Exception):
+            outcome = "unsolved"
+        else:
+            outcome = "solved"
+        with self._lock:
+            self._outcomes[outcome] += 1
+            self._latency.add(latency)
+
+    def metrics(self):
+        """
+        Current state of the server as a JSON serialisable dict: the number
+        of requests queued in the server and sent to the workers, the number
+        of times the pool was replaced after a worker died, counts of requests
+        solved, invalid and not solved within their limits, and the histogram
+        of latencies from arrival to result.
+        """
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "queued": self._queue.qsize(),
+                "in_flight": self._in_flight,
+                "restarts": self._restarts,
+                "requests": dict(self._outcomes),
+                "latency_seconds": self._latency.to_dict(),
+            }
+
+    def close(self):
+        """
+        Stop the dispatcher and worker processes, waiting for the cubes sent
+        to the workers.
+        """
+        self._queue.put(None)
+        self._dispatcher.join()
+        self._executor.shutdown()
+
+    def _dispatch(self):
+        """
+        Send queued requests to the pool in batches until closed.
+        """
+        closed = False
+        while not closed:
+            request = self._queue.get()
+            if request is None:
+                break
+            self._slots.acquire()
+            if self._queue.empty():
+                # wait for other requests arriving at about the same time
+                time.sleep(self.batch_window)
+            # share the waiting requests between the workers, so batches
+            # only grow once every worker has work
+            size = min(
+                self.batch_size,
+                math.ceil((1 + self._queue.qsize()) / self.workers),
+            )
+            batch = [request]
+            while len(batch) < size:
+                request = self._queue.get_nowait()
+                if request is None:
+                    closed = True
+                    break
+                batch.append(request)
+            self._submit(batch)
+
+    def _submit(self, batch):
+        now = time.time()
+        live = []
+        for future, item in batch:
+            if item[2] <= now:
+                future.set_result(_expired())
+            else:
+                live.append((future, item))
+        if not live:
+            self._slots.release()
+            return
+
+        items = [item for _, item in live]
+        try:
+            try:
+                results = self._executor.submit(solve_batch, items)
+            except BrokenProcessPool:
+                # a worker died, failing the batches sent to the pool (see
+                # done), so carry on with a new pool
+                self._restart()
+                results = self._executor.submit(solve_batch, items)
+        except Exception as e:
+            for future, _ in live:
+                future.set_exception(e)
+            self._slots.release()
+            return
+        with self._lock:
+            self._in_flight += len(live)
+
+        def done(results):
+            with self._lock:
+                self._in_flight -= len(live)
+            self._slots.release()
+            try:
+                ret = results.result()
+            except Exception as e:
+                for future, _ in live:
+                    future.set_exception(e)
+                return
+            for (future, _), result in zip(live, ret):
+                future.set_result(result)
+
+        results.add_done_callback(done)
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class SolveRequestHandler(BaseHTTPRequestHandler):
+    """
+    Handler of the HTTP interface of a SolveServer, which is the solver
+    attribute of the HTTP server.
+    """
+
+    server_version = "twophase"
+
+    def do_GET(self):
+        if self.path == "/metrics":
+            self._respond(200, self.server.solver.metrics())
+        else:
+            self._respond(404, {"error": "not found"})
+
+    def do_POST(self):
+        if self.path != "/solve":
+            self._respond(404, {"error": "not found"})
+            return
+        start = time.perf_counter()
+        try:
+            args = self._read_request()
+        except ValueError as e:
+            self._respond(400, {"error": str(e)})
+            return
+
+        solver = self.server.solver
+        try:
+            result, nodes, seconds = solver.submit(**args).result()
+        except Exception as e:
+            # the worker process died
+            self._respond(500, {"error": str(e)})
+            return
+        latency = time.perf_counter() - start
+        solver.record(result, latency)
+        if isinstance(result, Exception):
+            status = 400 if isinstance(result, ValueError) else 422
+            self._respond(status, {"error": str(result), "nodes": nodes})
+            return
+        self._respond(
+            200,
+            {
+                "solution": result,
+                "length": len(result.split()),
+                "nodes": nodes,
+                "seconds": seconds,
+                "latency": latency,
+            },
+        )
+
+    def _read_request(self):
+        """
+        Keyword arguments of SolveServer.submit from the request body, raising
+        ValueError if it's invalid.
+        """
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+        except ValueError:
+            length = -1
+        if length < 0:
+            # reading a negative length would wait for the client to close
+            raise ValueError("invalid Content-Length")
+        if length > MAX_BODY:
+            raise ValueError("request body too large")
+        try:
+            body = json.loads(self.rfile.read(length) or b"null")
+        except json.JSONDecodeError as e:
+            raise ValueError("invalid JSON: {}".format(e))
+        if not isinstance(body, dict) or not isinstance(body.get("cube"), str):
+            raise ValueError("expected an object with a cube string")
+        args = {"cube_string": body["cube"]}
+        for name, default, minimum, maximum in (
+            ("max_length", 25, 0, MAX_LENGTH),
+            ("max_time", self.server.max_time, 0, math.inf),
+            ("max_nodes", None, 0, math.inf),
+        ):
+            value = body.get(name, default)
+            if value is None and default is None:
+                args[name] = value
+                continue
+            if (
+                not isinstance(value, (int, float))
+                or isinstance(value, bool)
+                or not math.isfinite(value)
+                or not minimum <= value <= maximum
+            ):
+                raise ValueError("invalid {}: {!r}".format(name, value))
+            if name == "max_time":
+                # no request may hold a worker for longer than the server
+                # allows
+                value = min(value, self.server.max_time)
+            elif value != int(value):
+                raise ValueError("invalid {}: {!r}".format(name, value))
+            else:
+                value = int(value)
+            args[name] = value
+        return args
+
+    def _respond(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+def make_server(
+    host="127.0.0.1",
+    port=8000,
+    workers=None,
+    max_time=10,
+    batch_size=BATCH_SIZE,
+    batch_window=BATCH_WINDOW,
+    verbose=False,
+):
+    """
+    Create an HTTP server solving cubes on a new SolveServer, see
+    twophase.server. Call serve_forever on it to serve, and server_close and
+    solver.close to shut it down.
+
+    max_time is the default time limit of a request, and the most a request
+    may ask for.
+    """
+    solver = SolveServer(workers, batch_size, batch_window)
+    httpd = _ThreadingHTTPServer((host, port), SolveRequestHandler)
+    httpd.solver = solver
+    httpd.max_time = max_time
+    httpd.verbose = verbose
+    return httpd
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m twophase.server",
+        description="Serve a pool of warm solvers over HTTP.",
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument(
+        "-j",
+        "--workers",
+        type=int,
+        help="number of worker processes, defaults to the number of cores",
+    )
+    parser.add_argument(
+        "--max-time",
+        type=float,
+        default=10,
+        help=(
+            "default and largest time limit of a request in seconds "
+            "(default %(default)s)"
+        ),
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=BATCH_SIZE,
+        help="most cubes sent to a worker at once (default %(default)s)",
+    )
+    parser.add_argument(
+        "--batch-window",
+        type=float,
+        default=BATCH_WINDOW,
+        help=(
+            "seconds a lone request waits for others to batch with "
+            "(default %(default)s)"
+        ),
+    )
+    parser.add_argument(
+        "-v", "--verbose", action="store_true", help="log every request"
+    )
+    args = parser.parse_args(argv)
+    if args.workers is not None and args.workers < 1:
+        parser.error("--workers must be positive")
+    if args.batch_size < 1:
+        parser.error("--batch-size must be positive")
+
+    httpd = make_server(
+        args.host,
+        args.port,
+        args.workers,
+        args.max_time,
+        args.batch_size,
+        args.batch_window,
+        args.verbose,
+    )
+    print(
+        "Serving on http://{}:{} with {} workers".format(
+            *httpd.server_address[:2], httpd.solver.workers
+        ),
+        flush=True,
+    )
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+        httpd.solver.close()
+
+
+if __name__ == "__main__":
+    main()
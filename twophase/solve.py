@@ -1,12 +1,71 @@
 import time
+from collections import OrderedDict
 
 from .cubes import CoordCube, FaceCube
 from .pieces import Color
-from .tables import Tables
+from .stats import HEURISTIC_TABLES
+from .tables import COMBINE_TABLES, MOVE_TABLES, Tables
+
+# heuristics available for each phase of the search
+PHASE_1_HEURISTICS = ("udslice", "flipslice_twist")
+PHASE_2_HEURISTICS = ("edge4", "corner_edge8")
+
+# numbers of clockwise quarter turns allowed for each face in phase 2, where
+# only half turns of R, F, L and B are allowed
+PHASE_2_POWERS = ((1, 2, 3), (2,), (2,), (1, 2, 3), (2,), (2,))
+
+# search engines available, see SolutionManager
+ENGINES = ("recursive", "iterative")
+
+# default number of nodes expanded between checks of the deadline, see
+# SolutionManager.solve
+CHECK_INTERVAL = 1000
+
+# default number of phase 2 searches remembered, see SolutionManager. the
+# cache is rarely hit by single solves, so it's off unless asked for
+PHASE_2_CACHE_SIZE = 0
+
+# errors raised by the twophase helpers for each status returned by
+# SolutionManager.solve
+STATUS_ERRORS = {
+    -1: "no solution found, try increasing max_length",
+    -2: "max_time exceeded, no solution found",
+    -3: "max_nodes exceeded, no solution found",
+    -4: "search stopped, no solution found",
+}
+
+
+def _successors(powers):
+    """
+    Moves (axis, power, mv) to try after a move of each axis, with the moves
+    to try first at index 6. Consecutive moves never turn the same face, and
+    since opposite faces commute, e.g. UD = DU, they are only turned in order
+    of increasing index.
+    """
+    return tuple(
+        tuple(
+            (i, j, 3 * i + j - 1)
+            for i in range(6)
+            if last == 6 or last not in (i, i + 3)
+            for j in powers[i]
+        )
+        for last in range(7)
+    )
+
+
+PHASE_1_SUCCESSORS = _successors(((1, 2, 3),) * 6)
+PHASE_2_SUCCESSORS = _successors(PHASE_2_POWERS)
 
 
 class SolutionManager:
-    def __init__(self, facelets):
+    def __init__(
+        self,
+        facelets,
+        phase_1_heuristic="udslice",
+        phase_2_heuristic="edge4",
+        engine="recursive",
+        phase_2_cache_size=PHASE_2_CACHE_SIZE,
+    ):
         """
         A utility class for managing the search for the solution.
 
@@ -17,10 +76,76 @@ class SolutionManager:
             specifying the stickers on each face (in order U R F D L B),
             reading row by row from the top left hand corner to the bottom
             right
+        phase_1_heuristic: str, optional
+            Pruning tables used to bound the length of phase 1. "udslice" uses
+            the udslice-twist and udslice-flip tables. "flipslice_twist" uses
+            a single symmetry reduced table giving the exact distance to phase
+            2, which prunes far more of the search but is much larger (about
+            35MB) and is built the first time it's used.
+        phase_2_heuristic: str, optional
+            Pruning tables used to bound the length of phase 2. "edge4" uses
+            the edge4-edge8 and edge4-corner tables. "corner_edge8" replaces
+            the edge4-edge8 table with a symmetry reduced corner-edge8 table,
+            which accounts for how the corner and edge permutations interact
+            and so prunes far more of the search, at the cost of a larger
+            table (about 28MB) that is built the first time it's used.
+        engine: str, optional
+            How the IDA* searches are run. "recursive" recurses once per move.
+            "iterative" keeps the moves being tried at each depth on an
+            explicit stack, avoiding the overhead of a Python function call
+            per node. Both find the same solutions.
+        phase_2_cache_size: int, optional
+            Number of phase 2 searches to remember. Different phase 1
+            solutions often reach the same phase 2 position, and the result
+            of searching it (the shortest solution, or that there is none
+            shorter than some length) is reused by later searches from that
+            position, including in later calls to solve. The least recently
+            used results are forgotten first. Off (0) by default, since few
+            phase 2 positions repeat within the searches for a single cube,
+            so the cache costs more than it saves unless the same or similar
+            cubes are solved many times.
         """
+        for name, option, allowed in (
+            ("phase_1_heuristic", phase_1_heuristic, PHASE_1_HEURISTICS),
+            ("phase_2_heuristic", phase_2_heuristic, PHASE_2_HEURISTICS),
+            ("engine", engine, ENGINES),
+        ):
+            if option not in allowed:
+                raise ValueError(
+                    "Invalid {}: {!r}, expected one of {}".format(
+                        name, option, ", ".join(allowed)
+                    )
+                )
+        self.phase_1_heuristic = phase_1_heuristic
+        self.phase_2_heuristic = phase_2_heuristic
+        self.engine = engine
+        self._nodes = self._countdown = self._countdown_start = 0
+        # results of phase 2 searches, see _phase_2_ida
+        self._phase_2_cache = OrderedDict()
+        self._phase_2_cache_size = phase_2_cache_size
+
+        # the search arrays are allocated by the first search and reused by
+        # later ones if they're long enough, see _phase_1_initialise
+        self._buffer_length = 0
+
         self.tables = Tables()
 
+        self.set_facelets(facelets)
+
+    def set_facelets(self, facelets):
+        """
+        Set the cube to solve, replacing the current one, so that the same
+        SolutionManager can solve many cubes, reusing its search arrays and
+        phase 2 cache. Raises ValueError if the cube is invalid.
+
+        Parameters
+        ----------
+        facelets: str
+            Starting position of the cube, see SolutionManager.
+        """
         self.facelets = facelets.upper()
+        # where the last solution was found, see solve
+        self._resume_point = None
 
         status = self.verify()
         if status:
@@ -34,7 +159,19 @@ class SolutionManager:
             }
             raise ValueError("Invalid cube: {}".format(error_message[status]))
 
-    def solve(self, max_length=25, timeout=float("inf")):
+    def solve(
+        self,
+        max_length=25,
+        timeout=float("inf"),
+        stats=None,
+        max_nodes=None,
+        check_interval=CHECK_INTERVAL,
+        prefix=(),
+        shared_length=None,
+        phase_1_depth=None,
+        resume=False,
+        stop=None,
+    ):
         """
         Solve the cube.
 
@@ -42,27 +179,232 @@ class SolutionManager:
         2, returning the result. Can be called multiple times with decreasing
         max_length to try and find better solutions.
 
+        Returns the solution as a string, -1 if there is no solution within
+        max_length moves, -2 if the time limit was exceeded, -3 if the node
+        budget was exhausted and -4 if stop was cancelled.
+
         Parameters
         ----------
         max_length: int, optional
             Upper bound for the allowed number of moves.
         max_time: int or float, optional
             Time at which to quit searching. Algorithm will quit when
-            ``time.time() > max_time``.
+            ``time.time() > max_time``. The deadline is measured with a
+            monotonic clock, so it isn't affected by changes to the system
+            clock during the search. The tables are loaded (or built, the
+            first time) before the search starts, and the deadline is put
+            back by the time that takes.
+        stats: twophase.stats.SearchStats, optional
+            If given, statistics describing the search are added to stats.
+            Collecting statistics slows the search down, but costs nothing
+            when stats is None.
+        max_nodes: int, optional
+            Maximum number of positions to expand over both phases. Unlike
+            the time limit, the search quits at exactly the same point
+            whatever the machine or its load. Unlimited by default.
+        check_interval: int, optional
+            Number of positions expanded between checks of the deadline.
+            Smaller values quit closer to the deadline, at the cost of reading
+            the clock more often.
+        prefix: sequence of (int, int), optional
+            Only search for solutions starting with these moves, given as
+            pairs of face (the index of U, R, F, D, L, B) and number of
+            clockwise quarter turns. Used to split the search between
+            processes, see twophase.parallel_search.
+        shared_length: multiprocessing.Value, optional
+            A bound on the number of moves shared with other searches, e.g.
+            the length of the best solution found by any of them. Only
+            solutions shorter than both max_length and shared_length.value
+            are searched for, and shared_length is read again every
+            check_interval positions, so the search tightens its bound as
+            soon as another finds a shorter solution.
+        phase_1_depth: int, optional
+            If given, only run the phase 1 search of this depth (including the
+            prefix) rather than deepening it from 0, so that searches of
+            different depths can be run separately.
+        resume: bool, optional
+            If True, continue the last search from the point where it found
+            its solution rather than starting again, skipping the part of the
+            search tree already searched, which holds no solution shorter
+            than max_length. max_length must be at most the length of that
+            solution, and the prefix the same. Repeatedly resuming with
+            decreasing max_length, as solve_best does, searches the tree only
+            once in total.
+        stop: twophase.StopCondition, optional
+            A deadline, node budget, target length and cancellation shared
+            with other searches, polled every check_interval positions along
+            with the limits above. The search returns -2, -3 or -4 once stop
+            says so, adds the positions it expands to stop.nodes and reports
+            its solution to stop.found, which cancels the searches sharing
+            stop if the solution is short enough.
         """
-        # prepare for phase 1
-        self._phase_1_initialise(max_length)
+        if check_interval < 1:
+            raise ValueError(
+                "check_interval must be positive, got {}".format(
+                    check_interval
+                )
+            )
+        if resume:
+            if self._resume_point is None:
+                raise ValueError("no search to resume")
+            elif max_length > self._resume_point[0]:
+                raise ValueError(
+                    "max_length must be at most {} to resume, got {}".format(
+                        self._resume_point[0], max_length
+                    )
+                )
+            elif tuple(prefix) != self._prefix:
+                raise ValueError("prefix must be unchanged to resume")
+        # the search counts down the nodes to expand until the limits are next
+        # checked, see _check_limits
+        self._deadline = time.monotonic() + (timeout - time.time())
+        load_time = Tables.load_time
+        self._load_tables()
+        load_time = Tables.load_time - load_time
+        self._deadline += load_time
+        if stats is not None:
+            stats.table_load_time += load_time
+        self._max_nodes = float("inf") if max_nodes is None else max_nodes
+        self._check_interval = check_interval
+        self._nodes = 0
+        self._countdown = self._countdown_start = 0
+        self._prefix = tuple(prefix)
+        self._shared_length = shared_length
+        self._stop = stop
+        # positions expanded but not yet added to stop.nodes
+        self._stop_nodes = 0
         self._allowed_length = max_length
-        self._timeout = timeout
+        status = self._check_limits()
+        if status:
+            return status
+        try:
+            solution = self._solve_with_stats(
+                max_length, stats, phase_1_depth, resume
+            )
+        finally:
+            if stop is not None:
+                stop.check(self.nodes - self._stop_nodes)
+        if stop is not None and isinstance(solution, str):
+            stop.found(solution)
+        return solution
+
+    def _solve_with_stats(self, max_length, stats, phase_1_depth, resume):
+        # the searches evaluate the pruning tables through these attributes,
+        # counting nodes only when statistics are collected
+        self._stats = stats
+        if stats is None:
+            self._phase_1_cost_fn = self._phase_1_cost
+            self._phase_2_cost_fn = self._phase_2_cost
+            return self._solve(max_length, phase_1_depth, resume)
+
+        self._phase_1_cost_fn = self._phase_1_cost_counted
+        self._phase_2_cost_fn = self._phase_2_cost_counted
+        start, load_time = time.perf_counter(), Tables.load_time
+        phase_2_time = stats.phase_2_time
+        try:
+            return self._solve(max_length, phase_1_depth, resume)
+        finally:
+            load_time = Tables.load_time - load_time
+            stats.table_load_time += load_time
+            stats.phase_1_time += (
+                time.perf_counter()
+                - start
+                - load_time
+                - (stats.phase_2_time - phase_2_time)
+            )
+
+    def _load_tables(self):
+        """
+        Load the tables used by the search, so that loading them doesn't
+        count against the deadline.
+        """
+        for name in (
+            *MOVE_TABLES,
+            *COMBINE_TABLES,
+            *HEURISTIC_TABLES[self.phase_1_heuristic],
+            *HEURISTIC_TABLES[self.phase_2_heuristic],
+        ):
+            getattr(self.tables, name)
+
+    @property
+    def nodes(self):
+        """
+        Number of positions expanded by the last call to solve.
+        """
+        return self._nodes + self._countdown_start - self._countdown
 
-        for depth in range(self._allowed_length):
-            n = self._phase_1_search(0, depth)
+    @property
+    def cubiecube(self):
+        """
+        The cube being solved as a CubieCube, checked to be valid.
+        """
+        return self._cubiecube
+
+    def _check_limits(self):
+        """
+        Check the deadline, node budget and stop condition, and read the
+        shared bound on the length, called before expanding a node once
+        self._countdown reaches 0. Returns -2 if the deadline has passed, -3
+        if the node budget is exhausted, the status from stop.check if it's
+        non-zero and 0 otherwise, in which case the countdown is restarted.
+        """
+        self._nodes += self._countdown_start - self._countdown
+        self._countdown_start = self._countdown
+        if self._nodes >= self._max_nodes:
+            return -3
+        if time.monotonic() > self._deadline:
+            return -2
+        if self._stop is not None:
+            status = self._stop.check(self._nodes - self._stop_nodes)
+            self._stop_nodes = self._nodes
+            if status:
+                return status
+        if self._shared_length is not None:
+            self._allowed_length = min(
+                self._allowed_length, self._shared_length.value
+            )
+        self._countdown = self._countdown_start = min(
+            self._check_interval,
+            self._max_nodes - self._nodes,
+            self._stop.remaining_nodes if self._stop else float("inf"),
+        )
+        return 0
+
+    def _solve(self, max_length, phase_1_depth=None, resume=False):
+        if resume:
+            # the arrays are long enough as the bound has only decreased, and
+            # the start of each phase 1 search is unchanged
+            _, depth, self._resume_path = self._resume_point
+        else:
+            # prepare for phase 1
+            self._phase_1_initialise(max_length)
+            depth = 0 if phase_1_depth is None else phase_1_depth
+        self._resume_point = None
+        end = max_length if phase_1_depth is None else phase_1_depth + 1
+
+        # the bound on the length may be tightened during the search, see
+        # _check_limits
+        while depth < min(self._allowed_length, end):
+            self._phase_1_depth = depth
+            if resume:
+                n = self._phase_1_search_resume(0, depth)
+                resume = False
+            else:
+                n = self._phase_1_search_prefix(0, depth)
             if n >= 0:
-                # solution found
+                # solution found, the path to the end of phase 1 is where a
+                # resumed search continues from
+                start = self._phase_2_start
+                self._resume_point = (
+                    n,
+                    depth,
+                    tuple(zip(self.axis[:start], self.power[:start])),
+                )
                 return self._solution_to_string(n)
-            elif n == -2:
-                # time limit exceeded
-                return -2
+            elif n < -1:
+                # time limit exceeded or node budget exhausted
+                return n
+            depth += 1
 
         # no solution found
         return -1
@@ -72,18 +414,40 @@ class SolutionManager:
         try:
             for char in self.facelets:
                 count[Color[char]] += 1
-        except (IndexError, ValueError):
+        except (IndexError, KeyError, ValueError):
             return -1
         for i in range(6):
             if count[i] != 9:
                 return -1
 
-        fc = FaceCube(self.facelets)
-        cc = fc.to_cubiecube()
-
-        return cc.verify()
+        # kept to initialise the searches without parsing the facelets again
+        self._cubiecube = FaceCube(self.facelets).to_cubiecube()
+        return self._cubiecube.verify()
 
     def _phase_1_initialise(self, max_length):
+        if max_length > self._buffer_length:
+            self._allocate(max_length)
+
+        # initialise the arrays from the input
+        cc = self._cubiecube
+        self.c = CoordCube.from_cubiecube(cc)
+        self.twist[0] = self.c.twist
+        self.flip[0] = self.c.flip
+        self.udslice[0] = self.c.udslice
+        self.corner[0] = self.c.corner
+        self.edge4[0] = self.c.edge4
+        self.edge8[0] = self.c.edge8
+        self.udslice_sorted[0] = cc.udslice_sorted
+        self.u_edges[0] = cc.u_edges
+        self.d_edges[0] = cc.d_edges
+        self.min_dist_1[0] = self._phase_1_cost(0, initial=True)
+
+    def _allocate(self, max_length):
+        """
+        Allocate the arrays used by searches for solutions of fewer than
+        max_length moves.
+        """
+        self._buffer_length = max_length
         # the lists 'axis' and 'power' will store the nth move (index of face
         # being turned stored in axis, number of clockwise quarter turns stored
         # in power). The nth move is stored in position n-1
@@ -103,6 +467,14 @@ class SolutionManager:
         self.edge4 = [0] * max_length
         self.edge8 = [0] * max_length
 
+        # edge4 and edge8 are only defined in phase 2 position, so during phase
+        # 1 the position and order of the slice, U and D edges are tracked
+        # instead, along with corner. phase 2 coordinates can then be read off
+        # when phase 2 begins, rather than replaying the phase 1 moves.
+        self.udslice_sorted = [0] * max_length
+        self.u_edges = [0] * max_length
+        self.d_edges = [0] * max_length
+
         # the following two arrays store minimum number of moves required to
         # reach phase 2 or a solution respectively
         # after n moves. these estimates come from the pruning tables and are
@@ -110,61 +482,335 @@ class SolutionManager:
         self.min_dist_1 = [0] * max_length
         self.min_dist_2 = [0] * max_length
 
-        # initialise the arrays from the input
-        self.f = FaceCube(self.facelets)
-        self.c = CoordCube.from_cubiecube(self.f.to_cubiecube())
-        self.twist[0] = self.c.twist
-        self.flip[0] = self.c.flip
-        self.udslice[0] = self.c.udslice
-        self.corner[0] = self.c.corner
-        self.edge4[0] = self.c.edge4
-        self.edge8[0] = self.c.edge8
-        self.min_dist_1[0] = self._phase_1_cost(0)
+        # distances given by each individual pruning table after n moves.
+        # packed pruning tables need the distance of the parent position to
+        # recover the exact distance of a position
+        self.udslice_twist_dist = [0] * max_length
+        self.udslice_flip_dist = [0] * max_length
+        self.edge4_edge8_dist = [0] * max_length
+        self.edge4_corner_dist = [0] * max_length
+        self.flipslice_twist_dist = [0] * max_length
+        self.corner_edge8_dist = [0] * max_length
 
     def _phase_2_initialise(self, n):
-        if time.time() > self._timeout:
-            return -2
-        # initialise phase 2 search from the phase 1 solution
-        cc = self.f.to_cubiecube()
-        for i in range(n):
-            for j in range(self.power[i]):
-                cc.move(self.axis[i])
-        self.edge4[n] = cc.edge4
-        self.edge8[n] = cc.edge8
-        self.corner[n] = cc.corner
-        self.min_dist_2[n] = self._phase_2_cost(n)
-        for depth in range(self._allowed_length - n):
-            m = self._phase_2_search(n, depth)
-            if m >= 0:
+        stats = self._stats
+        if stats is None:
+            return self._phase_2_ida(n)
+
+        stats.phase_2_entries += 1
+        start, load_time = time.perf_counter(), Tables.load_time
+        m = self._phase_2_ida(n)
+        stats.phase_2_time += (
+            time.perf_counter() - start - (Tables.load_time - load_time)
+        )
+        return m
+
+    def _phase_2_ida(self, n):
+        """
+        Run the phase 2 IDA* search from the end of the phase 1 solution of
+        length n.
+        """
+        # initialise phase 2 search from the coordinates tracked in phase 1,
+        # corner is tracked directly. in phase 2 position udslice is 0 so
+        # udslice_sorted equals edge4
+        self.edge4[n] = self.udslice_sorted[n]
+        self.edge8[n] = self.tables.edge8_combine[
+            24 * self.u_edges[n] + self.d_edges[n] % 24
+        ]
+        self._phase_2_start = n
+
+        key = entry = None
+        if self._phase_2_cache_size:
+            # the search depends on the position and, through the moves
+            # allowed to follow it, the axis of the last phase 1 move
+            key = (
+                self.corner[n],
+                self.edge4[n],
+                self.edge8[n],
+                self.axis[n - 1] if n else 6,
+            )
+            cache = self._phase_2_cache
+            entry = cache.get(key)
+        depth = 0
+        if entry is not None:
+            cache.move_to_end(key)
+            if self._stats is not None:
+                self._stats.phase_2_cache_hits += 1
+            depth, moves = entry
+            if moves is not None:
+                # the shortest solution from here is known
+                if n + depth >= self._allowed_length:
+                    return -1
+                self.axis[n : n + depth], self.power[n : n + depth] = moves
+                return n + depth
+            # otherwise there's no solution shorter than depth moves
+
+        self.min_dist_2[n] = self._phase_2_cost(n, initial=True)
+        while depth < self._allowed_length - n:
+            self._phase_2_depth = depth
+            if self.engine == "iterative":
+                m = self._phase_2_search_iterative(n, depth)
+            else:
+                m = self._phase_2_search(n, depth)
+            if m < -1:
                 return m
+            elif m >= 0:
+                # IDA* finds the shortest solution from here first
+                self._phase_2_store(
+                    key,
+                    m - n,
+                    (tuple(self.axis[n:m]), tuple(self.power[n:m])),
+                )
+                # the bound may have been tightened during the search, in
+                # which case there's no shorter solution from here
+                return m if m < self._allowed_length else -1
+            depth += 1
+        self._phase_2_store(key, depth, None)
         return -1
 
-    def _phase_1_cost(self, n):
+    def _phase_2_store(self, key, depth, moves):
+        """
+        Remember the result of a phase 2 search, either the shortest solution
+        moves (axes and powers) of length depth, or if moves is None that
+        there's no solution shorter than depth.
+        """
+        if not self._phase_2_cache_size:
+            return
+        cache = self._phase_2_cache
+        cache[key] = (depth, moves)
+        cache.move_to_end(key)
+        if len(cache) > self._phase_2_cache_size:
+            cache.popitem(last=False)
+
+    def _phase_1_cost(self, n, initial=False):
         """
         Cost of current position for use in phase 1. Returns a lower bound on
-        the number of moves requires to get to phase 2.
+        the number of moves requires to get to phase 2. initial should be True
+        if the position is the start of phase 1, i.e. it has no parent.
         """
-        return max(
-            self.tables.udslice_twist_prune[self.udslice[n], self.twist[n]],
-            self.tables.udslice_flip_prune[self.udslice[n], self.flip[n]],
-        )
+        if self.phase_1_heuristic == "flipslice_twist":
+            parent = None if initial else self.flipslice_twist_dist[n - 1]
+            self.flipslice_twist_dist[
+                n
+            ] = self.tables.flipslice_twist_prune.distance(
+                (self.udslice[n], self.flip[n], self.twist[n]), parent
+            )
+            return self.flipslice_twist_dist[n]
+
+        udslice = self.udslice[n]
+        if initial:
+            self.udslice_twist_dist[
+                n
+            ] = self.tables.udslice_twist_prune.distance(
+                (udslice, self.twist[n])
+            )
+            self.udslice_flip_dist[
+                n
+            ] = self.tables.udslice_flip_prune.distance(
+                (udslice, self.flip[n])
+            )
+        else:
+            # unpacked pruning tables are indexed directly
+            udslice_twist = Tables.TWIST * udslice + self.twist[n]
+            udslice_flip = Tables.FLIP * udslice + self.flip[n]
+            udslice_twist_prune = self.tables.udslice_twist_prune
+            udslice_flip_prune = self.tables.udslice_flip_prune
+            if udslice_twist_prune.packed:
+                self.udslice_twist_dist[n] = udslice_twist_prune.distance_at(
+                    udslice_twist, self.udslice_twist_dist[n - 1]
+                )
+                self.udslice_flip_dist[n] = udslice_flip_prune.distance_at(
+                    udslice_flip, self.udslice_flip_dist[n - 1]
+                )
+            else:
+                self.udslice_twist_dist[n] = udslice_twist_prune.table[
+                    udslice_twist
+                ]
+                self.udslice_flip_dist[n] = udslice_flip_prune.table[
+                    udslice_flip
+                ]
+        return max(self.udslice_twist_dist[n], self.udslice_flip_dist[n])
 
-    def _phase_2_cost(self, n):
+    def _phase_2_cost(self, n, initial=False):
         """
         Cost of current position for use in phase 2. Returns a lower bound on
-        the number of moves required to get to a solved cube.
+        the number of moves required to get to a solved cube. initial should
+        be True if the position is the start of phase 2, i.e. it has no parent.
         """
-        return max(
-            self.tables.edge4_corner_prune[self.edge4[n], self.corner[n]],
-            self.tables.edge4_edge8_prune[self.edge4[n], self.edge8[n]],
-        )
+        edge4, edge8, corner = self.edge4[n], self.edge8[n], self.corner[n]
+        if initial:
+            self.edge4_corner_dist[
+                n
+            ] = self.tables.edge4_corner_prune.distance((edge4, corner))
+        elif self.tables.edge4_corner_prune.packed:
+            self.edge4_corner_dist[
+                n
+            ] = self.tables.edge4_corner_prune.distance_at(
+                Tables.CORNER * edge4 + corner, self.edge4_corner_dist[n - 1]
+            )
+        else:
+            self.edge4_corner_dist[n] = self.tables.edge4_corner_prune.table[
+                Tables.CORNER * edge4 + corner
+            ]
+
+        if self.phase_2_heuristic == "corner_edge8":
+            parent = None if initial else self.corner_edge8_dist[n - 1]
+            self.corner_edge8_dist[
+                n
+            ] = self.tables.corner_edge8_prune.distance(
+                (corner, edge8), parent
+            )
+            return max(self.edge4_corner_dist[n], self.corner_edge8_dist[n])
+
+        if initial:
+            self.edge4_edge8_dist[n] = self.tables.edge4_edge8_prune.distance(
+                (edge4, edge8)
+            )
+        elif self.tables.edge4_edge8_prune.packed:
+            self.edge4_edge8_dist[
+                n
+            ] = self.tables.edge4_edge8_prune.distance_at(
+                Tables.EDGE8 * edge4 + edge8, self.edge4_edge8_dist[n - 1]
+            )
+        else:
+            self.edge4_edge8_dist[n] = self.tables.edge4_edge8_prune.table[
+                Tables.EDGE8 * edge4 + edge8
+            ]
+        return max(self.edge4_corner_dist[n], self.edge4_edge8_dist[n])
+
+    def _phase_1_cost_counted(self, n, initial=False):
+        """
+        _phase_1_cost, also adding the node and any cutoffs to self._stats.
+        """
+        dist = self._phase_1_cost(n, initial)
+        # a position n moves into an iteration of depth d is pruned if it
+        # can't reach phase 2 within the remaining d - n moves
+        bound = self._phase_1_depth - n
+        self._stats.add_node(1, self._phase_1_depth)
+        if dist > bound:
+            self._stats.add_cutoffs(
+                self._distances(self.phase_1_heuristic, n), bound
+            )
+        return dist
+
+    def _phase_2_cost_counted(self, n, initial=False):
+        """
+        _phase_2_cost, also adding the node and any cutoffs to self._stats.
+        """
+        dist = self._phase_2_cost(n, initial)
+        bound = self._phase_2_depth - (n - self._phase_2_start)
+        self._stats.add_node(2, self._phase_2_depth)
+        if dist > bound:
+            self._stats.add_cutoffs(
+                self._distances(self.phase_2_heuristic, n), bound
+            )
+        return dist
+
+    def _distances(self, heuristic, n):
+        """
+        Pairs of name and distance after n moves of each pruning table used by
+        heuristic.
+        """
+        for name in HEURISTIC_TABLES[heuristic]:
+            yield name, getattr(self, name[: -len("prune")] + "dist")[n]
+
+    def _phase_1_search_from(self, n, depth):
+        """
+        Phase 1 search from ply n with the configured engine.
+        """
+        if self.engine == "iterative":
+            return self._phase_1_search_iterative(n, depth)
+        return self._phase_1_search(n, depth)
+
+    def _phase_1_search_prefix(self, n, depth):
+        """
+        Phase 1 search from ply n, trying only the move self._prefix[n] at
+        each ply covered by the prefix, after which the search engine takes
+        over.
+        """
+        if n == len(self._prefix):
+            return self._phase_1_search_from(n, depth)
+        elif self.min_dist_1[n] == 0 or self.min_dist_1[n] > depth:
+            # phase 2 would start here, so no solution follows the prefix
+            return -1
+
+        status = self._phase_1_play(n, depth, *self._prefix[n])
+        if status:
+            return status
+        return self._phase_1_search_prefix(n + 1, depth - 1)
+
+    def _phase_1_search_resume(self, n, depth):
+        """
+        Phase 1 search from ply n, skipping the part of the tree that was
+        searched before phase 2 found the last solution, see solve. The path
+        to that phase 1 solution is followed from the root, and at each ply
+        only the moves after it are searched.
+        """
+        path = self._resume_path
+        if n == len(path):
+            # phase 2 found the shortest solution from here already
+            return -1
+
+        i, j = path[n]
+        status = self._phase_1_play(n, depth, i, j)
+        if status < -1:
+            return status
+        elif not status:
+            m = self._phase_1_search_resume(n + 1, depth - 1)
+            if m != -1:
+                return m
+        if n < len(self._prefix):
+            return -1
+
+        successors = PHASE_1_SUCCESSORS[self.axis[n - 1] if n else 6]
+        k = successors.index((i, j, 3 * i + j - 1))
+        for i, j, _ in successors[k + 1 :]:
+            status = self._phase_1_play(n, depth, i, j)
+            if status < -1:
+                return status
+            elif not status:
+                m = self._phase_1_search_from(n + 1, depth - 1)
+                if m != -1:
+                    return m
+        return -1
+
+    def _phase_1_play(self, n, depth, i, j):
+        """
+        Turn face i by j clockwise quarter turns at ply n of a phase 1 search
+        with depth moves remaining, as the search engines do. Returns -1 if
+        the next node is pruned, -2 or -3 if the search should stop, see
+        _check_limits, and 0 otherwise.
+        """
+        if not self._countdown:
+            status = self._check_limits()
+            if status:
+                return status
+        self._countdown -= 1
+
+        mv = 3 * i + j - 1
+        self.axis[n] = i
+        self.power[n] = j
+        tables = self.tables
+        self.twist[n + 1] = tables.twist_move[18 * self.twist[n] + mv]
+        self.flip[n + 1] = tables.flip_move[18 * self.flip[n] + mv]
+        self.udslice[n + 1] = tables.udslice_move[18 * self.udslice[n] + mv]
+        self.min_dist_1[n + 1] = self._phase_1_cost_fn(n + 1)
+        if self.min_dist_1[n + 1] > depth - 1:
+            return -1
+        self._phase_1_track(n, mv)
+        return 0
 
     def _phase_1_search(self, n, depth):
-        if time.time() > self._timeout:
-            return -2
-        elif self.min_dist_1[n] == 0:
+        if self.min_dist_1[n] == 0:
             return self._phase_2_initialise(n)
         elif self.min_dist_1[n] <= depth:
+            twist_move = self.tables.twist_move
+            flip_move = self.tables.flip_move
+            udslice_move = self.tables.udslice_move
+            # move tables are flat, indexed by 18 * coordinate + move
+            twist = 18 * self.twist[n]
+            flip = 18 * self.flip[n]
+            udslice = 18 * self.udslice[n]
             for i in range(6):
                 if n > 0 and self.axis[n - 1] in (i, i + 3):
                     # don't turn the same face on consecutive moves
@@ -176,62 +822,290 @@ class SolutionManager:
                     self.power[n] = j
                     mv = 3 * i + j - 1
 
+                    if not self._countdown:
+                        status = self._check_limits()
+                        if status:
+                            return status
+                    self._countdown -= 1
+
                     # update coordinates
-                    self.twist[n + 1] = self.tables.twist_move[self.twist[n]][
-                        mv
-                    ]
-                    self.flip[n + 1] = self.tables.flip_move[self.flip[n]][mv]
-                    self.udslice[n + 1] = self.tables.udslice_move[
-                        self.udslice[n]
-                    ][mv]
-                    self.min_dist_1[n + 1] = self._phase_1_cost(n + 1)
+                    self.twist[n + 1] = twist_move[twist + mv]
+                    self.flip[n + 1] = flip_move[flip + mv]
+                    self.udslice[n + 1] = udslice_move[udslice + mv]
+                    self.min_dist_1[n + 1] = self._phase_1_cost_fn(n + 1)
+                    if self.min_dist_1[n + 1] > depth - 1:
+                        # pruned, no need to search from the next node
+                        continue
+                    self._phase_1_track(n, mv)
 
                     # start search from next node
                     m = self._phase_1_search(n + 1, depth - 1)
                     if m >= 0:
                         return m
-                    if m == -2:
-                        # time limit exceeded
-                        return -2
+                    if m < -1:
+                        # time limit exceeded or node budget exhausted
+                        return m
         # if no solution found at current depth, return -1
         return -1
 
+    def _phase_1_track(self, n, mv):
+        """
+        Update the coordinates tracked in phase 1 for use in phase 2, see
+        _phase_1_initialise, following the move mv at ply n.
+        """
+        tables = self.tables
+        self.corner[n + 1] = tables.corner_move[18 * self.corner[n] + mv]
+        self.udslice_sorted[n + 1] = tables.udslice_sorted_move[
+            18 * self.udslice_sorted[n] + mv
+        ]
+        self.u_edges[n + 1] = tables.u_edges_move[18 * self.u_edges[n] + mv]
+        self.d_edges[n + 1] = tables.d_edges_move[18 * self.d_edges[n] + mv]
+
     def _phase_2_search(self, n, depth):
         if self.min_dist_2[n] == 0:
             return n
         elif self.min_dist_2[n] <= depth:
+            edge4_move = self.tables.edge4_move
+            edge8_move = self.tables.edge8_move
+            corner_move = self.tables.corner_move
+            edge4 = 18 * self.edge4[n]
+            edge8 = 18 * self.edge8[n]
+            corner = 18 * self.corner[n]
             for i in range(6):
                 if n > 0 and self.axis[n - 1] in (i, i + 3):
                     continue
-                for j in range(1, 4):
-                    if i in [1, 2, 4, 5] and j != 2:
-                        # in phase two we only allow half turns of the faces
-                        # R, F, L, B
-                        continue
+                for j in PHASE_2_POWERS[i]:
                     self.axis[n] = i
                     self.power[n] = j
                     mv = 3 * i + j - 1
 
+                    if not self._countdown:
+                        status = self._check_limits()
+                        if status:
+                            return status
+                    self._countdown -= 1
+
                     # update coordinates following the move mv
-                    self.edge4[n + 1] = self.tables.edge4_move[self.edge4[n]][
-                        mv
-                    ]
-                    self.edge8[n + 1] = self.tables.edge8_move[self.edge8[n]][
-                        mv
-                    ]
-                    self.corner[n + 1] = self.tables.corner_move[
-                        self.corner[n]
-                    ][mv]
-                    self.min_dist_2[n + 1] = self._phase_2_cost(n + 1)
+                    self.edge4[n + 1] = edge4_move[edge4 + mv]
+                    self.edge8[n + 1] = edge8_move[edge8 + mv]
+                    self.corner[n + 1] = corner_move[corner + mv]
+                    self.min_dist_2[n + 1] = self._phase_2_cost_fn(n + 1)
+                    if self.min_dist_2[n + 1] > depth - 1:
+                        continue
 
                     # start search from new node
                     m = self._phase_2_search(n + 1, depth - 1)
-                    if m >= 0:
+                    if m >= 0 or m < -1:
                         return m
         # if no moves lead to a tree with a solution or min_dist_2 > depth then
         # we return -1 to signify lack of solution
         return -1
 
+    def _phase_1_search_iterative(self, start, depth):
+        """
+        Equivalent to self._phase_1_search(start, depth), without recursion.
+        """
+        if self.min_dist_1[start] == 0:
+            return self._phase_2_initialise(start)
+        elif self.min_dist_1[start] > depth:
+            return -1
+
+        twist_move = self.tables.twist_move
+        flip_move = self.tables.flip_move
+        udslice_move = self.tables.udslice_move
+        axis, power = self.axis, self.power
+        twist, flip, udslice = self.twist, self.flip, self.udslice
+        min_dist_1 = self.min_dist_1
+        corner_move = self.tables.corner_move
+        udslice_sorted_move = self.tables.udslice_sorted_move
+        u_edges_move = self.tables.u_edges_move
+        d_edges_move = self.tables.d_edges_move
+        corner, udslice_sorted = self.corner, self.udslice_sorted
+        u_edges, d_edges = self.u_edges, self.d_edges
+        udslice_twist_dist = self.udslice_twist_dist
+        udslice_flip_dist = self.udslice_flip_dist
+
+        # the cost of the default heuristic is computed inline, unless
+        # statistics are being collected, otherwise by _phase_1_cost_fn
+        inline = self.phase_1_heuristic == "udslice" and self._stats is None
+        if inline:
+            packed = self.tables.udslice_twist_prune.packed
+            udslice_twist_prune = self.tables.udslice_twist_prune.table
+            udslice_flip_prune = self.tables.udslice_flip_prune.table
+        cost = self._phase_1_cost_fn
+        n_twist, n_flip = Tables.TWIST, Tables.FLIP
+
+        # the moves available at each ply and the index of the next one to
+        # try, playing the role of the recursive search's call stack
+        successors = [None] * (start + depth + 1)
+        successors[start] = PHASE_1_SUCCESSORS[axis[start - 1] if start else 6]
+        index = [0] * (start + depth + 1)
+        n = start
+        # from now on depth - n moves remain at ply n
+        depth += start
+        # self._countdown is kept in a local, and stored before returning or
+        # handing over to phase 2
+        countdown = self._countdown
+        while True:
+            k = index[n]
+            if k == len(successors[n]):
+                # every move tried, backtrack
+                if n == start:
+                    self._countdown = countdown
+                    return -1
+                n -= 1
+                continue
+            index[n] = k + 1
+            i, j, mv = successors[n][k]
+            axis[n] = i
+            power[n] = j
+
+            if not countdown:
+                self._countdown = 0
+                status = self._check_limits()
+                if status:
+                    return status
+                countdown = self._countdown
+            countdown -= 1
+
+            # update coordinates
+            t = twist[n + 1] = twist_move[18 * twist[n] + mv]
+            f = flip[n + 1] = flip_move[18 * flip[n] + mv]
+            u = udslice[n + 1] = udslice_move[18 * udslice[n] + mv]
+            if inline and packed:
+                # see PackedPruningTable.distance_at
+                x = n_twist * u + t
+                mod = udslice_twist_prune[x >> 2] >> ((x & 3) << 1) & 3
+                a = udslice_twist_dist[n]
+                a += (mod - a + 1) % 3 - 1
+                x = n_flip * u + f
+                mod = udslice_flip_prune[x >> 2] >> ((x & 3) << 1) & 3
+                b = udslice_flip_dist[n]
+                b += (mod - b + 1) % 3 - 1
+                udslice_twist_dist[n + 1] = a
+                udslice_flip_dist[n + 1] = b
+                dist = min_dist_1[n + 1] = a if a > b else b
+            elif inline:
+                a = udslice_twist_dist[n + 1] = udslice_twist_prune[
+                    n_twist * u + t
+                ]
+                b = udslice_flip_dist[n + 1] = udslice_flip_prune[
+                    n_flip * u + f
+                ]
+                dist = min_dist_1[n + 1] = a if a > b else b
+            else:
+                dist = min_dist_1[n + 1] = cost(n + 1)
+            if dist > depth - n - 1:
+                continue
+            corner[n + 1] = corner_move[18 * corner[n] + mv]
+            udslice_sorted[n + 1] = udslice_sorted_move[
+                18 * udslice_sorted[n] + mv
+            ]
+            u_edges[n + 1] = u_edges_move[18 * u_edges[n] + mv]
+            d_edges[n + 1] = d_edges_move[18 * d_edges[n] + mv]
+
+            if dist == 0:
+                self._countdown = countdown
+                m = self._phase_2_initialise(n + 1)
+                if m != -1:
+                    return m
+                countdown = self._countdown
+            else:
+                # search from the next node
+                n += 1
+                successors[n] = PHASE_1_SUCCESSORS[i]
+                index[n] = 0
+
+    def _phase_2_search_iterative(self, start, depth):
+        """
+        Equivalent to self._phase_2_search(start, depth), without recursion.
+        """
+        if self.min_dist_2[start] == 0:
+            return start
+        elif self.min_dist_2[start] > depth:
+            return -1
+
+        edge4_move = self.tables.edge4_move
+        edge8_move = self.tables.edge8_move
+        corner_move = self.tables.corner_move
+        axis, power = self.axis, self.power
+        edge4, edge8, corner = self.edge4, self.edge8, self.corner
+        min_dist_2 = self.min_dist_2
+        edge4_corner_dist = self.edge4_corner_dist
+        edge4_edge8_dist = self.edge4_edge8_dist
+
+        inline = self.phase_2_heuristic == "edge4" and self._stats is None
+        if inline:
+            packed = self.tables.edge4_corner_prune.packed
+            edge4_corner_prune = self.tables.edge4_corner_prune.table
+            edge4_edge8_prune = self.tables.edge4_edge8_prune.table
+        cost = self._phase_2_cost_fn
+        n_corner, n_edge8 = Tables.CORNER, Tables.EDGE8
+
+        # moves and index of the next move to try at ply start + d
+        successors = [None] * (depth + 1)
+        successors[0] = PHASE_2_SUCCESSORS[axis[start - 1] if start else 6]
+        index = [0] * (depth + 1)
+        d = 0
+        countdown = self._countdown
+        while True:
+            k = index[d]
+            if k == len(successors[d]):
+                if d == 0:
+                    self._countdown = countdown
+                    return -1
+                d -= 1
+                continue
+            index[d] = k + 1
+            i, j, mv = successors[d][k]
+            n = start + d
+            axis[n] = i
+            power[n] = j
+
+            if not countdown:
+                self._countdown = 0
+                status = self._check_limits()
+                if status:
+                    return status
+                countdown = self._countdown
+            countdown -= 1
+
+            # update coordinates following the move mv
+            e4 = edge4[n + 1] = edge4_move[18 * edge4[n] + mv]
+            e8 = edge8[n + 1] = edge8_move[18 * edge8[n] + mv]
+            c = corner[n + 1] = corner_move[18 * corner[n] + mv]
+            if inline and packed:
+                x = n_corner * e4 + c
+                mod = edge4_corner_prune[x >> 2] >> ((x & 3) << 1) & 3
+                a = edge4_corner_dist[n]
+                a += (mod - a + 1) % 3 - 1
+                x = n_edge8 * e4 + e8
+                mod = edge4_edge8_prune[x >> 2] >> ((x & 3) << 1) & 3
+                b = edge4_edge8_dist[n]
+                b += (mod - b + 1) % 3 - 1
+                edge4_corner_dist[n + 1] = a
+                edge4_edge8_dist[n + 1] = b
+                dist = min_dist_2[n + 1] = a if a > b else b
+            elif inline:
+                a = edge4_corner_dist[n + 1] = edge4_corner_prune[
+                    n_corner * e4 + c
+                ]
+                b = edge4_edge8_dist[n + 1] = edge4_edge8_prune[
+                    n_edge8 * e4 + e8
+                ]
+                dist = min_dist_2[n + 1] = a if a > b else b
+            else:
+                dist = min_dist_2[n + 1] = cost(n + 1)
+            if dist > depth - d - 1:
+                continue
+
+            if dist == 0:
+                self._countdown = countdown
+                return n + 1
+            d += 1
+            successors[d] = PHASE_2_SUCCESSORS[i]
+            index[d] = 0
+
     def _solution_to_string(self, length):
         """
         Generate solution string. Uses standard cube notation: F means
@@ -0,0 +1,108 @@
+"""
+Statistics describing the work done by a search.
+"""
+
+# pruning tables used by each heuristic, see SolutionManager
+HEURISTIC_TABLES = {
+    "udslice": ("udslice_twist_prune", "udslice_flip_prune"),
+    "flipslice_twist": ("flipslice_twist_prune",),
+    "edge4": ("edge4_corner_prune", "edge4_edge8_prune"),
+    "corner_edge8": ("edge4_corner_prune", "corner_edge8_prune"),
+}
+
+
+class SearchStats:
+    """
+    Statistics collected by SolutionManager.solve (and the twophase.solve
+    helpers) when passed an instance. Passing the same instance to several
+    solves accumulates their statistics.
+
+    Attributes
+    ----------
+    phase_1_nodes : list of int
+        Number of positions expanded in phase 1, indexed by the depth of the
+        phase 1 IDA* iteration.
+    phase_2_nodes : list of int
+        Number of positions expanded in phase 2, indexed by the depth of the
+        phase 2 IDA* iteration.
+    phase_2_entries : int
+        Number of times phase 1 reached the phase 2 subgroup and started a
+        phase 2 search.
+    phase_2_cache_hits : int
+        Number of those for which an earlier search from the same position
+        was remembered, see SolutionManager, and so skipped or shortened.
+    phase_1_time, phase_2_time : float
+        Time spent in each phase in seconds, excluding table loading.
+    table_load_time : float
+        Time spent loading (or building) tables in seconds.
+    cutoffs : dict
+        Number of positions pruned by each pruning table, i.e. whose distance
+        in that table exceeded the remaining depth. A position may be pruned by
+        more than one table.
+    """
+
+    def __init__(self):
+        self.phase_1_nodes = []
+        self.phase_2_nodes = []
+        self.phase_2_entries = 0
+        self.phase_2_cache_hits = 0
+        self.phase_1_time = 0.0
+        self.phase_2_time = 0.0
+        self.table_load_time = 0.0
+        self.cutoffs = {}
+
+    def __repr__(self):
+        return (
+            "SearchStats(nodes={}, phase_2_entries={}, phase_2_cache_hits={}, "
+            "phase_1_time={:.3f}, phase_2_time={:.3f}, table_load_time={:.3f}, "
+            "cutoffs={})".format(
+                self.nodes,
+                self.phase_2_entries,
+                self.phase_2_cache_hits,
+                self.phase_1_time,
+                self.phase_2_time,
+                self.table_load_time,
+                self.cutoffs,
+            )
+        )
+
+    @property
+    def nodes(self):
+        """
+        Total number of positions expanded in both phases.
+        """
+        return sum(self.phase_1_nodes) + sum(self.phase_2_nodes)
+
+    def as_dict(self):
+        """
+        The statistics as a dictionary, e.g. for serialising to JSON.
+        """
+        return {
+            "phase_1_nodes": list(self.phase_1_nodes),
+            "phase_2_nodes": list(self.phase_2_nodes),
+            "phase_2_entries": self.phase_2_entries,
+            "phase_2_cache_hits": self.phase_2_cache_hits,
+            "phase_1_time": self.phase_1_time,
+            "phase_2_time": self.phase_2_time,
+            "table_load_time": self.table_load_time,
+            "cutoffs": dict(self.cutoffs),
+        }
+
+    def add_node(self, phase, depth):
+        """
+        Count a position expanded in a phase 1 or 2 IDA* iteration of the
+        given depth.
+        """
+        nodes = self.phase_1_nodes if phase == 1 else self.phase_2_nodes
+        if len(nodes) <= depth:
+            nodes.extend([0] * (depth + 1 - len(nodes)))
+        nodes[depth] += 1
+
+    def add_cutoffs(self, distances, bound):
+        """
+        Count a cutoff for each pruning table whose distance exceeded bound.
+        distances is an iterable of pairs of table name and distance.
+        """
+        for name, dist in distances:
+            if dist > bound:
+                self.cutoffs[name] = self.cutoffs.get(name, 0) + 1
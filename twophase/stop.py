@@ -0,0 +1,136 @@
+"""
+Conditions for stopping searches early, shared between searches.
+
+A StopCondition combines a deadline, a node budget, a target length and
+cancellation in one object, which every search given it polls along with its
+own limits (see SolutionManager.solve). One condition can be shared by any
+number of searches in any number of threads, e.g. the variants of a portfolio
+or the searches serving a client, so that they all stop as soon as one of
+them finds a short enough solution, the budget runs out or the condition is
+cancelled from elsewhere.
+"""
+import threading
+import time
+
+
+class StopCondition:
+    """
+    Condition for stopping searches, polled by SolutionManager.solve every
+    check_interval positions. Searches stop with status -2 once the deadline
+    has passed, -3 once they've expanded max_nodes positions between them and
+    -4 once the condition is cancelled.
+
+    Parameters
+    ----------
+    max_time : int or float, optional
+        Time in seconds from now after which searches stop.
+    max_nodes : int, optional
+        Maximum number of positions expanded by all the searches polling the
+        condition in this process.
+    target_length : int, optional
+        Once a search finds a solution of at most this many moves, the
+        condition is cancelled, stopping every other search sharing it, and
+        solve_best stops looking for shorter solutions.
+    event : threading.Event, optional
+        Event that cancels the condition when set, by default a new
+        threading.Event. Pass a multiprocessing.Event to share the condition
+        with other processes, e.g. as an argument of multiprocessing.Process
+        or a pool initializer, so that any of them can cancel it.
+
+    Attributes
+    ----------
+    nodes : int
+        Number of positions expanded by the searches so far.
+    best_length : int or None
+        Length of the shortest solution reported by the searches, see found.
+    """
+
+    def __init__(
+        self, max_time=None, max_nodes=None, target_length=None, event=None
+    ):
+        if max_nodes is not None and max_nodes < 0:
+            raise ValueError(
+                "max_nodes must be non-negative, got {}".format(max_nodes)
+            )
+        self.deadline = (
+            float("inf") if max_time is None else time.monotonic() + max_time
+        )
+        self.max_nodes = float("inf") if max_nodes is None else max_nodes
+        self.target_length = target_length
+        self.event = threading.Event() if event is None else event
+        # guards nodes, which searches in several threads add to at once
+        self._lock = threading.Lock()
+        self.nodes = 0
+        self.best_length = None
+
+    def __repr__(self):
+        return (
+            "StopCondition(remaining_time={:.3f}, nodes={}, best_length={}, "
+            "cancelled={})".format(
+                self.remaining_time,
+                self.nodes,
+                self.best_length,
+                self.cancelled,
+            )
+        )
+
+    def __getstate__(self):
+        # each process counts its own nodes under its own lock
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self):
+        return self.event.is_set()
+
+    @property
+    def remaining_time(self):
+        """
+        Seconds until the deadline, at least 0.
+        """
+        return max(self.deadline - time.monotonic(), 0)
+
+    @property
+    def remaining_nodes(self):
+        return max(self.max_nodes - self.nodes, 0)
+
+    def cancel(self):
+        """
+        Stop every search polling the condition. Safe to call from any thread,
+        or any process if the event is a multiprocessing.Event.
+        """
+        self.event.set()
+
+    def check(self, nodes=0):
+        """
+        Count nodes more positions expanded, and return the status a search
+        should stop with: -2 if the deadline has passed, -3 if the node budget
+        is exhausted, -4 if the condition was cancelled and 0 otherwise.
+        """
+        with self._lock:
+            self.nodes += nodes
+            exhausted = self.nodes >= self.max_nodes
+        if exhausted:
+            return -3
+        if time.monotonic() > self.deadline:
+            return -2
+        if self.event.is_set():
+            return -4
+        return 0
+
+    def found(self, solution):
+        """
+        Report a solution found by a search, cancelling the condition if it's
+        no longer than target_length.
+        """
+        length = len(solution.split())
+        with self._lock:
+            if self.best_length is None or length < self.best_length:
+                self.best_length = length
+        if self.target_length is not None and length <= self.target_length:
+            self.cancel()
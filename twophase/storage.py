@@ -0,0 +1,308 @@
+"""
+Compact binary storage for move and pruning tables.
+
+Tables are stored as flat typed arrays in a single file with the following
+layout (all integers little-endian)
+
+    header      magic (4s), format version (H), table count (H),
+                content version (I), directory checksum (I)
+    directory   one entry per table: name (32s), typecode (1s), padding (7x),
+                length (Q), offset (Q), checksum (I), padding (4x)
+    payload     raw table data, each table aligned to 8 bytes
+
+Each table carries its own CRC32 checksum so that a corrupt or outdated file
+is detected on load and can be rebuilt rather than silently used. Tables are
+read individually through TableFile, either copied into memory or accessed in
+place from a memory-mapped file, in which case every process mapping the file
+shares a single physical copy of the tables through the page cache.
+
+Table files are written atomically, and builds can be serialised across
+processes with ``file_lock``, so that concurrent processes never read a
+partially written file.
+"""
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import zlib
+from array import array
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    import msvcrt
+
+    fcntl = None
+
+MAGIC = b"TWPH"
+FORMAT_VERSION = 2
+
+_HEADER = struct.Struct("<4sHHII")
+_ENTRY = struct.Struct("<32s1s7xQQI4x")
+_NAME_LENGTH = 32
+_ALIGN = 8
+
+
+def _align(n):
+    return (n + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+def _to_little_endian(arr):
+    if sys.byteorder == "big" and arr.itemsize > 1:
+        arr = array(arr.typecode, arr)
+        arr.byteswap()
+    return arr
+
+
+def write_tables(path, tables, version):
+    """
+    Write tables to path in the binary table format. The tables are written to
+    a temporary file which is then renamed to path, so readers see either the
+    old file or the complete new one.
+
+    Parameters
+    ----------
+    path : str
+        Location of the file to write.
+    tables : dict
+        Mapping of table name to ``array.array`` holding the table entries.
+    version : int
+        Content version of the tables. Files with a different version are
+        rejected by ``TableFile``.
+    """
+    directory = []
+    payload = []
+    offset = _align(_HEADER.size + _ENTRY.size * len(tables))
+    for name, arr in tables.items():
+        if len(name.encode("ascii")) > _NAME_LENGTH:
+            raise ValueError(f"table name {name} is too long")
+        data = _to_little_endian(arr).tobytes()
+        directory.append(
+            _ENTRY.pack(
+                name.encode("ascii"),
+                arr.typecode.encode("ascii"),
+                len(arr),
+                offset,
+                zlib.crc32(data),
+            )
+        )
+        padding = _align(len(data)) - len(data)
+        payload.append(data + b"\0" * padding)
+        offset += len(data) + padding
+
+    directory = b"".join(directory)
+    header = _HEADER.pack(
+        MAGIC, FORMAT_VERSION, len(tables), version, zlib.crc32(directory)
+    )
+    start = header + directory
+    fd, tmp = tempfile.mkstemp(
+        prefix=os.path.basename(path) + ".",
+        suffix=".tmp",
+        dir=os.path.dirname(path) or ".",
+    )
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(start)
+            f.write(b"\0" * (_align(len(start)) - len(start)))
+            for data in payload:
+                f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+@contextmanager
+def file_lock(path):
+    """
+    Context manager holding an exclusive lock on the file at path, which is
+    created if it doesn't exist. Blocks until the lock is acquired, so that
+    exactly one process at a time holds the lock.
+    """
+    with open(path, "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            while True:
+                try:
+                    # LK_LOCK gives up after 10 seconds, keep waiting
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    pass
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def read_directory(buffer, version):
+    """
+    Parse and validate the header and directory of a table file.
+
+    Parameters
+    ----------
+    buffer : bytes-like
+        Contents of the table file (or at least its header and directory).
+    version : int
+        Expected content version of the tables.
+
+    Returns
+    -------
+    dict
+        Mapping of table name to ``(typecode, length, offset, checksum)``.
+
+    Raises
+    ------
+    ValueError
+        If the header is malformed, the file is outdated or the directory is
+        corrupt.
+    """
+    buffer = memoryview(buffer)
+    end = _directory_end(buffer, version)
+    if len(buffer) < end:
+        raise ValueError("table file is truncated")
+    checksum = _HEADER.unpack_from(buffer)[4]
+    if zlib.crc32(buffer[_HEADER.size : end]) != checksum:
+        raise ValueError("table file directory is corrupt")
+
+    directory = {}
+    for i in range((end - _HEADER.size) // _ENTRY.size):
+        name, typecode, length, offset, crc = _ENTRY.unpack_from(
+            buffer, _HEADER.size + i * _ENTRY.size
+        )
+        directory[name.rstrip(b"\0").decode("ascii")] = (
+            typecode.decode("ascii"),
+            length,
+            offset,
+            crc,
+        )
+    return directory
+
+
+def _directory_end(header, version):
+    """
+    Validate the header of a table file, returning the end of the directory.
+    """
+    if len(header) < _HEADER.size:
+        raise ValueError("table file is truncated")
+    magic, fmt, count, content, _ = _HEADER.unpack_from(header)
+    if magic != MAGIC:
+        raise ValueError("not a table file")
+    if fmt != FORMAT_VERSION or content != version:
+        raise ValueError("table file is outdated")
+    return _HEADER.size + _ENTRY.size * count
+
+
+def _check_table(data, entry):
+    typecode, length, _, checksum = entry
+    if len(data) != length * array(typecode).itemsize:
+        raise ValueError("table file is truncated")
+    if zlib.crc32(data) != checksum:
+        raise ValueError("table file is corrupt")
+
+
+class TableFile:
+    """
+    Read access to the tables stored in a table file.
+
+    Only the header and directory are read when the file is opened, each table
+    is then read (and checked against its checksum) on request, so that a
+    process only pays for the tables it uses.
+
+    Parameters
+    ----------
+    path : str
+        Location of the table file.
+    version : int
+        Expected content version of the tables.
+    use_mmap : bool, optional
+        If True, the file is memory-mapped read-only and tables are returned as
+        memoryviews backed directly by the mapping. Every process that maps the
+        same file, including processes forked after it has been mapped, then
+        shares a single physical copy of the tables through the page cache. On
+        big-endian hosts the tables can't be used in place, so they are read
+        into memory instead.
+
+    Raises
+    ------
+    OSError
+        If the file can't be read.
+    ValueError
+        If the file is outdated or its directory is corrupt.
+    """
+
+    def __init__(self, path, version, use_mmap=False):
+        self.path = path
+        self.use_mmap = use_mmap and sys.byteorder == "little"
+        with open(path, "rb") as f:
+            if self.use_mmap:
+                self._buffer = mmap.mmap(
+                    f.fileno(), 0, access=mmap.ACCESS_READ
+                )
+                self.directory = read_directory(self._buffer, version)
+            else:
+                header = f.read(_HEADER.size)
+                end = _directory_end(header, version)
+                self.directory = read_directory(
+                    header + f.read(end - len(header)), version
+                )
+
+    def __contains__(self, name):
+        return name in self.directory
+
+    def close(self):
+        """
+        Unmap the file if it's memory-mapped. If tables read from it are still
+        in use, the mapping is released once the last of them is.
+        """
+        if self.use_mmap:
+            try:
+                self._buffer.close()
+            except BufferError:
+                pass
+
+    def read(self, name):
+        """
+        Read a single table.
+
+        Returns
+        -------
+        array.array or memoryview
+            The table entries, as a read-only memoryview of the mapped file if
+            the file is memory-mapped.
+
+        Raises
+        ------
+        ValueError
+            If the table is missing or corrupt.
+        """
+        if name not in self.directory:
+            raise ValueError(f"table file is missing table {name}")
+        entry = self.directory[name]
+        typecode, length, offset, _ = entry
+        size = length * array(typecode).itemsize
+        if self.use_mmap:
+            data = memoryview(self._buffer)[offset : offset + size]
+            _check_table(data, entry)
+            return data.cast(typecode)
+
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            data = f.read(size)
+        _check_table(data, entry)
+        arr = array(typecode)
+        arr.frombytes(data)
+        if sys.byteorder == "big":
+            arr.byteswap()
+        return arr
@@ -0,0 +1,369 @@
+"""
+Builders for pruning tables reduced by the symmetries of the cube.
+
+Positions that are conjugate under one of the 16 symmetries preserving the UD
+axis are the same distance from the start of phase 2 (and from the solved
+cube), so a pruning table only needs an entry for one position in each
+equivalence class. A coordinate is reduced by grouping its raw values into
+classes, recording for each raw value its class and a symmetry s such that
+conjugating by s maps the raw value onto the representative of its class. The
+second coordinate of the pruning table is then conjugated by the same
+symmetry, using a conjugation table.
+
+The reduced tables are large, so they are built directly in the packed 2-bit
+format of PackedPruningTable.
+"""
+from array import array
+
+from .cubes.cubiecube import CubieCube
+from .cubes.symmetry import N_SYM_UD, SYM_INV, conjugate
+from .tables import PHASE_1_MOVES, PHASE_2_MOVES
+
+# marks an unassigned class index
+INVALID = 0xFFFF
+
+
+def make_conj_table(size, setter, getter):
+    """
+    Conjugation table for a coordinate, entry 16 * x + s is the coordinate of
+    S * c * S^-1 where c is a cube with coordinate x.
+    """
+    conj = array("H", bytes(2 * size * N_SYM_UD))
+    cc = CubieCube()
+    for x in range(size):
+        setter(cc, x)
+        for s in range(N_SYM_UD):
+            conj[N_SYM_UD * x + s] = getter(conjugate(cc, s))
+    return conj
+
+
+def make_sym_classes(size, setter, getter):
+    """
+    Reduce a coordinate by the symmetries preserving the UD axis.
+
+    Parameters
+    ----------
+    size : int
+        Number of raw values of the coordinate.
+    setter, getter : callable
+        Set the raw coordinate of a CubieCube, and compute it.
+
+    Returns
+    -------
+    classidx : array
+        Class of each raw value.
+    sym : array
+        For each raw value x, a symmetry s such that S * x * S^-1 is the
+        representative of the class of x.
+    rep : array
+        Raw value of the representative of each class.
+    sym_state : array
+        For each class a bitmask of the symmetries fixing its representative.
+    """
+    classidx = array("H", [INVALID]) * size
+    sym = array("B", bytes(size))
+    rep = array("i")
+    sym_state = array("H")
+    cc = CubieCube()
+    for x in range(size):
+        if classidx[x] != INVALID:
+            continue
+        c = len(rep)
+        classidx[x] = c
+        rep.append(x)
+        setter(cc, x)
+        state = 0
+        for s in range(N_SYM_UD):
+            # S^-1 * x * S, which maps to x when conjugated by s
+            y = getter(conjugate(cc, SYM_INV[s]))
+            if y == x:
+                state |= 1 << s
+            if classidx[y] == INVALID:
+                classidx[y] = c
+                sym[y] = s
+        sym_state.append(state)
+    return classidx, sym, rep, sym_state
+
+
+def make_sym_prune(
+    classidx, sym, rep, sym_state, conj, raw_move, other_move, moves
+):
+    """
+    Breadth first search over a symmetry reduced coordinate crossed with a
+    second coordinate, returning the distances mod 3 packed into 2 bits.
+
+    Entry n_other * c + y is the distance of the position whose reduced
+    coordinate has class c and whose second coordinate, conjugated onto the
+    representative of the class, is y.
+
+    Parameters
+    ----------
+    classidx, sym, rep, sym_state : array
+        Symmetry reduction of the first coordinate, see make_sym_classes.
+    conj : array
+        Conjugation table of the second coordinate, see make_conj_table.
+    raw_move : callable
+        raw_move(x, mv) is the raw first coordinate after applying move mv to
+        a position with raw first coordinate x.
+    other_move : array
+        Move table of the second coordinate.
+    moves : iterable of int
+        Moves used in the search.
+
+    Notes
+    -----
+    The table is filled by scanning every entry once per depth. Positions at
+    the current depth are expanded while few positions have been reached,
+    afterwards it's cheaper to search backwards, checking each unreached
+    position for a neighbour at the current depth. Entries are set to 3
+    until reached.
+    """
+    n_other = len(other_move) // 18
+    total = len(rep) * n_other
+    table = bytearray(b"\xff") * ((total + 3) // 4)
+    moves = list(moves)
+
+    def get(i):
+        return (table[i >> 2] >> ((i & 3) << 1)) & 3
+
+    def put(i, value):
+        shift = (i & 3) << 1
+        table[i >> 2] = table[i >> 2] & ~(3 << shift) | (value << shift)
+
+    def neighbour(x, y, mv):
+        x1 = raw_move(x, mv)
+        y1 = conj[N_SYM_UD * other_move[18 * y + mv] + sym[x1]]
+        return classidx[x1], y1
+
+    put(0, 0)
+    done, depth, frontier = 1, 0, 1
+    while done < total:
+        current, following = depth % 3, (depth + 1) % 3
+        backwards = total - done < frontier
+        frontier = 0
+        for c in range(len(rep)):
+            x = rep[c]
+            for y in range(n_other):
+                i = n_other * c + y
+                value = get(i)
+                if backwards:
+                    if value != 3:
+                        continue
+                    for mv in moves:
+                        c1, y1 = neighbour(x, y, mv)
+                        if get(n_other * c1 + y1) == current:
+                            put(i, following)
+                            frontier += 1
+                            break
+                    continue
+
+                if value != current:
+                    continue
+                for mv in moves:
+                    c1, y1 = neighbour(x, y, mv)
+                    i1 = n_other * c1 + y1
+                    if get(i1) != 3:
+                        continue
+                    put(i1, following)
+                    frontier += 1
+                    # if the representative is fixed by some symmetries, the
+                    # position has other entries in the table
+                    state = sym_state[c1] >> 1
+                    s = 1
+                    while state:
+                        if state & 1:
+                            i2 = n_other * c1 + conj[N_SYM_UD * y1 + s]
+                            if get(i2) == 3:
+                                put(i2, following)
+                                frontier += 1
+                        state >>= 1
+                        s += 1
+        done += frontier
+        depth += 1
+    # clear the entries padding the last byte, as pack_mod3 does
+    for i in range(total, 4 * len(table)):
+        put(i, 0)
+    return table
+
+
+def _numpy_tables(use_numpy):
+    """
+    The twophase.numpy_tables module, or None if NumPy isn't to be used.
+    """
+    if use_numpy is False:
+        return None
+    try:
+        from . import numpy_tables
+    except ImportError:
+        if use_numpy:
+            raise
+        return None
+    return numpy_tables
+
+
+def build_flipslice_twist_tables(cls, use_numpy=None):
+    """
+    Build the symmetry reduced phase 1 pruning table over the flipslice
+    coordinate (udslice and flip combined as FLIP * udslice + flip) crossed
+    with twist, together with the tables needed to index it.
+
+    The BFS visits about 140 million entries, which takes a few minutes with
+    NumPy (see use_numpy in Tables.build_tables) and hours without.
+
+    Returns
+    -------
+    dict
+        Mapping of table name to array, as stored in the table file.
+    """
+
+    def set_flipslice(cc, x):
+        cc.udslice, cc.flip = divmod(x, cls.FLIP)
+
+    def get_flipslice(cc):
+        return cls.FLIP * cc.udslice + cc.flip
+
+    def set_twist(cc, x):
+        cc.twist = x
+
+    twist_conj = make_conj_table(cls.TWIST, set_twist, lambda cc: cc.twist)
+    classidx, sym, rep, sym_state = make_sym_classes(
+        cls.UDSLICE * cls.FLIP, set_flipslice, get_flipslice
+    )
+
+    numpy_tables = _numpy_tables(use_numpy)
+    if numpy_tables is not None:
+        prune = numpy_tables.make_flipslice_twist_prune(
+            cls, classidx, sym, rep, sym_state, twist_conj, PHASE_1_MOVES
+        )
+    else:
+        udslice_move, flip_move = cls.udslice_move, cls.flip_move
+
+        def raw_move(x, mv):
+            udslice, flip = divmod(x, cls.FLIP)
+            return (
+                cls.FLIP * udslice_move[18 * udslice + mv]
+                + flip_move[18 * flip + mv]
+            )
+
+        prune = make_sym_prune(
+            classidx,
+            sym,
+            rep,
+            sym_state,
+            twist_conj,
+            raw_move,
+            cls.twist_move,
+            PHASE_1_MOVES,
+        )
+
+    return {
+        "twist_conj": twist_conj,
+        "flipslice_classidx": classidx,
+        "flipslice_sym": sym,
+        "flipslice_rep": rep,
+        "flipslice_sym_state": sym_state,
+        "flipslice_twist_prune": array("B", prune),
+    }
+
+
+def build_corner_edge8_tables(cls, use_numpy=None):
+    """
+    Build the symmetry reduced phase 2 pruning table over the corner
+    coordinate crossed with edge8, together with the tables needed to index
+    it.
+
+    The BFS visits about 110 million entries, which takes a few minutes with
+    NumPy (see use_numpy in Tables.build_tables) and hours without.
+
+    Returns
+    -------
+    dict
+        Mapping of table name to array, as stored in the table file.
+    """
+
+    def set_corner(cc, x):
+        cc.corner = x
+
+    def set_edge8(cc, x):
+        cc.edge8 = x
+
+    edge8_conj = make_conj_table(cls.EDGE8, set_edge8, lambda cc: cc.edge8)
+    classidx, sym, rep, sym_state = make_sym_classes(
+        cls.CORNER, set_corner, lambda cc: cc.corner
+    )
+
+    numpy_tables = _numpy_tables(use_numpy)
+    if numpy_tables is not None:
+        prune = numpy_tables.make_corner_edge8_prune(
+            cls, classidx, sym, rep, sym_state, edge8_conj, PHASE_2_MOVES
+        )
+    else:
+        corner_move = cls.corner_move
+
+        def raw_move(x, mv):
+            return corner_move[18 * x + mv]
+
+        prune = make_sym_prune(
+            classidx,
+            sym,
+            rep,
+            sym_state,
+            edge8_conj,
+            raw_move,
+            cls.edge8_move,
+            PHASE_2_MOVES,
+        )
+
+    return {
+        "edge8_conj": edge8_conj,
+        "corner_classidx": classidx,
+        "corner_sym": sym,
+        "corner_rep": rep,
+        "corner_sym_state": sym_state,
+        "corner_edge8_prune": array("B", prune),
+    }
+
+
+def build_corner_twist_tables(cls, use_numpy=None):
+    """
+    Build the pattern database of the corners used by the optimal solver (see
+    twophase.optimal), a symmetry reduced pruning table over the corner
+    coordinate crossed with twist covering all 88 million positions of the
+    corners. It's indexed with the corner classes of corner_edge8.bin and
+    twist_conj of flipslice_twist.bin, which are built first if necessary.
+
+    The BFS visits about 6 million entries, which takes seconds with NumPy
+    (see use_numpy in Tables.build_tables) and some minutes without.
+
+    Returns
+    -------
+    dict
+        Mapping of table name to array, as stored in the table file.
+    """
+    classidx, sym = cls.corner_classidx, cls.corner_sym
+    rep, sym_state = cls.corner_rep, cls.corner_sym_state
+    twist_conj = cls.twist_conj
+
+    numpy_tables = _numpy_tables(use_numpy)
+    if numpy_tables is not None:
+        prune = numpy_tables.make_corner_twist_prune(
+            cls, classidx, sym, rep, sym_state, twist_conj, PHASE_1_MOVES
+        )
+    else:
+        corner_move = cls.corner_move
+
+        def raw_move(x, mv):
+            return corner_move[18 * x + mv]
+
+        prune = make_sym_prune(
+            classidx,
+            sym,
+            rep,
+            sym_state,
+            twist_conj,
+            raw_move,
+            cls.twist_move,
+            PHASE_1_MOVES,
+        )
+
+    return {"corner_twist_prune": array("B", prune)}
@@ -1,7 +1,90 @@
-import json
 import os
+import sys
+import time
+from array import array
+from itertools import chain
 
+from . import storage
 from .cubes.cubiecube import MOVE_CUBE, CubieCube
+from .pieces import Edge
+
+TABLES_FILE = "tables.bin"
+# environment variable overriding the directory the table file is stored in
+CACHE_DIR_ENV = "TWOPHASE_CACHE_DIR"
+# increment whenever the contents of the tables change so that stale table
+# files get rebuilt
+TABLES_VERSION = 3
+
+# typecode used to store each move table, small coordinates fit in 16 bits
+MOVE_TABLES = {
+    "twist_move": "h",
+    "flip_move": "h",
+    "udslice_move": "h",
+    "edge4_move": "h",
+    "edge8_move": "i",
+    "corner_move": "i",
+    "udslice_sorted_move": "h",
+    "u_edges_move": "h",
+    "d_edges_move": "h",
+}
+# maps the u_edges and d_edges coordinates tracked during phase 1 to edge8 once
+# the cube is in phase 2 position, see Tables.make_edge8_combine_table
+COMBINE_TABLES = {"edge8_combine": "i"}
+# pruning tables store distances, which fit in 8 bits. each is also stored
+# packed, see PackedPruningTable
+PRUNING_TABLES = (
+    "udslice_twist_prune",
+    "udslice_flip_prune",
+    "edge4_edge8_prune",
+    "edge4_corner_prune",
+)
+TABLE_NAMES = (*MOVE_TABLES, *COMBINE_TABLES, *PRUNING_TABLES)
+
+# symmetry reduced pruning tables (see twophase.symmetry_tables) are large and
+# slow to build, so each is stored in its own file along with the tables used
+# to index it, and is only built when first used. maps each file to its
+# content version, the tables it holds, and the function in
+# twophase.symmetry_tables building them
+SYMMETRY_TABLE_FILES = {
+    "flipslice_twist.bin": (
+        1,
+        (
+            "twist_conj",
+            "flipslice_classidx",
+            "flipslice_sym",
+            "flipslice_rep",
+            "flipslice_sym_state",
+            "flipslice_twist_prune",
+        ),
+        "build_flipslice_twist_tables",
+    ),
+    "corner_edge8.bin": (
+        1,
+        (
+            "edge8_conj",
+            "corner_classidx",
+            "corner_sym",
+            "corner_rep",
+            "corner_sym_state",
+            "corner_edge8_prune",
+        ),
+        "build_corner_edge8_tables",
+    ),
+    "corner_twist.bin": (
+        1,
+        ("corner_twist_prune",),
+        "build_corner_twist_tables",
+    ),
+}
+SYMMETRY_TABLE_NAMES = tuple(
+    chain.from_iterable(names for _, names, _ in SYMMETRY_TABLE_FILES.values())
+)
+
+# moves available in each phase, move mv = 3 * i + j - 1 turns face i
+# (U, R, F, D, L, B) clockwise j quarter turns. in phase 2 only half turns of
+# R, F, L and B are allowed
+PHASE_1_MOVES = tuple(range(18))
+PHASE_2_MOVES = (0, 1, 2, 4, 7, 9, 10, 11, 13, 16)
 
 
 class PruningTable:
@@ -9,6 +92,10 @@ class PruningTable:
     Helper class to allow pruning to be used as though they were 2-D tables
     """
 
+    # the distance of the position at index i = x[0] * stride + x[1] is
+    # table[i], see distance_at
+    packed = False
+
     def __init__(self, table, stride):
         self.table = table
         self.stride = stride
@@ -16,19 +103,212 @@ class PruningTable:
     def __getitem__(self, x):
         return self.table[x[0] * self.stride + x[1]]
 
+    def distance(self, x, parent=None):
+        """
+        Distance to the solved state of the position x. parent is ignored, it
+        is accepted for compatibility with PackedPruningTable.
+        """
+        return self.table[x[0] * self.stride + x[1]]
+
+    def distance_at(self, i, parent):
+        """
+        Distance to the solved state of the position at index
+        i = x[0] * stride + x[1]. parent is ignored.
+        """
+        return self.table[i]
+
+
+class PackedPruningTable:
+    """
+    Pruning table storing each distance modulo 3 in 2 bits, four entries to a
+    byte.
+
+    A single move changes the distance by at most one, so the exact distance of
+    a position can be recovered from its distance mod 3 and the exact distance
+    of its parent in the search tree. The exact distance of a position without
+    a parent is found by greedily descending to the solved state, using the
+    move tables of the two coordinates.
+    """
+
+    packed = True
+
+    def __init__(self, table, stride, move_tables, moves):
+        self.table = table
+        self.stride = stride
+        self.move_tables = move_tables
+        self.moves = moves
+
+    def __getitem__(self, x):
+        """
+        Distance mod 3 to the solved state of the position x.
+        """
+        i = x[0] * self.stride + x[1]
+        return (self.table[i >> 2] >> ((i & 3) << 1)) & 3
+
+    def distance(self, x, parent=None):
+        """
+        Distance to the solved state of the position x, given the distance of
+        its parent. If parent is None, the distance is recovered by descending
+        to the solved state.
+        """
+        if parent is None:
+            return self._descend(x)
+        return parent + (self[x] - parent + 1) % 3 - 1
+
+    def distance_at(self, i, parent):
+        """
+        Distance to the solved state of the position at index
+        i = x[0] * stride + x[1], given the distance of its parent.
+        """
+        mod = (self.table[i >> 2] >> ((i & 3) << 1)) & 3
+        return parent + (mod - parent + 1) % 3 - 1
+
+    def _descend(self, x):
+        x = tuple(x)
+        mod = self[x]
+        depth = 0
+        while any(x):
+            # some move reduces the distance by one, and it's the only kind
+            # of move that reduces the distance mod 3 by one
+            target = (mod - 1) % 3
+            for mv in self.moves:
+                y = tuple(
+                    move[18 * coord + mv]
+                    for move, coord in zip(self.move_tables, x)
+                )
+                if self[y] == target:
+                    x, mod = y, target
+                    depth += 1
+                    break
+            else:
+                raise RuntimeError("Invalid packed pruning table.")
+        return depth
+
+
+class FlipsliceTwistPruningTable(PackedPruningTable):
+    """
+    Packed pruning table giving the exact distance to phase 2, over the
+    flipslice coordinate (FLIP * udslice + flip) reduced by the 16 symmetries
+    preserving the UD axis, crossed with twist. See twophase.symmetry_tables.
+
+    Positions are given as (udslice, flip, twist).
+    """
+
+    def __init__(self, table, classidx, sym, twist_conj, move_tables, moves):
+        super().__init__(table, len(move_tables[2]) // 18, move_tables, moves)
+        self.classidx = classidx
+        self.sym = sym
+        self.twist_conj = twist_conj
+        self.n_flip = len(move_tables[1]) // 18
+
+    def __getitem__(self, x):
+        udslice, flip, twist = x
+        flipslice = self.n_flip * udslice + flip
+        i = (
+            self.stride * self.classidx[flipslice]
+            + self.twist_conj[(twist << 4) + self.sym[flipslice]]
+        )
+        return (self.table[i >> 2] >> ((i & 3) << 1)) & 3
+
+
+class CornerEdge8PruningTable(PackedPruningTable):
+    """
+    Packed pruning table bounding the length of phase 2, over the corner
+    coordinate reduced by the 16 symmetries preserving the UD axis, crossed
+    with edge8. See twophase.symmetry_tables.
+
+    Positions are given as (corner, edge8).
+    """
+
+    def __init__(self, table, classidx, sym, edge8_conj, move_tables, moves):
+        super().__init__(table, len(move_tables[1]) // 18, move_tables, moves)
+        self.classidx = classidx
+        self.sym = sym
+        self.edge8_conj = edge8_conj
+
+    def __getitem__(self, x):
+        corner, edge8 = x
+        i = (
+            self.stride * self.classidx[corner]
+            + self.edge8_conj[(edge8 << 4) + self.sym[corner]]
+        )
+        return (self.table[i >> 2] >> ((i & 3) << 1)) & 3
+
+
+class CornerTwistPruningTable(CornerEdge8PruningTable):
+    """
+    Packed pruning table giving the exact number of moves needed to solve the
+    corners, over the corner coordinate reduced by the 16 symmetries
+    preserving the UD axis, crossed with twist. See twophase.symmetry_tables
+    and twophase.optimal.
+
+    Positions are given as (corner, twist).
+    """
+
+
+def pack_mod3(table):
+    """
+    Pack a table of distances into 2-bit entries storing distance mod 3.
+    """
+    packed = bytearray((len(table) + 3) // 4)
+    for i, d in enumerate(table):
+        packed[i >> 2] |= (d % 3) << ((i & 3) << 1)
+    return packed
+
+
+def pruning_arrays(name, table):
+    """
+    Arrays storing a pruning table in the table file, both as bytes and packed.
+    """
+    return {
+        name: array("b", table),
+        name + "_packed": array("B", pack_mod3(table)),
+    }
+
+
+def default_cache_dir():
+    """
+    Per-user cache directory the table file is stored in by default.
+    """
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+        return os.path.join(base, "twophase", "Cache")
+    if sys.platform == "darwin":
+        return os.path.expanduser("~/Library/Caches/twophase")
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(base, "twophase")
+
+
+class _LazyTable:
+    """
+    Descriptor for a table held by Tables. The table is loaded (or built) on
+    first access, after which it replaces the descriptor as a plain class
+    attribute so that subsequent lookups cost nothing extra.
+    """
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, instance, owner):
+        return owner._load_table(self.name)
+
 
 class Tables:
     """
     Class for holding move and pruning tables in memory.
 
     Move tables are used for updating coordinate representation of cube when a
-    particular move is applied.
+    particular move is applied. They are flat arrays, the coordinate after
+    applying move mv to coordinate x is table[18 * x + mv].
 
     Pruning tables are used to obtain lower bounds for the number of moves
     required to reach a solution given a particular pair of coordinates.
-    """
 
-    _tables_loaded = False
+    Each table is loaded from the table file (or the tables are built, if the
+    file is missing, corrupt or outdated) the first time it is accessed, so
+    creating an instance is free and operations that don't need a table never
+    load it.
+    """
 
     # 3^7 possible corner orientations
     TWIST = 2187
@@ -42,161 +322,512 @@ class Tables:
     EDGE8 = 40320
     # 8! possible permutations of the corners
     CORNER = 40320
+    # 12C4 * 4! possible positions and orders of FR, FL, BL, BR
+    UDSLICE_SORTED = 11880
+    # 12C4 * 4! possible positions and orders of UR, UF, UL, UB (DR, DF, DL,
+    # DB), of which 8C4 * 4! are possible in phase two
+    U_EDGES = 11880
+    D_EDGES = 11880
+    U_EDGES_PHASE_2 = 1680
     # 12! possible permutations of all edges
     EDGE = 479001600
     # 6*3 possible moves
     MOVES = 18
 
-    def __init__(self):
-        if not self._tables_loaded:
-            self.load_tables()
+    # ----------  Phase 1 move tables  ---------- #
+    twist_move = _LazyTable()
+    flip_move = _LazyTable()
+    udslice_move = _LazyTable()
+
+    # ----------  Phase 2 move tables  ---------- #
+    edge4_move = _LazyTable()
+    edge8_move = _LazyTable()
+    corner_move = _LazyTable()
+
+    # ----------  Phase 1 tracking of phase 2 coordinates  ---------- #
+    udslice_sorted_move = _LazyTable()
+    u_edges_move = _LazyTable()
+    d_edges_move = _LazyTable()
+    edge8_combine = _LazyTable()
+
+    # ----------  Phase 1 pruning tables  ---------- #
+    udslice_twist_prune = _LazyTable()
+    udslice_flip_prune = _LazyTable()
+
+    # --------  Phase 2 pruning tables  ---------- #
+    edge4_edge8_prune = _LazyTable()
+    edge4_corner_prune = _LazyTable()
+
+    # ----------  Symmetry reduced pruning tables  ---------- #
+    twist_conj = _LazyTable()
+    flipslice_classidx = _LazyTable()
+    flipslice_sym = _LazyTable()
+    flipslice_rep = _LazyTable()
+    flipslice_sym_state = _LazyTable()
+    flipslice_twist_prune = _LazyTable()
+    edge8_conj = _LazyTable()
+    corner_classidx = _LazyTable()
+    corner_sym = _LazyTable()
+    corner_rep = _LazyTable()
+    corner_sym_state = _LazyTable()
+    corner_edge8_prune = _LazyTable()
+    corner_twist_prune = _LazyTable()
+
+    # options used when loading tables, see configure
+    _use_mmap = False
+    _packed = False
+    _workers = 1
+    _cache_dir = None
+    # open table files, by file name
+    _table_files = {}
+    # total time in seconds spent loading (or building) tables, see
+    # twophase.stats.SearchStats. tables load other tables while they're
+    # built, only the outermost load is timed
+    load_time = 0.0
+    _loading = 0
+
+    @classmethod
+    def configure(
+        cls, use_mmap=False, packed=False, workers=1, cache_dir=None
+    ):
+        """
+        Set how tables are loaded. Any tables already loaded are discarded and
+        will be loaded again with the new options when next accessed.
+
+        Parameters
+        ----------
+        use_mmap : bool, optional
+            If True, the tables are memory-mapped read-only from the table file
+            rather than copied into memory. Every process that maps the file
+            then shares a single physical copy of the tables, so configure this
+            before forking worker processes (or in each worker's initializer)
+            to avoid each worker holding its own copy.
+        packed : bool, optional
+            If True, use pruning tables packed to 2 bits per entry (see
+            PackedPruningTable), which use a quarter of the memory at the cost
+            of slightly slower lookups. Symmetry reduced pruning tables are
+            always packed.
+        workers : int, optional
+            Number of worker processes used if the tables need to be built,
+            see build_tables.
+        cache_dir : str, optional
+            Directory the table file is stored in. Defaults to the value of
+            the TWOPHASE_CACHE_DIR environment variable if set, otherwise a
+            per-user cache directory, see default_cache_dir.
+        """
+        cls._use_mmap = use_mmap
+        cls._packed = packed
+        cls._workers = workers
+        cls._cache_dir = cache_dir
+        cls._reset()
+
+    @classmethod
+    def configuration(cls):
+        """
+        The options last passed to configure, e.g. to configure worker
+        processes in the same way.
+        """
+        return {
+            "use_mmap": cls._use_mmap,
+            "packed": cls._packed,
+            "workers": cls._workers,
+            "cache_dir": cls._cache_dir,
+        }
+
+    @classmethod
+    def configure_worker(cls, configuration):
+        """
+        Configure a worker process like the parent, given the parent's
+        configuration. Forked workers inherit the tables the parent already
+        loaded and keep them, others load the tables as the parent would.
+        Used as (or called by) the initializer of process pools.
+        """
+        if cls.configuration() != configuration:
+            cls.configure(**configuration)
+
+    @classmethod
+    def _reset(cls):
+        """
+        Discard all loaded tables, so that they are loaded again on access.
+        """
+        table_files, cls._table_files = cls._table_files, {}
+        for name in (*TABLE_NAMES, *SYMMETRY_TABLE_NAMES):
+            table = _LazyTable()
+            table.__set_name__(cls, name)
+            setattr(cls, name, table)
+        # close the files once the tables read from them have been dropped
+        for table_file in table_files.values():
+            table_file.close()
 
     @classmethod
-    def load_tables(cls):
-        if os.path.isfile("tables.json"):
-            with open("tables.json", "r") as f:
-                tables = json.load(f)
-            cls.twist_move = tables["twist_move"]
-            cls.flip_move = tables["flip_move"]
-            cls.udslice_move = tables["udslice_move"]
-            cls.edge4_move = tables["edge4_move"]
-            cls.edge8_move = tables["edge8_move"]
-            cls.corner_move = tables["corner_move"]
-            cls.udslice_twist_prune = PruningTable(
-                tables["udslice_twist_prune"], cls.TWIST
+    def load_tables(
+        cls, use_mmap=False, packed=False, workers=1, cache_dir=None
+    ):
+        """
+        Load every table now rather than on first access. Takes the same
+        options as configure. Symmetry reduced pruning tables are only loaded
+        when first used.
+        """
+        cls.configure(use_mmap, packed, workers, cache_dir)
+        for name in TABLE_NAMES:
+            getattr(cls, name)
+
+    @classmethod
+    def tables_path(cls, filename=TABLES_FILE):
+        """
+        Location of the table file, or of another file in the same directory.
+        """
+        cache_dir = (
+            cls._cache_dir
+            or os.environ.get(CACHE_DIR_ENV)
+            or default_cache_dir()
+        )
+        return os.path.join(cache_dir, filename)
+
+    @staticmethod
+    def _table_file_of(name):
+        """
+        Name and content version of the file storing the named table.
+        """
+        for filename, (version, names, _) in SYMMETRY_TABLE_FILES.items():
+            if name in names:
+                return filename, version
+        return TABLES_FILE, TABLES_VERSION
+
+    @classmethod
+    def _read_table_from_file(cls, name):
+        filename, version = cls._table_file_of(name)
+        if filename not in cls._table_files:
+            cls._table_files[filename] = storage.TableFile(
+                cls.tables_path(filename), version, cls._use_mmap
             )
-            cls.udslice_flip_prune = PruningTable(
-                tables["udslice_flip_prune"], cls.FLIP
+        return cls._table_files[filename].read(name)
+
+    @classmethod
+    def _build_table_file(cls, filename):
+        if filename == TABLES_FILE:
+            return cls.build_tables(workers=cls._workers)
+        from . import symmetry_tables
+
+        _, _, builder = SYMMETRY_TABLE_FILES[filename]
+        return getattr(symmetry_tables, builder)(cls)
+
+    @classmethod
+    def _read_table(cls, name):
+        if cls._packed and name in PRUNING_TABLES:
+            name += "_packed"
+        try:
+            return cls._read_table_from_file(name)
+        except (OSError, ValueError):
+            pass
+
+        # the table file is missing, corrupt or outdated. only one process
+        # builds the tables, any others wait for the lock and then load them
+        filename, version = cls._table_file_of(name)
+        path = cls.tables_path(filename)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with storage.file_lock(path + ".lock"):
+            table_file = cls._table_files.pop(filename, None)
+            if table_file is not None:
+                table_file.close()
+            try:
+                return cls._read_table_from_file(name)
+            except (OSError, ValueError):
+                tables = cls._build_table_file(filename)
+                storage.write_tables(path, tables, version)
+        # the builders may set tables as class attributes, discard them so
+        # that all tables are loaded from the file
+        cls._reset()
+        return cls._read_table_from_file(name)
+
+    @classmethod
+    def _load_table(cls, name):
+        start = time.perf_counter()
+        cls._loading += 1
+        try:
+            return cls._load_table_untimed(name)
+        finally:
+            cls._loading -= 1
+            if not cls._loading:
+                cls.load_time += time.perf_counter() - start
+
+    @classmethod
+    def _load_table_untimed(cls, name):
+        # move tables are used as stored, flat with the entry for move mv
+        # applied to coordinate x at index 18 * x + mv
+        table = cls._read_table(name)
+        if name == "flipslice_twist_prune":
+            table = FlipsliceTwistPruningTable(
+                table,
+                cls.flipslice_classidx,
+                cls.flipslice_sym,
+                cls.twist_conj,
+                (cls.udslice_move, cls.flip_move, cls.twist_move),
+                PHASE_1_MOVES,
             )
-            cls.edge4_edge8_prune = PruningTable(
-                tables["edge4_edge8_prune"], cls.EDGE8
+        elif name == "corner_edge8_prune":
+            table = CornerEdge8PruningTable(
+                table,
+                cls.corner_classidx,
+                cls.corner_sym,
+                cls.edge8_conj,
+                (cls.corner_move, cls.edge8_move),
+                PHASE_2_MOVES,
             )
-            cls.edge4_corner_prune = PruningTable(
-                tables["edge4_corner_prune"], cls.CORNER
+        elif name == "corner_twist_prune":
+            table = CornerTwistPruningTable(
+                table,
+                cls.corner_classidx,
+                cls.corner_sym,
+                cls.twist_conj,
+                (cls.corner_move, cls.twist_move),
+                PHASE_1_MOVES,
             )
-        else:
-            # ----------  Phase 1 move tables  ---------- #
-            cls.twist_move = cls.make_twist_table()
-            cls.flip_move = cls.make_flip_table()
-            cls.udslice_move = cls.make_udslice_table()
-
-            # ----------  Phase 2 move tables  ---------- #
-            cls.edge4_move = cls.make_edge4_table()
-            cls.edge8_move = cls.make_edge8_table()
-            cls.corner_move = cls.make_corner_table()
-
-            # ----------  Phase 1 pruning tables  ---------- #
-            cls.udslice_twist_prune = cls.make_udslice_twist_prune()
-            cls.udslice_flip_prune = cls.make_udslice_flip_prune()
-
-            # --------  Phase 2 pruning tables  ---------- #
-            cls.edge4_edge8_prune = cls.make_edge4_edge8_prune()
-            cls.edge4_corner_prune = cls.make_edge4_corner_prune()
-
-            tables = {
-                "twist_move": cls.twist_move,
-                "flip_move": cls.flip_move,
-                "udslice_move": cls.udslice_move,
-                "edge4_move": cls.edge4_move,
-                "edge8_move": cls.edge8_move,
-                "corner_move": cls.corner_move,
-                "udslice_twist_prune": cls.udslice_twist_prune.table,
-                "udslice_flip_prune": cls.udslice_flip_prune.table,
-                "edge4_edge8_prune": cls.edge4_edge8_prune.table,
-                "edge4_corner_prune": cls.edge4_corner_prune.table,
-            }
-            with open("tables.json", "w") as f:
-                json.dump(tables, f)
-
-        cls._tables_loaded = True
+        elif name in PRUNING_TABLES:
+            stride, move_tables, moves = {
+                "udslice_twist_prune": (
+                    cls.TWIST,
+                    ("udslice_move", "twist_move"),
+                    PHASE_1_MOVES,
+                ),
+                "udslice_flip_prune": (
+                    cls.FLIP,
+                    ("udslice_move", "flip_move"),
+                    PHASE_1_MOVES,
+                ),
+                "edge4_edge8_prune": (
+                    cls.EDGE8,
+                    ("edge4_move", "edge8_move"),
+                    PHASE_2_MOVES,
+                ),
+                "edge4_corner_prune": (
+                    cls.CORNER,
+                    ("edge4_move", "corner_move"),
+                    PHASE_2_MOVES,
+                ),
+            }[name]
+            if cls._packed:
+                move_tables = tuple(getattr(cls, m) for m in move_tables)
+                table = PackedPruningTable(table, stride, move_tables, moves)
+            else:
+                table = PruningTable(table, stride)
+        setattr(cls, name, table)
+        return table
+
+    @classmethod
+    def build_tables(cls, use_numpy=None, workers=1):
+        """
+        Build all tables from scratch.
+
+        Parameters
+        ----------
+        use_numpy : bool, optional
+            Whether to build the tables with the NumPy builders in
+            twophase.numpy_tables, which are much faster but produce identical
+            tables. By default NumPy is used if it is installed.
+        workers : int, optional
+            Number of worker processes used to build the tables when NumPy
+            isn't used, see twophase.parallel_tables. None uses every core. By
+            default the tables are built in the current process.
+
+        Returns
+        -------
+        dict
+            Mapping of table name to the table flattened into an array, as
+            stored in the table file.
+        """
+        if use_numpy is not False:
+            try:
+                from . import numpy_tables
+            except ImportError:
+                if use_numpy:
+                    raise
+            else:
+                return numpy_tables.build_tables(cls)
+
+        if workers != 1:
+            from . import parallel_tables
+
+            return parallel_tables.build_tables(cls, workers)
+
+        # ----------  Phase 1 move tables  ---------- #
+        cls.twist_move = cls.make_twist_table()
+        cls.flip_move = cls.make_flip_table()
+        cls.udslice_move = cls.make_udslice_table()
+
+        # ----------  Phase 2 move tables  ---------- #
+        cls.edge4_move = cls.make_edge4_table()
+        cls.edge8_move = cls.make_edge8_table()
+        cls.corner_move = cls.make_corner_table()
+
+        # ----------  Phase 1 tracking of phase 2 coordinates  ---------- #
+        cls.udslice_sorted_move = cls.make_udslice_sorted_table()
+        cls.u_edges_move = cls.make_u_edges_table()
+        cls.d_edges_move = cls.make_d_edges_table()
+        cls.edge8_combine = cls.make_edge8_combine_table()
+
+        # ----------  Phase 1 pruning tables  ---------- #
+        cls.udslice_twist_prune = cls.make_udslice_twist_prune()
+        cls.udslice_flip_prune = cls.make_udslice_flip_prune()
+
+        # --------  Phase 2 pruning tables  ---------- #
+        cls.edge4_edge8_prune = cls.make_edge4_edge8_prune()
+        cls.edge4_corner_prune = cls.make_edge4_corner_prune()
+
+        tables = {}
+        for name, typecode in MOVE_TABLES.items():
+            tables[name] = array(typecode, getattr(cls, name))
+        for name, typecode in COMBINE_TABLES.items():
+            tables[name] = array(typecode, getattr(cls, name))
+        for name in PRUNING_TABLES:
+            tables.update(pruning_arrays(name, getattr(cls, name).table))
+        return tables
 
     @classmethod
-    def make_twist_table(cls):
-        twist_move = [[0] * cls.MOVES for i in range(cls.TWIST)]
+    def make_twist_table(cls, start=0, stop=None):
+        stop = cls.TWIST if stop is None else stop
+        twist_move = [0] * (cls.MOVES * (stop - start))
         a = CubieCube()
-        for i in range(cls.TWIST):
+        for i in range(start, stop):
             a.twist = i
             for j in range(6):
                 for k in range(3):
                     a.corner_multiply(MOVE_CUBE[j])
-                    twist_move[i][3 * j + k] = a.twist
+                    twist_move[cls.MOVES * (i - start) + 3 * j + k] = a.twist
                 a.corner_multiply(MOVE_CUBE[j])
         return twist_move
 
     @classmethod
-    def make_flip_table(cls):
-        flip_move = [[0] * cls.MOVES for i in range(cls.FLIP)]
+    def make_flip_table(cls, start=0, stop=None):
+        stop = cls.FLIP if stop is None else stop
+        flip_move = [0] * (cls.MOVES * (stop - start))
         a = CubieCube()
-        for i in range(cls.FLIP):
+        for i in range(start, stop):
             a.flip = i
             for j in range(6):
                 for k in range(3):
                     a.edge_multiply(MOVE_CUBE[j])
-                    flip_move[i][3 * j + k] = a.flip
+                    flip_move[cls.MOVES * (i - start) + 3 * j + k] = a.flip
                 a.edge_multiply(MOVE_CUBE[j])
         return flip_move
 
     @classmethod
-    def make_udslice_table(cls):
-        udslice_move = [[0] * cls.MOVES for i in range(cls.UDSLICE)]
+    def make_udslice_table(cls, start=0, stop=None):
+        stop = cls.UDSLICE if stop is None else stop
+        udslice_move = [0] * (cls.MOVES * (stop - start))
         a = CubieCube()
-        for i in range(cls.UDSLICE):
+        for i in range(start, stop):
             a.udslice = i
             for j in range(6):
                 for k in range(3):
                     a.edge_multiply(MOVE_CUBE[j])
-                    udslice_move[i][3 * j + k] = a.udslice
+                    udslice_move[
+                        cls.MOVES * (i - start) + 3 * j + k
+                    ] = a.udslice
                 a.edge_multiply(MOVE_CUBE[j])
         return udslice_move
 
     @classmethod
-    def make_edge4_table(cls):
-        edge4_move = [[0] * cls.MOVES for i in range(cls.EDGE4)]
+    def make_edge4_table(cls, start=0, stop=None):
+        stop = cls.EDGE4 if stop is None else stop
+        edge4_move = [0] * (cls.MOVES * (stop - start))
         a = CubieCube()
-        for i in range(cls.EDGE4):
+        for i in range(start, stop):
             a.edge4 = i
             for j in range(6):
                 for k in range(3):
                     a.edge_multiply(MOVE_CUBE[j])
                     if k % 2 == 0 and j % 3 != 0:
-                        edge4_move[i][3 * j + k] = -1
+                        edge4_move[cls.MOVES * (i - start) + 3 * j + k] = -1
                     else:
-                        edge4_move[i][3 * j + k] = a.edge4
+                        edge4_move[
+                            cls.MOVES * (i - start) + 3 * j + k
+                        ] = a.edge4
                 a.edge_multiply(MOVE_CUBE[j])
         return edge4_move
 
     @classmethod
-    def make_edge8_table(cls):
-        edge8_move = [[0] * cls.MOVES for i in range(cls.EDGE8)]
+    def make_edge8_table(cls, start=0, stop=None):
+        stop = cls.EDGE8 if stop is None else stop
+        edge8_move = [0] * (cls.MOVES * (stop - start))
         a = CubieCube()
-        for i in range(cls.EDGE8):
+        for i in range(start, stop):
             a.edge8 = i
             for j in range(6):
                 for k in range(3):
                     a.edge_multiply(MOVE_CUBE[j])
                     if k % 2 == 0 and j % 3 != 0:
-                        edge8_move[i][3 * j + k] = -1
+                        edge8_move[cls.MOVES * (i - start) + 3 * j + k] = -1
                     else:
-                        edge8_move[i][3 * j + k] = a.edge8
+                        edge8_move[
+                            cls.MOVES * (i - start) + 3 * j + k
+                        ] = a.edge8
                 a.edge_multiply(MOVE_CUBE[j])
         return edge8_move
 
     @classmethod
-    def make_corner_table(cls):
-        corner_move = [[0] * cls.MOVES for i in range(cls.CORNER)]
+    def make_corner_table(cls, start=0, stop=None):
+        stop = cls.CORNER if stop is None else stop
+        corner_move = [0] * (cls.MOVES * (stop - start))
         a = CubieCube()
-        for i in range(cls.CORNER):
+        for i in range(start, stop):
             a.corner = i
             for j in range(6):
                 for k in range(3):
                     a.corner_multiply(MOVE_CUBE[j])
-                    if k % 2 == 0 and j % 3 != 0:
-                        corner_move[i][3 * j + k] = -1
-                    else:
-                        corner_move[i][3 * j + k] = a.corner
+                    # defined for all moves, as corner is tracked in phase 1
+                    corner_move[cls.MOVES * (i - start) + 3 * j + k] = a.corner
                 a.corner_multiply(MOVE_CUBE[j])
         return corner_move
 
+    @classmethod
+    def make_udslice_sorted_table(cls, start=0, stop=None):
+        return cls._make_edges_table("udslice_sorted", start, stop)
+
+    @classmethod
+    def make_u_edges_table(cls, start=0, stop=None):
+        return cls._make_edges_table("u_edges", start, stop)
+
+    @classmethod
+    def make_d_edges_table(cls, start=0, stop=None):
+        return cls._make_edges_table("d_edges", start, stop)
+
+    @classmethod
+    def _make_edges_table(cls, coord, start, stop):
+        stop = getattr(cls, coord.upper()) if stop is None else stop
+        move = [0] * (cls.MOVES * (stop - start))
+        a = CubieCube()
+        for i in range(start, stop):
+            setattr(a, coord, i)
+            for j in range(6):
+                for k in range(3):
+                    a.edge_multiply(MOVE_CUBE[j])
+                    move[cls.MOVES * (i - start) + 3 * j + k] = getattr(
+                        a, coord
+                    )
+                a.edge_multiply(MOVE_CUBE[j])
+        return move
+
+    @classmethod
+    def make_edge8_combine_table(cls):
+        """
+        Entry 24 * u_edges + d_edges % 24 is the edge8 coordinate of a cube in
+        phase 2 position, where u_edges < U_EDGES_PHASE_2. In phase 2 position
+        the U and D edges fill the first 8 positions, so the positions of the
+        D edges are determined by those of the U edges.
+        """
+        edge8_combine = [0] * (cls.U_EDGES_PHASE_2 * 24)
+        a = CubieCube()
+        for i in range(cls.U_EDGES_PHASE_2):
+            a.u_edges = i
+            positions = [j for j in range(8) if 4 <= a.ep[j] < 8]
+            for order in range(24):
+                a._place_edges(
+                    [Edge.DR, Edge.DF, Edge.DL, Edge.DB], positions, order
+                )
+                edge8_combine[24 * i + order] = a.edge8
+        return edge8_combine
+
     @classmethod
     def make_udslice_twist_prune(cls):
         udslice_twist_prune = [-1] * (cls.UDSLICE * cls.TWIST)
@@ -206,8 +837,9 @@ class Tables:
             for i in range(cls.UDSLICE * cls.TWIST):
                 if udslice_twist_prune[i] == depth:
                     m = [
-                        cls.udslice_move[i // cls.TWIST][j] * cls.TWIST
-                        + cls.twist_move[i % cls.TWIST][j]
+                        cls.udslice_move[cls.MOVES * (i // cls.TWIST) + j]
+                        * cls.TWIST
+                        + cls.twist_move[cls.MOVES * (i % cls.TWIST) + j]
                         for j in range(18)
                     ]
                     for x in m:
@@ -226,8 +858,9 @@ class Tables:
             for i in range(cls.UDSLICE * cls.FLIP):
                 if udslice_flip_prune[i] == depth:
                     m = [
-                        cls.udslice_move[i // cls.FLIP][j] * cls.FLIP
-                        + cls.flip_move[i % cls.FLIP][j]
+                        cls.udslice_move[cls.MOVES * (i // cls.FLIP) + j]
+                        * cls.FLIP
+                        + cls.flip_move[cls.MOVES * (i % cls.FLIP) + j]
                         for j in range(18)
                     ]
                     for x in m:
@@ -246,9 +879,10 @@ class Tables:
             for i in range(cls.EDGE4 * cls.EDGE8):
                 if edge4_edge8_prune[i] == depth:
                     m = [
-                        cls.edge4_move[i // cls.EDGE8][j] * cls.EDGE8
-                        + cls.edge8_move[i % cls.EDGE8][j]
-                        for j in range(18)
+                        cls.edge4_move[cls.MOVES * (i // cls.EDGE8) + j]
+                        * cls.EDGE8
+                        + cls.edge8_move[cls.MOVES * (i % cls.EDGE8) + j]
+                        for j in PHASE_2_MOVES
                     ]
                     for x in m:
                         if edge4_edge8_prune[x] == -1:
@@ -266,9 +900,10 @@ class Tables:
             for i in range(cls.EDGE4 * cls.CORNER):
                 if edge4_corner_prune[i] == depth:
                     m = [
-                        cls.edge4_move[i // cls.CORNER][j] * cls.CORNER
-                        + cls.corner_move[i % cls.CORNER][j]
-                        for j in range(18)
+                        cls.edge4_move[cls.MOVES * (i // cls.CORNER) + j]
+                        * cls.CORNER
+                        + cls.corner_move[cls.MOVES * (i % cls.CORNER) + j]
+                        for j in PHASE_2_MOVES
                     ]
                     for x in m:
                         if edge4_corner_prune[x] == -1: